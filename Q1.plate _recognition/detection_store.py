@@ -0,0 +1,190 @@
+# ========================= Q1: Detection Event Store =========================
+# SQLite (WAL) log of every plate detection made by q1_code.py:
+#
+#   detections   time, source ("camera:0", "video:gate.mp4", ...), label,
+#                confidence, box, saved crop path and number (broken plates
+#                only), frame time within a video
+#
+# Rows are buffered and inserted in batches (every FLUSH_ROWS rows or
+# FLUSH_SECONDS), so recording stays cheap at camera frame rates. Indexes on
+# time, (source, time) and (label, time) serve time-range, per-camera and
+# count queries without touching broken_plates/ on disk.
+#
+#   python detection_store.py --since 2026-01-01 --by day --label broken
+#   python detection_store.py --source camera:0 --list 20
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_STORE_PATH = os.environ.get("PLATE_EVENTS", os.path.join(HERE, "detections.sqlite"))
+FLUSH_ROWS = 256
+FLUSH_SECONDS = 2.0
+BUCKETS = {"hour": "%Y-%m-%d %H:00", "day": "%Y-%m-%d", "month": "%Y-%m"}
+EVENT_FIELDS = ("id", "time", "source", "label", "confidence", "x1", "y1", "x2", "y2",
+                "crop_path", "crop_number", "video_time")
+
+
+class DetectionStore:
+    def __init__(self, path=DEFAULT_STORE_PATH, flush_rows=FLUSH_ROWS, flush_seconds=FLUSH_SECONDS):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.lock = threading.Lock()
+        self.pending = []
+        self.last_flush = time.monotonic()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS detections (
+                id INTEGER PRIMARY KEY, time REAL NOT NULL, source TEXT NOT NULL, label TEXT NOT NULL,
+                confidence REAL, x1 INTEGER, y1 INTEGER, x2 INTEGER, y2 INTEGER,
+                crop_path TEXT, crop_number INTEGER, video_time REAL);
+            CREATE INDEX IF NOT EXISTS detections_time ON detections (time);
+            CREATE INDEX IF NOT EXISTS detections_source_time ON detections (source, time);
+            CREATE INDEX IF NOT EXISTS detections_label_time ON detections (label, time);
+            CREATE INDEX IF NOT EXISTS detections_crops ON detections (crop_number) WHERE crop_number IS NOT NULL;
+        """)
+        self.last_crop_number = self.db.execute(
+            "SELECT COALESCE(MAX(crop_number), 0) FROM detections").fetchone()[0]
+
+    # ------------------ Recording ------------------
+    def record(self, source, label, confidence, box, crop_path=None, crop_number=None,
+               video_time=None, timestamp=None):
+        x1, y1, x2, y2 = (int(v) for v in box)
+        # Absolute, so the path stays valid whatever directory the app is started from
+        crop_path = os.path.abspath(crop_path) if crop_path else None
+        row = (timestamp or time.time(), source, label, float(confidence), x1, y1, x2, y2,
+               crop_path, crop_number, video_time)
+        with self.lock:
+            self.pending.append(row)
+            # Saved crops are written through at once: a crash must not lose the numbers already used on disk
+            due = (crop_number is not None or len(self.pending) >= self.flush_rows
+                   or time.monotonic() - self.last_flush >= self.flush_seconds)
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            rows, self.pending = self.pending, []
+            self.last_flush = time.monotonic()
+            if rows:
+                with self.db:
+                    self.db.executemany(
+                        "INSERT INTO detections (time, source, label, confidence, x1, y1, x2, y2, "
+                        "crop_path, crop_number, video_time) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def next_crop_number(self):
+        """Number for the next saved crop (vehicle_<n>.png), without listing the crop folder."""
+        with self.lock:
+            self.last_crop_number += 1
+            return self.last_crop_number
+
+    def import_crops(self, directory, label="broken", source="legacy"):
+        """Record vehicle_<n> crops saved before the store existed (once, while it has no crops).
+
+        Crop numbering always continues after the highest vehicle_<n> in the folder, even for
+        files the store has no row for, so an existing crop is never overwritten.
+        """
+        rows = []
+        for name in os.listdir(directory) if os.path.isdir(directory) else []:
+            stem, ext = os.path.splitext(name)
+            if not stem.lower().startswith("vehicle_") or ext.lower() not in (".png", ".jpg", ".jpeg"):
+                continue
+            try:
+                number = int(stem.split("_")[-1])
+            except ValueError:
+                continue
+            path = os.path.abspath(os.path.join(directory, name))
+            rows.append((os.path.getmtime(path), source, label, path, number))
+        if self.db.execute("SELECT 1 FROM detections WHERE crop_number IS NOT NULL LIMIT 1").fetchone():
+            with self.lock:
+                self.last_crop_number = max([self.last_crop_number] + [r[4] for r in rows])
+            return 0
+        with self.lock, self.db:
+            self.db.executemany("INSERT INTO detections (time, source, label, crop_path, crop_number) "
+                                "VALUES (?, ?, ?, ?, ?)", rows)
+            self.last_crop_number = max([self.last_crop_number] + [r[4] for r in rows])
+        return len(rows)
+
+    # ------------------ Queries ------------------
+    def _where(self, start=None, end=None, source=None, label=None, crops_only=False):
+        clauses, params = [], []
+        for clause, value in (("time >= ?", start), ("time < ?", end), ("source = ?", source), ("label = ?", label)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        if crops_only:
+            clauses.append("crop_path IS NOT NULL")
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def events(self, start=None, end=None, source=None, label=None, crops_only=False, limit=None):
+        """Detections as dicts, newest first; start/end are Unix times."""
+        self.flush()
+        where, params = self._where(start, end, source, label, crops_only)
+        sql = f"SELECT {', '.join(EVENT_FIELDS)} FROM detections{where} ORDER BY time DESC"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self.lock:
+            return [dict(zip(EVENT_FIELDS, row)) for row in self.db.execute(sql, params)]
+
+    def counts(self, by="day", start=None, end=None, source=None, label=None):
+        """[(bucket, source, label, detections, crops saved)] grouped by local hour/day/month."""
+        self.flush()
+        where, params = self._where(start, end, source, label)
+        sql = (f"SELECT strftime('{BUCKETS[by]}', time, 'unixepoch', 'localtime') AS bucket, source, label, "
+               f"COUNT(*), COUNT(crop_path) FROM detections{where} "
+               f"GROUP BY bucket, source, label ORDER BY bucket, source, label")
+        with self.lock:
+            return self.db.execute(sql, params).fetchall()
+
+    def sources(self):
+        self.flush()
+        with self.lock:
+            return [row[0] for row in self.db.execute("SELECT DISTINCT source FROM detections ORDER BY source")]
+
+    def close(self):
+        self.flush()
+        self.db.close()
+
+# ------------------ Main ------------------
+def parse_time(text):
+    return datetime.fromisoformat(text).timestamp() if text else None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report on recorded plate detections.")
+    parser.add_argument("--db", default=DEFAULT_STORE_PATH)
+    parser.add_argument("--since", help="ISO date/time, e.g. 2026-01-01 or 2026-01-01T08:00")
+    parser.add_argument("--until", help="ISO date/time (exclusive)")
+    parser.add_argument("--source", help="e.g. camera:0 or video:gate.mp4")
+    parser.add_argument("--label", help="broken or 'non broken'")
+    parser.add_argument("--by", choices=sorted(BUCKETS), default="day")
+    parser.add_argument("--list", type=int, metavar="N", help="show the N newest detections instead of counts")
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.db):
+        parser.error(f"{args.db} not found")
+
+    store = DetectionStore(args.db)
+    try:
+        start, end = parse_time(args.since), parse_time(args.until)
+        if args.list:
+            for e in store.events(start, end, args.source, args.label, limit=args.list):
+                when = datetime.fromtimestamp(e["time"]).isoformat(sep=" ", timespec="seconds")
+                confidence = f"{e['confidence']:.2f}" if e["confidence"] is not None else "-"
+                print(f"{when}  {e['source']:<20} {e['label']:<11} {confidence}  {e['crop_path'] or ''}")
+        else:
+            print(f"{args.by:<16} {'source':<20} {'label':<11} {'detections':>10} {'crops':>6}")
+            for bucket, source, label, detections, crops in store.counts(args.by, start, end, args.source, args.label):
+                print(f"{bucket:<16} {source:<20} {label:<11} {detections:>10} {crops:>6}")
+    finally:
+        store.close()
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,129 @@
+# ========================= Q1: Plate Crop Deduplication =========================
+# Decides whether a broken-plate crop shows a plate that is already being
+# tracked, i.e. saved and seen again in the last TRACK_SECONDS close to where
+# it was last seen. A match needs both:
+#
+#   - appearance: the crops' perceptual hashes are within MAX_DISTANCE bits, so
+#     a new plate that shows up where the last one was is still saved;
+#   - position and time: the box is within NEAR_FACTOR box widths of the
+#     entry's last box, so a plate that moves across the frame (or a moving
+#     camera) keeps matching from frame to frame, while a different plate
+#     elsewhere in the frame never does.
+#
+# Appearance alone is not enough: plates that differ in one character are
+# usually within MAX_DISTANCE of each other (as close as a plate and its own
+# half-size copy), so hash matches are never trusted across the frame or
+# across minutes.
+#
+# Each crop gets a perceptual hash (pHash) shaped for plates: the grayscale
+# crop is resized to a 4:1 HASH_IMAGE, and every bit says whether one of the
+# lowest HASH_ROWS x HASH_COLS DCT coefficients (DC excluded) is above their
+# median. Exposure, JPEG noise and a few pixels of box jitter barely change
+# it between frames.
+#
+# Lookups use multi-index hashing: the hash is cut into CHUNKS pieces, each
+# with its own table. Two hashes within MAX_DISTANCE bits have at least one
+# piece within MAX_DISTANCE // CHUNKS bits of each other, so only the table
+# buckets at that small distance are probed, never the whole index. Entries
+# not matched for TRACK_SECONDS are evicted.
+import collections
+import itertools
+import time
+
+import cv2
+import numpy as np
+
+HASH_IMAGE = (128, 32)  # width, height
+HASH_ROWS, HASH_COLS = 6, 24
+HASH_BITS = HASH_ROWS * HASH_COLS - 1
+MAX_DISTANCE = 28  # same plate in consecutive frames; lower saves more duplicates
+CHUNKS = 16
+TRACK_SECONDS = 5.0  # a plate missed for longer is saved again when it reappears
+NEAR_FACTOR = 1.0    # max center movement since the last sighting, in box widths
+
+
+def plate_hash(image):
+    """Perceptual hash of a BGR or grayscale crop, as an int of HASH_BITS bits."""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    small = cv2.resize(gray, HASH_IMAGE, interpolation=cv2.INTER_AREA).astype(np.float32)
+    coefficients = cv2.dct(small)[:HASH_ROWS, :HASH_COLS].flatten()[1:]
+    bits = np.packbits(coefficients > np.median(coefficients))
+    return int.from_bytes(bits.tobytes(), "big") >> (len(bits) * 8 - HASH_BITS)
+
+
+def is_near(box, other, factor=NEAR_FACTOR):
+    """Whether the centers of two (x1, y1, x2, y2) boxes are within `factor` box widths."""
+    width = max(box[2] - box[0], other[2] - other[0], 1)
+    dx = (box[0] + box[2] - other[0] - other[2]) / 2
+    dy = (box[1] + box[3] - other[1] - other[3]) / 2
+    return dx * dx + dy * dy <= (factor * width) ** 2
+
+
+class PlateHashIndex:
+    def __init__(self, max_distance=MAX_DISTANCE, track_seconds=TRACK_SECONDS, near_factor=NEAR_FACTOR,
+                 hash_bits=HASH_BITS, chunks=CHUNKS):
+        self.max_distance = max_distance
+        self.track_seconds = track_seconds
+        self.near_factor = near_factor
+        self.chunk_bits = -(-hash_bits // chunks)
+        self.chunks = chunks
+        radius = max_distance // chunks
+        # Every XOR mask of up to radius bits within one chunk
+        self.masks = [sum(1 << b for b in bits) for r in range(radius + 1)
+                      for bits in itertools.combinations(range(self.chunk_bits), r)]
+        self.tables = [collections.defaultdict(set) for _ in range(chunks)]
+        self.entries = collections.OrderedDict()  # id -> [hash, last_seen, box, payload], oldest first
+        self.next_id = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _pieces(self, h):
+        mask = (1 << self.chunk_bits) - 1
+        return [(h >> (i * self.chunk_bits)) & mask for i in range(self.chunks)]
+
+    def evict(self, now=None):
+        cutoff = (now if now is not None else time.monotonic()) - self.track_seconds
+        while self.entries:
+            entry_id, (h, last_seen, _, _) = next(iter(self.entries.items()))
+            if last_seen >= cutoff:
+                break
+            del self.entries[entry_id]
+            for table, piece in zip(self.tables, self._pieces(h)):
+                bucket = table[piece]
+                bucket.discard(entry_id)
+                if not bucket:
+                    del table[piece]
+
+    def match(self, h, box, now=None):
+        """(payload, distance) of the closest tracked plate near `box` within max_distance, else None.
+
+        A match counts as a new sighting: the entry moves to `box` and is kept for another TRACK_SECONDS.
+        """
+        now = now if now is not None else time.monotonic()
+        self.evict(now)
+        candidates = set()
+        for table, piece in zip(self.tables, self._pieces(h)):
+            for mask in self.masks:
+                candidates.update(table.get(piece ^ mask, ()))
+        best = None
+        for entry_id in candidates:
+            entry = self.entries[entry_id]
+            distance = bin(entry[0] ^ h).count("1")
+            if (distance <= self.max_distance and (best is None or distance < best[1])
+                    and is_near(box, entry[2], self.near_factor)):
+                best = (entry_id, distance)
+        if best is None:
+            return None
+        entry = self.entries[best[0]]
+        entry[1], entry[2] = now, tuple(box)
+        self.entries.move_to_end(best[0])
+        return entry[3], best[1]
+
+    def add(self, h, box, payload=None, now=None):
+        entry_id = self.next_id
+        self.next_id += 1
+        self.entries[entry_id] = [h, now if now is not None else time.monotonic(), tuple(box), payload]
+        for table, piece in zip(self.tables, self._pieces(h)):
+            table[piece].add(entry_id)
+        return entry_id
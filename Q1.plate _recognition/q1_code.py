@@ -1,71 +1,153 @@
 import os
+import sys
+import threading
 import time
 import cv2
 import tkinter as tk
 from tkinter import filedialog, messagebox
 from PIL import Image, ImageTk
-from ultralytics import YOLO
 import numpy as np
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.startup import StartupTimer
+STARTUP = StartupTimer()
+from common.camera_probe import open_first_camera
+from common.frame_pool import FramePool
+from common.frame_ring import RingCapture
+from common.metrics import Metrics
+from detection_store import DetectionStore
+from plate_dedup import PlateHashIndex, plate_hash
+from video_sampling import FrameSampler, timecode
+
 # === Config & Environment ===
 os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"
 os.environ["OMP_NUM_THREADS"] = "1"
 os.environ["MKL_NUM_THREADS"] = "1"
 
 # === Initialize model ===
-MODEL_PATH = "Q1.plate _recognition\\yolo11m.pt"  # change if needed
-try:
-    model = YOLO(MODEL_PATH)
-except Exception:
-    print("⚠️ Model not found — using untrained YOLO model.")
-    model = YOLO()
+# PLATE_MODEL overrides; otherwise the model published by train_plates.py, then the original weights
+HERE = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.environ.get("PLATE_MODEL", os.path.join(HERE, "models", "current.pt"))
+if not os.path.exists(MODEL_PATH):
+    MODEL_PATH = os.path.join(HERE, "yolo11m.pt")
+# Loaded on a background thread once the window is up (load_model); frames are shown unannotated until then
+model = None
+model_ready = threading.Event()
+model_error = None
+pending_image = None  # uploaded while the model was loading; predicted once it is ready
+
+# Prometheus endpoint / JSON log via METRICS_PORT / METRICS_LOG (see common/metrics.py)
+METRICS = Metrics("q1_plates").start_from_env()
+# Reused per-frame buffers for the camera loop (FRAME_POOL_DEBUG=1 reports allocations)
+POOL = FramePool()
 
 classes = ['broken', 'non broken']
 BROKEN_DIR = "broken_plates"
 os.makedirs(BROKEN_DIR, exist_ok=True)
+# Every detection (and each saved crop) is logged here; see detection_store.py
+events = DetectionStore()
+events.import_crops(BROKEN_DIR)
 
 # === Globals ===
 cap = None
+camera_source = "camera"  # source name recorded with camera detections
 running = False
 video_running = False
-last_saved_centers = []
-VEHICLE_SAVE_THRESHOLD = 60
+# Saved broken plates tracked by appearance and position, so the same plate isn't saved again (see plate_dedup.py)
+saved_plates = PlateHashIndex()
+# Read frames from a capture daemon (python -m common.frame_ring) instead of a camera
+FRAME_RING = os.environ.get("FRAME_RING")
+
+# === Coarse-to-fine inference ===
+# "full": one pass over the whole frame at IMGSZ (the original behaviour).
+# "coarse": a cheap low-resolution pass finds candidate plates (and vehicles, with
+# VEHICLE_MODEL set), then only those regions are re-detected at full resolution,
+# in one batch. "auto" uses coarse for frames larger than FULL_FRAME_MAX.
+PLATE_INFERENCE = os.environ.get("PLATE_INFERENCE", "auto")
+IMGSZ = 640
+FULL_FRAME_MAX = 1280  # longest side up to which a single full-frame pass is used
+COARSE_IMGSZ = 640
+COARSE_CONF = 0.1  # low: a missed candidate can't be recovered by the fine pass
+FINE_IMGSZ = 640
+REGION_MARGIN = 1.0  # plate candidates grow by this many box widths/heights on each side
+MIN_REGION = 96  # px, smallest refined region in full-frame pixels
+MAX_REGIONS = 8  # per frame; the highest-scoring candidates win
+VEHICLE_MODEL = os.environ.get("VEHICLE_MODEL")  # e.g. yolo11n.pt (COCO) to also refine whole vehicles
+VEHICLE_CLASSES = (2, 3, 5, 7)  # COCO car, motorcycle, bus, truck
+vehicle_model = None
+
+# === Video sampling ===
+# Frames of uploaded videos that are analysed: all, stride:N, fps:F or scene:T (see video_sampling.py)
+try:
+    VIDEO_SAMPLER = FrameSampler.from_spec(os.environ.get("PLATE_VIDEO_SAMPLING", "all"))
+except ValueError as e:
+    print(f"⚠️ PLATE_VIDEO_SAMPLING ignored, analysing every frame: {e}")
+    VIDEO_SAMPLER = FrameSampler()
+
+# === Model loading ===
+def load_model():
+    # Runs off the Tk thread; poll_model() reports the outcome
+    global model, model_error
+    try:
+        from ultralytics import YOLO
+        STARTUP.mark("imports_done")
+        try:
+            loaded = YOLO(MODEL_PATH)
+        except Exception:
+            print("⚠️ Model not found — using untrained YOLO model.")
+            loaded = YOLO()
+        STARTUP.mark("model_loaded")
+        # One dummy inference, so the first real frame doesn't pay for setup
+        loaded.predict(source=np.zeros((IMGSZ, IMGSZ, 3), np.uint8), imgsz=IMGSZ, verbose=False)
+        STARTUP.mark("warmed_up")
+        model = loaded
+    except Exception as e:
+        model_error = e
+    model_ready.set()
+
+def poll_model():
+    global pending_image
+    if not model_ready.is_set():
+        root.after(50, poll_model)
+        return
+    if model_error is not None:
+        status_label.config(text="Model failed to load", fg="red")
+        if STARTUP.benchmarking:
+            finish_startup_benchmark()
+        else:
+            messagebox.showerror("Error", f"Failed to load model: {model_error}")
+        return
+    if not running and not video_running:
+        status_label.config(text=f"Model ready ({STARTUP.marks['warmed_up']:.1f}s after start)", fg="green")
+    if pending_image:
+        path, pending_image = pending_image, None
+        show_image_prediction(path)
+    elif STARTUP.benchmarking and not running:
+        finish_startup_benchmark()  # no camera: report the marks so far
+
+def finish_startup_benchmark():
+    # STARTUP_BENCH is set: write the marks and exit after the first prediction
+    STARTUP.write()
+    print(STARTUP.report())
+    exit_app()
 
 # === Utility Functions ===
 def open_camera_auto(max_index=4):
-    for i in range(max_index + 1):
-        flag = cv2.CAP_DSHOW if hasattr(cv2, "CAP_DSHOW") else 0
-        c = cv2.VideoCapture(i, flag)
-        if c is not None and c.isOpened():
-            try:
-                c.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-            except Exception:
-                pass
-            return c, i
+    if FRAME_RING:
+        c = RingCapture(FRAME_RING)
+        return (c, FRAME_RING) if c.isOpened() else (None, None)
+    # All indexes at once, the last working one first (see common/camera_probe.py)
+    flag = cv2.CAP_DSHOW if hasattr(cv2, "CAP_DSHOW") else 0
+    c, i = open_first_camera(range(max_index + 1), flag, key="q1_plates")
+    if c is not None:
         try:
-            c.release()
+            c.set(cv2.CAP_PROP_BUFFERSIZE, 1)
         except Exception:
             pass
-    return None, None
-
-def is_new_center(cx, cy, threshold=VEHICLE_SAVE_THRESHOLD):
-    global last_saved_centers
-    for (pcx, pcy) in last_saved_centers:
-        if abs(cx - pcx) < threshold and abs(cy - pcy) < threshold:
-            return False
-    return True
+    return c, i
 
 def get_next_vehicle_count():
-    files = [f for f in os.listdir(BROKEN_DIR) if f.lower().startswith("vehicle_") and f.lower().endswith((".png", ".jpg", ".jpeg"))]
-    max_n = 0
-    for f in files:
-        try:
-            n = int(os.path.splitext(f)[0].split("_")[-1])
-            if n > max_n:
-                max_n = n
-        except Exception:
-            pass
-    return max_n + 1
+    return events.next_crop_number()
 
 def extract_detections(output):
     dets = []
@@ -94,27 +176,94 @@ def extract_detections(output):
             pass
     return dets
 
+def merge_regions(boxes):
+    """Union overlapping (x1, y1, x2, y2) boxes until none overlap."""
+    boxes = [list(b) for b in boxes]
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(boxes)):
+            for j in range(i + 1, len(boxes)):
+                a, b = boxes[i], boxes[j]
+                if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                    boxes[i] = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+                    del boxes[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return boxes
+
+def coarse_regions(frame):
+    """Full-resolution regions worth refining: low-res plate candidates (grown) and vehicles."""
+    global vehicle_model
+    h, w = frame.shape[:2]
+    candidates = []
+    results = model.predict(source=frame, imgsz=COARSE_IMGSZ, conf=COARSE_CONF, verbose=False)
+    for (x1, y1, x2, y2, conf, cls) in (extract_detections(results[0]) if results else []):
+        mx = max(REGION_MARGIN * (x2 - x1), (MIN_REGION - (x2 - x1)) / 2)
+        my = max(REGION_MARGIN * (y2 - y1), (MIN_REGION - (y2 - y1)) / 2)
+        candidates.append((conf, (x1 - mx, y1 - my, x2 + mx, y2 + my)))
+    if VEHICLE_MODEL:
+        if vehicle_model is None:
+            from ultralytics import YOLO
+            vehicle_model = YOLO(VEHICLE_MODEL)
+        results = vehicle_model.predict(source=frame, imgsz=COARSE_IMGSZ, conf=0.25,
+                                        classes=list(VEHICLE_CLASSES), verbose=False)
+        candidates += [(conf, (x1, y1, x2, y2)) for (x1, y1, x2, y2, conf, cls)
+                       in (extract_detections(results[0]) if results else [])]
+    candidates.sort(key=lambda c: -c[0])
+    boxes = [(max(0, int(x1)), max(0, int(y1)), min(w, int(x2)), min(h, int(y2)))
+             for _, (x1, y1, x2, y2) in candidates[:MAX_REGIONS]]
+    return merge_regions(b for b in boxes if b[2] > b[0] and b[3] > b[1])
+
+def detect_plates(frame):
+    """(x1, y1, x2, y2, conf, cls) plate detections in full-frame coordinates."""
+    h, w = frame.shape[:2]
+    if PLATE_INFERENCE == "full" or (PLATE_INFERENCE == "auto" and max(h, w) <= FULL_FRAME_MAX):
+        results = model.predict(source=frame, imgsz=IMGSZ, conf=0.25, verbose=False)
+        return extract_detections(results[0]) if results else []
+    with METRICS.time("coarse"):
+        regions = coarse_regions(frame)
+    if not regions:
+        return []
+    METRICS.inc("regions_refined", len(regions))
+    crops = [frame[y1:y2, x1:x2] for (x1, y1, x2, y2) in regions]
+    # One batched forward pass over every region, so cost follows the number of plates in view
+    with METRICS.time("refine"):
+        results = model.predict(source=crops, imgsz=FINE_IMGSZ, conf=0.25, batch=len(crops), verbose=False)
+    dets = []
+    for (rx, ry, _, _), output in zip(regions, results):
+        dets += [(x1 + rx, y1 + ry, x2 + rx, y2 + ry, conf, cls)
+                 for (x1, y1, x2, y2, conf, cls) in extract_detections(output)]
+    return dets
+
 # === Prediction / Drawing ===
-def predict_frame(frame):
-    global last_saved_centers
+def predict_frame(frame, source="camera", video_time=None):
+    if model is None:
+        return frame, "⏳ Loading model..." if not model_ready.is_set() else "Model unavailable", "gray", False
     try:
-        results = model.predict(source=frame, imgsz=640, conf=0.25, verbose=False)
+        with METRICS.time("detect"):
+            dets = detect_plates(frame)
     except Exception as e:
         print("Model prediction error:", e)
+        METRICS.inc("errors")
         return frame, "Model error", "gray", False
-
-    if not results:
-        return frame, "No plate detected", "gray", False
-
-    output = results[0]
-    dets = extract_detections(output)
+    METRICS.inc("frames_processed")
+    METRICS.inc("detections", len(dets))
 
     detected_label = "No plate detected"
     detected_color = "gray"
     broken_found = False
     normal_found = False
 
-    for (x1, y1, x2, y2, conf, cls) in dets:
+    # Broken-plate crops are taken before any box or label is drawn on the frame
+    h, w = frame.shape[:2]
+    crops = [frame[max(0, y1):min(h - 1, y2), max(0, x1):min(w - 1, x2)].copy()
+             if int(cls) < len(classes) and classes[int(cls)] == "broken" else None
+             for (x1, y1, x2, y2, conf, cls) in dets]
+
+    for (x1, y1, x2, y2, conf, cls), crop in zip(dets, crops):
         class_id = int(cls)
         class_name = classes[class_id] if class_id < len(classes) else f"Unknown({class_id})"
         display_name = "Broken Plate" if class_name == "broken" else "Normal Plate"
@@ -124,28 +273,30 @@ def predict_frame(frame):
         label = f"{display_name}: {conf:.2f}"
         cv2.putText(frame, label, (max(0, x1), max(15, y1 - 10)), cv2.FONT_HERSHEY_SIMPLEX, 0.7, color_bgr, 2)
 
+        crop_path = vnum = None
         if class_name == "broken":
             detected_label = "Broken Plate Detected"
             detected_color = "red"
             broken_found = True
-            cx = int((x1 + x2) / 2)
-            cy = int((y1 + y2) / 2)
-            if is_new_center(cx, cy):
-                h, w = frame.shape[:2]
-                rx1, ry1 = max(0, x1), max(0, y1)
-                rx2, ry2 = min(w - 1, x2), min(h - 1, y2)
-                crop = frame[ry1:ry2, rx1:rx2].copy()
-                if crop.size != 0:
-                    vnum = get_next_vehicle_count()
-                    fname = f"vehicle_{vnum}.png"
-                    path = os.path.join(BROKEN_DIR, fname)
-                    try:
-                        cv2.imwrite(path, crop)
-                        last_saved_centers.append((cx, cy))
-                    except Exception as e:
-                        print("Failed to save vehicle crop:", e)
+            # Checked before the crop is encoded or written
+            crop_hash = plate_hash(crop) if crop.size != 0 else None
+            if crop_hash is not None and saved_plates.match(crop_hash, (x1, y1, x2, y2)) is not None:
+                METRICS.inc("crops_deduplicated")
+            elif crop_hash is not None:
+                vnum = get_next_vehicle_count()
+                fname = f"vehicle_{vnum}.png"
+                path = os.path.join(BROKEN_DIR, fname)
+                try:
+                    cv2.imwrite(path, crop)
+                    saved_plates.add(crop_hash, (x1, y1, x2, y2), path)
+                    METRICS.inc("crops_saved")
+                    crop_path = path
+                except Exception as e:
+                    print("Failed to save vehicle crop:", e)
         else:
             normal_found = True
+        events.record(source, class_name, conf, (x1, y1, x2, y2), crop_path,
+                      vnum if crop_path else None, video_time)
 
     if not broken_found and normal_found:
         detected_label = "No broken plates detected"
@@ -156,7 +307,7 @@ def predict_frame(frame):
 # === Display Helpers ===
 def update_display_bgr(frame_bgr, fit_to_panel=True):
     try:
-        frame_rgb = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
+        frame_rgb = POOL.cvt_color("display_rgb", frame_bgr, cv2.COLOR_BGR2RGB)
     except Exception:
         return
     img = Image.fromarray(frame_rgb)
@@ -171,15 +322,19 @@ def update_display_bgr(frame_bgr, fit_to_panel=True):
 
 # === Camera & Video ===
 def start_camera():
-    global cap, running
+    global cap, running, camera_source
     remove_uploaded_image()
     if running:
         return
     cap_found, idx = open_camera_auto(max_index=4)
     if cap_found is None:
-        messagebox.showerror("Error", "Cannot access any camera.")
+        if STARTUP.benchmarking:
+            print("Startup benchmark: no camera, measuring model startup only")
+        else:
+            messagebox.showerror("Error", "Cannot access any camera.")
         return
     cap = cap_found
+    camera_source = f"ring:{idx}" if FRAME_RING else f"camera:{idx}"
     running = True
     status_label.config(text=f"📷 Camera Started (index {idx})", fg="blue")
     btn_start_camera.config(state="disabled")
@@ -194,6 +349,7 @@ def stop_camera():
             cap.release()
         except Exception:
             pass
+    events.flush()
     status_label.config(text="🛑 Camera Stopped", fg="gray")
     btn_start_camera.config(state="normal")
     btn_stop_camera.config(state="disabled")
@@ -202,15 +358,29 @@ def update_camera():
     global cap, running
     if not running or cap is None:
         return
-    ret, frame = cap.read()
-    frame = cv2.flip(frame, 1)  # 🔁 Mirror the frame horizontally
-
+    with METRICS.time("read"):
+        ret, frame = POOL.read(cap)
     if not ret or frame is None:
+        if isinstance(cap, RingCapture) and cap.isOpened():
+            panel.after(10, update_camera)  # no new frame in the ring yet; the daemon is still running
+            return
         stop_camera()
         return
-    annotated, label, color, broken = predict_frame(frame.copy())
-    update_display_bgr(annotated)
+    METRICS.inc("frames_dropped", getattr(cap, "skipped", 0))
+    # 🔁 Mirror the frame horizontally, into our own buffer: predict_frame can draw on it without a copy
+    frame = POOL.flip("mirror", frame, 1)
+
+    annotated, label, color, broken = predict_frame(frame, camera_source)
+    with METRICS.time("display"):
+        update_display_bgr(annotated)
     status_label.config(text=label, fg=color)
+    POOL.end_frame()
+    STARTUP.mark("first_frame")
+    if model is not None:
+        STARTUP.mark("first_prediction")
+        if STARTUP.benchmarking:
+            finish_startup_benchmark()
+            return
     if running:
         panel.after(1, update_camera)
 
@@ -220,13 +390,23 @@ def upload_image():
     if not file_path:
         return
     remove_uploaded_image()
+    show_image_prediction(file_path)
+
+def show_image_prediction(file_path):
+    global pending_image
     img = cv2.imread(file_path)
     if img is None:
         messagebox.showerror("Error", "Could not read the image.")
         return
-    annotated, label, color, broken = predict_frame(img.copy())
+    if model is None and not model_ready.is_set():
+        pending_image = file_path
+    annotated, label, color, broken = predict_frame(img.copy(), f"image:{os.path.basename(file_path)}")
     update_display_bgr(annotated)
-    status_label.config(text=f"✅ {label}", fg=color)
+    status_label.config(text=label if pending_image else f"✅ {label}", fg=color)
+    if model is not None:
+        STARTUP.mark("first_prediction")
+        if STARTUP.benchmarking:
+            finish_startup_benchmark()
 
 def play_video(path):
     global video_running
@@ -236,6 +416,9 @@ def play_video(path):
         messagebox.showerror("Error", "Could not open video.")
         return
     video_running = True
+    # Skipped frames are only grabbed, never converted or analysed
+    frames = VIDEO_SAMPLER.frames(cap_local)
+    source = f"video:{os.path.basename(path)}"
     def process():
         global video_running
         if not video_running:
@@ -244,15 +427,17 @@ def play_video(path):
             except Exception:
                 pass
             return
-        ret, frame = cap_local.read()
-        if not ret:
+        sample = next(frames, None)
+        if sample is None:
             cap_local.release()
+            events.flush()
             status_label.config(text="✅ Video Finished", fg="green")
             video_running = False
             return
-        annotated, label, color, broken = predict_frame(frame.copy())
+        index, seconds, frame = sample
+        annotated, label, color, broken = predict_frame(frame, source, seconds)  # a fresh decode: no copy
         update_display_bgr(annotated)
-        status_label.config(text=label, fg=color)
+        status_label.config(text=f"{label}  ⏱ {timecode(seconds)}", fg=color)
         panel.after(1, process)
     status_label.config(text="🔄 Processing Video...", fg="blue")
     process()
@@ -264,7 +449,8 @@ def upload_video():
         play_video(file_path)
 
 def remove_uploaded_image():
-    global cap, running, video_running
+    global cap, running, video_running, pending_image
+    pending_image = None
     panel.config(image="", text="")
     if hasattr(panel, "image"):
         delattr(panel, "image")
@@ -283,8 +469,9 @@ def remove_uploaded_image():
 
 # === Broken Plate Viewer (Scrollable) ===
 def view_saved_broken_plates():
-    files = sorted([f for f in os.listdir(BROKEN_DIR) if f.lower().endswith((".png", ".jpg", ".jpeg"))])
-    if not files:
+    # Newest first, from the event store instead of a directory listing
+    crops = events.events(label="broken", crops_only=True)
+    if not crops:
         messagebox.showinfo("Info", "No broken plates saved yet.")
         return
     win = tk.Toplevel(root)
@@ -300,8 +487,11 @@ def view_saved_broken_plates():
     frame_win = tk.Frame(canvas_win, bg="#ecf0f1")
     canvas_win.create_window((0, 0), window=frame_win, anchor="nw")
 
-    for f in files:
-        path = os.path.join(BROKEN_DIR, f)
+    for event in crops:
+        path = event["crop_path"]
+        when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(event["time"]))
+        score = f"  ·  {event['confidence']:.2f}" if event["confidence"] is not None else ""
+        caption = f"{os.path.basename(path)}  ·  {when}  ·  {event['source']}{score}"
         try:
             img_cv = cv2.imread(path)
             img_cv = cv2.cvtColor(img_cv, cv2.COLOR_BGR2RGB)
@@ -312,7 +502,7 @@ def view_saved_broken_plates():
             lbl = tk.Label(sub, image=imgtk)
             lbl.image = imgtk
             lbl.pack(padx=6, pady=6)
-            tk.Label(sub, text=f, bg="#ffffff").pack(pady=(0, 6))
+            tk.Label(sub, text=caption, bg="#ffffff").pack(pady=(0, 6))
             sub.pack(fill="x", padx=8, pady=8)
         except Exception as e:
             print("Failed to load:", e)
@@ -334,6 +524,7 @@ def exit_app():
             cap.release()
         except Exception:
             pass
+    events.close()
     root.destroy()
 
 # === GUI Layout ===
@@ -400,4 +591,16 @@ def on_panel_resize(event=None):
 panel.bind("<Configure>", on_panel_resize)
 
 root.protocol("WM_DELETE_WINDOW", exit_app)
+
+# The window comes up right away; YOLO is imported, loaded and warmed up meanwhile
+root.after(0, STARTUP.mark, "window_shown")
+threading.Thread(target=load_model, daemon=True).start()
+root.after(50, poll_model)
+if STARTUP.benchmarking:
+    # Time to first camera frame and first prediction (or to STARTUP_BENCH_IMAGE's prediction)
+    bench_image = os.environ.get("STARTUP_BENCH_IMAGE")
+    if bench_image:
+        pending_image = bench_image
+    else:
+        root.after(0, start_camera)
 root.mainloop()
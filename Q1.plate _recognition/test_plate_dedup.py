@@ -0,0 +1,93 @@
+# ========================= Q1: Plate Crop Deduplication Tests =========================
+import random
+import string
+
+import cv2
+import numpy as np
+import pytest
+
+from plate_dedup import MAX_DISTANCE, TRACK_SECONDS, PlateHashIndex, plate_hash
+
+SEED = 1234
+
+
+def render_plate(text, scale=1.0, jitter=0, noise=0, rng=None):
+    """A synthetic plate crop: dark characters on a light plate, optionally jittered like a new frame."""
+    rng = rng or random.Random(SEED)
+    img = np.full((90, 320, 3), 120, np.uint8)
+    cv2.rectangle(img, (10, 10), (310, 80), (230, 230, 230), -1)
+    cv2.rectangle(img, (12, 12), (308, 78), (20, 20, 20), 2)
+    cv2.putText(img, text, (20, 62), cv2.FONT_HERSHEY_SIMPLEX, 1.25, (10, 10, 10), 3)
+    j = [rng.randint(-jitter, jitter) for _ in range(4)]
+    img = img[10 + j[0]:80 + j[1], 10 + j[2]:310 + j[3]]
+    img = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    if noise:
+        noisy = img.astype(np.int16) + np.random.default_rng(rng.randrange(2**32)).integers(-noise, noise + 1, img.shape)
+        img = cv2.imdecode(cv2.imencode(".jpg", np.clip(noisy, 0, 255).astype(np.uint8),
+                                        [cv2.IMWRITE_JPEG_QUALITY, 70])[1], cv2.IMREAD_COLOR)
+    return img
+
+def random_plate_text(rng):
+    return (rng.choice(["MH", "KA", "DL", "TN", "GJ"]) + f"{rng.randint(1, 99):02d}"
+            + "".join(rng.choices(string.ascii_uppercase, k=2)) + f"{rng.randint(0, 9999):04d}")
+
+def distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+def test_same_plate_in_consecutive_frames_is_within_max_distance():
+    rng = random.Random(SEED)
+    for _ in range(50):
+        text = random_plate_text(rng)
+        base = plate_hash(render_plate(text, rng=rng))
+        frame = render_plate(text, scale=rng.uniform(0.9, 1.1), jitter=2, noise=6, rng=rng)
+        assert distance(base, plate_hash(frame)) <= MAX_DISTANCE
+
+def test_tracked_plate_matches_as_it_moves():
+    rng = random.Random(SEED)
+    index = PlateHashIndex()
+    index.add(plate_hash(render_plate("MH12AB1234", rng=rng)), (100, 400, 400, 470), "vehicle_1.png", now=0.0)
+    # Drifts 60 px per frame across the image; each sighting is near the previous one
+    for step in range(1, 10):
+        box = (100 + 60 * step, 400 - 10 * step, 400 + 60 * step, 470 - 10 * step)
+        crop = render_plate("MH12AB1234", jitter=2, noise=6, rng=rng)
+        assert index.match(plate_hash(crop), box, now=0.1 * step) is not None
+    assert len(index) == 1
+
+def test_similar_plate_elsewhere_in_the_frame_is_not_matched():
+    index = PlateHashIndex()
+    index.add(plate_hash(render_plate("MH12AB1234")), (100, 400, 400, 470), now=0.0)
+    # One character apart: usually within MAX_DISTANCE by appearance alone
+    variant = plate_hash(render_plate("MH12AB1284"))
+    assert index.match(variant, (900, 400, 1200, 470), now=0.1) is None
+
+def test_plate_at_the_same_spot_after_the_track_window_is_saved():
+    index = PlateHashIndex()
+    h = plate_hash(render_plate("MH12AB1234"))
+    index.add(h, (100, 400, 400, 470), now=0.0)
+    assert index.match(h, (100, 400, 400, 470), now=TRACK_SECONDS + 0.5) is None
+    assert len(index) == 0
+
+def test_distinct_plates_at_the_same_spot_are_mostly_kept_apart():
+    rng = random.Random(SEED)
+    texts = list(dict.fromkeys(random_plate_text(rng) for _ in range(60)))
+    hashes = [plate_hash(render_plate(t)) for t in texts]
+    box = (100, 400, 400, 470)
+    merged = 0
+    for i, h in enumerate(hashes[1:], 1):
+        index = PlateHashIndex()
+        index.add(hashes[i - 1], box, now=0.0)
+        merged += index.match(h, box, now=0.1) is not None
+    assert merged / (len(hashes) - 1) < 0.1
+
+@pytest.mark.parametrize("count", [1, 50])
+def test_match_returns_the_closest_tracked_plate(count):
+    rng = random.Random(SEED)
+    index = PlateHashIndex()
+    texts = [random_plate_text(rng) for _ in range(count)]
+    for i, text in enumerate(texts):
+        index.add(plate_hash(render_plate(text)), (400 * i, 0, 400 * i + 300, 70), text, now=0.0)
+    target = count // 2
+    crop = render_plate(texts[target], jitter=2, noise=6, rng=rng)
+    payload, _ = index.match(plate_hash(crop), (400 * target + 20, 5, 400 * target + 320, 75), now=1.0)
+    assert payload == texts[target]
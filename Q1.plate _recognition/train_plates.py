@@ -0,0 +1,213 @@
+# ========================= Q1: Plate Model Training =========================
+# Scripted replacement for q1_training_code.ipynb: trains the broken/non-broken
+# plate detector from a local YOLO-format dataset (the Roboflow export:
+# train/, valid/, test/ with images/ and labels/, plus data.yaml), with no
+# downloads when --offline is given.
+#
+#   python train_plates.py datasets/license-plate-5 --weights yolov8n.pt --cache ram
+#   python train_plates.py datasets/license-plate-5 --resume      # continue the same run
+#
+# Decoded, letterboxed training images are cached in RAM or on disk (--cache),
+# interrupted runs resume from their last.pt, and every epoch appends its
+# throughput and validation mAP to <run>/epochs.jsonl, including the time at
+# which --target-map50 was first reached. The best weights are then published
+# to the model registry (models/), where q1_code.py loads models/current.pt.
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import yaml
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REGISTRY_DIR = os.path.join(HERE, "models")
+CURRENT_MODEL = os.path.join(REGISTRY_DIR, "current.pt")
+RUNS_DIR = os.path.join(HERE, "runs")
+SPLITS = {"train": "train", "val": "valid", "test": "test"}
+
+
+# ------------------ Dataset ------------------
+def dataset_fingerprint(dataset_dir):
+    """Hash of every file's relative path and size: changes when images or labels are added or replaced."""
+    h = hashlib.blake2b(digest_size=8)
+    for root, dirs, files in os.walk(dataset_dir):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            h.update(f"{os.path.relpath(path, dataset_dir)}:{os.path.getsize(path)}\n".encode())
+    return h.hexdigest()
+
+def prepare_data_yaml(dataset_dir, out_path):
+    """Rewrite the dataset's data.yaml with absolute split paths (Roboflow exports use '../train/images')."""
+    with open(os.path.join(dataset_dir, "data.yaml")) as f:
+        data = yaml.safe_load(f)
+    prepared = {"path": os.path.abspath(dataset_dir), "names": data["names"]}
+    for key, folder in SPLITS.items():
+        if os.path.isdir(os.path.join(dataset_dir, folder, "images")):
+            prepared[key] = f"{folder}/images"
+    if "train" not in prepared or "val" not in prepared:
+        raise SystemExit(f"{dataset_dir} needs train/images and valid/images")
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    with open(out_path, "w") as f:
+        yaml.safe_dump(prepared, f, sort_keys=False)
+    return out_path
+
+# ------------------ Epoch log ------------------
+class EpochLogger:
+    """Ultralytics callbacks writing one JSON line per epoch to <run>/epochs.jsonl."""
+
+    def __init__(self, log_path, target_map50):
+        self.log_path = log_path
+        self.target_map50 = target_map50
+        self.train_seconds = 0.0  # summed over earlier (resumed) sessions too
+        self.target_reached = None
+        if os.path.exists(log_path):
+            with open(log_path) as f:
+                for line in f:
+                    entry = json.loads(line)
+                    self.train_seconds = entry["train_seconds_total"]
+                    self.target_reached = self.target_reached or entry.get("target_reached_seconds")
+        self.epoch_start = self.val_start = 0.0
+
+    def attach(self, model):
+        model.add_callback("on_train_epoch_start", self.on_train_epoch_start)
+        model.add_callback("on_train_epoch_end", self.on_train_epoch_end)
+        model.add_callback("on_fit_epoch_end", self.on_fit_epoch_end)
+
+    def on_train_epoch_start(self, trainer):
+        self.epoch_start = time.perf_counter()
+
+    def on_train_epoch_end(self, trainer):
+        self.val_start = time.perf_counter()
+
+    def on_fit_epoch_end(self, trainer):
+        now = time.perf_counter()
+        train_time, val_time = self.val_start - self.epoch_start, now - self.val_start
+        self.train_seconds += now - self.epoch_start
+        images = len(trainer.train_loader.dataset)
+        metrics = trainer.metrics or {}
+        map50 = float(metrics.get("metrics/mAP50(B)", 0.0))
+        if self.target_reached is None and self.target_map50 and map50 >= self.target_map50:
+            self.target_reached = self.train_seconds
+        entry = {
+            "epoch": trainer.epoch + 1,
+            "images": images,
+            "train_seconds": round(train_time, 2),
+            "val_seconds": round(val_time, 2),
+            "images_per_second": round(images / train_time, 1) if train_time > 0 else None,
+            "mAP50": map50,
+            "mAP50-95": float(metrics.get("metrics/mAP50-95(B)", 0.0)),
+            "train_seconds_total": round(self.train_seconds, 2),
+            "target_reached_seconds": self.target_reached,
+        }
+        with open(self.log_path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+        print(f"epoch {entry['epoch']}: {entry['images_per_second']} img/s, mAP50 {map50:.3f}"
+              + (f", target {self.target_map50} reached after {self.target_reached:.0f}s" if self.target_reached else ""))
+
+# ------------------ Registry ------------------
+def registry_entries(registry_dir=REGISTRY_DIR):
+    path = os.path.join(registry_dir, "registry.json")
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+def publish(best_path, metrics, info, registry_dir=REGISTRY_DIR, force=False):
+    """Copy best_path into the registry and make it current.pt, unless the current model scores higher."""
+    entries = registry_entries(registry_dir)
+    current = next((e for e in reversed(entries) if e.get("current")), None)
+    if current and not force and current["metrics"].get("mAP50-95", 0.0) > metrics.get("mAP50-95", 0.0):
+        print(f"Not published: current model {current['file']} has higher mAP50-95 "
+              f"({current['metrics']['mAP50-95']:.3f} > {metrics.get('mAP50-95', 0.0):.3f}); use --force-publish.")
+        return None
+    os.makedirs(registry_dir, exist_ok=True)
+    name = f"plates-{time.strftime('%Y%m%d-%H%M%S')}.pt"
+    shutil.copy2(best_path, os.path.join(registry_dir, name))
+    tmp = os.path.join(registry_dir, f"current.pt.{os.getpid()}.tmp")
+    shutil.copy2(best_path, tmp)
+    os.replace(tmp, os.path.join(registry_dir, "current.pt"))  # readers never see a partial file
+    for e in entries:
+        e["current"] = False
+    entries.append({"file": name, "current": True, "metrics": metrics, **info})
+    tmp = os.path.join(registry_dir, f"registry.json.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(entries, f, indent=2)
+    os.replace(tmp, os.path.join(registry_dir, "registry.json"))
+    print(f"Published {name} as {os.path.join(registry_dir, 'current.pt')}")
+    return name
+
+# ------------------ Main ------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the broken/non-broken plate detector.")
+    parser.add_argument("dataset", help="YOLO-format dataset folder with data.yaml")
+    parser.add_argument("--weights", default="yolov8n.pt", help="starting weights (.pt) or model config (.yaml)")
+    parser.add_argument("--epochs", type=int, default=200)
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--batch", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=8, help="dataloader workers")
+    parser.add_argument("--device", default=None, help="e.g. cpu, 0, 0,1 (default: auto)")
+    parser.add_argument("--cache", choices=("ram", "disk", "none"), default="ram",
+                        help="keep decoded, letterboxed images in RAM or as .npy files next to them")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--name", default="plates", help="run name under runs/")
+    parser.add_argument("--resume", action="store_true", help="continue runs/<name> from its last.pt")
+    parser.add_argument("--target-map50", type=float, default=0.9, help="log when validation mAP50 first reaches this")
+    parser.add_argument("--offline", action="store_true", help="fail instead of downloading weights or fonts")
+    parser.add_argument("--registry", default=REGISTRY_DIR)
+    parser.add_argument("--no-publish", action="store_true")
+    parser.add_argument("--force-publish", action="store_true", help="publish even if the current model scores higher")
+    args = parser.parse_args(argv)
+
+    run_dir = os.path.join(RUNS_DIR, args.name)
+    last = os.path.join(run_dir, "weights", "last.pt")
+    if args.offline:
+        # ultralytics checks connectivity once, when it is imported, so this must come first
+        os.environ["YOLO_OFFLINE"] = "1"
+        if not args.resume and not os.path.exists(args.weights) and not args.weights.endswith(".yaml"):
+            parser.error(f"--offline: {args.weights} is not a local file (use a .pt path or a .yaml config)")
+    if args.resume and not os.path.exists(last):
+        parser.error(f"nothing to resume: {last} not found")
+    from ultralytics import YOLO
+
+    logger = EpochLogger(os.path.join(run_dir, "epochs.jsonl"), args.target_map50)
+    if args.resume:
+        model = YOLO(last)
+        logger.attach(model)
+        model.train(resume=True)
+    else:
+        if os.path.exists(run_dir):
+            parser.error(f"{run_dir} exists; use --resume or another --name")
+        data = prepare_data_yaml(args.dataset, os.path.join(run_dir, "data.yaml"))
+        model = YOLO(args.weights)
+        logger.attach(model)
+        model.train(
+            data=data, epochs=args.epochs, imgsz=args.imgsz, batch=args.batch, workers=args.workers,
+            device=args.device, cache=False if args.cache == "none" else args.cache, seed=args.seed,
+            deterministic=True, augment=True, project=RUNS_DIR, name=args.name, exist_ok=True,
+            plots=not args.offline,
+        )
+
+    best = os.path.join(run_dir, "weights", "best.pt")
+    if args.no_publish or not os.path.exists(best):
+        return 0
+    metrics = YOLO(best).val(data=os.path.join(run_dir, "data.yaml"), imgsz=args.imgsz, plots=False).results_dict
+    info = {
+        "run": os.path.relpath(run_dir, HERE),
+        "dataset": os.path.abspath(args.dataset),
+        "dataset_fingerprint": dataset_fingerprint(args.dataset),
+        "weights": args.weights,
+        "imgsz": args.imgsz,
+        "train_seconds": logger.train_seconds,
+        "target_map50": args.target_map50,
+        "target_reached_seconds": logger.target_reached,
+    }
+    publish(best, {"mAP50": float(metrics.get("metrics/mAP50(B)", 0.0)),
+                   "mAP50-95": float(metrics.get("metrics/mAP50-95(B)", 0.0))},
+            info, args.registry, args.force_publish)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
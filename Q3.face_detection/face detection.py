@@ -1,21 +1,58 @@
 import cv2
-import mediapipe as mp
+import numpy as np
 import tkinter as tk
 from tkinter import ttk
 from PIL import Image, ImageTk
 import datetime
 import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.startup import StartupTimer
+STARTUP = StartupTimer()
+from common.camera_probe import open_first_camera
+from common.frame_pool import FramePool
+from common.frame_ring import RingCapture
+from common.metrics import Metrics
+
+# Prometheus endpoint / JSON log via METRICS_PORT / METRICS_LOG (see common/metrics.py)
+METRICS = Metrics("q3_faces").start_from_env()
+# Reused per-frame buffers (FRAME_POOL_DEBUG=1 reports allocations)
+POOL = FramePool()
 
 # --- MediaPipe Models ---
-mp_face_detection = mp.solutions.face_detection
-mp_face_mesh = mp.solutions.face_mesh
-mp_drawing = mp.solutions.drawing_utils
+# Built on a background thread once the window is up (load_models); frames are shown unannotated until then
+mp_face_mesh = None
+mp_drawing = None
+face_detection = None
+face_mesh = None
+models_ready = threading.Event()
+models_error = None
 
-face_detection = mp_face_detection.FaceDetection(min_detection_confidence=0.5)
-face_mesh = mp_face_mesh.FaceMesh(max_num_faces=5, refine_landmarks=True)
+def load_models():
+    global mp_face_mesh, mp_drawing, face_detection, face_mesh, models_error
+    try:
+        import mediapipe as mp
+        STARTUP.mark("imports_done")
+        detection = mp.solutions.face_detection.FaceDetection(min_detection_confidence=0.5)
+        mesh = mp.solutions.face_mesh.FaceMesh(max_num_faces=5, refine_landmarks=True)
+        STARTUP.mark("model_loaded")
+        # One dummy frame through both graphs, so the first camera frame doesn't pay for setup
+        blank = np.zeros((480, 640, 3), np.uint8)
+        detection.process(blank)
+        mesh.process(blank)
+        STARTUP.mark("warmed_up")
+        mp_face_mesh, mp_drawing = mp.solutions.face_mesh, mp.solutions.drawing_utils
+        face_detection, face_mesh = detection, mesh
+    except Exception as e:
+        models_error = e
+    models_ready.set()
 
 # --- Globals ---
 cap = None
+# Read frames from a capture daemon (python -m common.frame_ring) instead of a camera
+FRAME_RING = os.environ.get("FRAME_RING")
 recording = False
 out = None
 
@@ -28,12 +65,36 @@ class DarkStyle(ttk.Style):
         self.map('TButton', foreground=[('active', 'white')], background=[('active', '#0055ff')])
 
 # --- Functions ---
+def poll_models():
+    if not models_ready.is_set():
+        root.after(50, poll_models)
+        return
+    if models_error is not None:
+        status_bar.config(text=f"Face models failed to load: {models_error}")
+    else:
+        status_bar.config(text=f"Face models ready ({STARTUP.marks['warmed_up']:.1f}s after start)")
+    if STARTUP.benchmarking and (models_error is not None or cap is None):
+        finish_startup_benchmark()  # nothing more to wait for
+
+def finish_startup_benchmark():
+    # STARTUP_BENCH is set: write the marks and exit after the first processed frame
+    STARTUP.write()
+    print(STARTUP.report())
+    close_on_q()
+
 def start_camera():
     global cap
     if cap is None:
-        cap = cv2.VideoCapture(0, cv2.CAP_DSHOW)
+        if FRAME_RING:
+            cap = RingCapture(FRAME_RING)
+        else:
+            # All indexes at once, the last working one first (see common/camera_probe.py)
+            cap, _ = open_first_camera(range(5), cv2.CAP_DSHOW, key="q3_faces")
+            if cap is None:
+                status_bar.config(text="No camera found")
+                return
         update_frame()
-        status_bar.config(text="Camera Opened")
+        status_bar.config(text="Camera Opened" if models_ready.is_set() else "Camera Opened (loading face models...)")
 
 def stop_camera():
     global cap, out, recording
@@ -81,19 +142,27 @@ def take_snapshot():
 def update_frame():
     global cap, recording, out
     if cap:
-        ret, frame = cap.read()
+        with METRICS.time("read"):
+            ret, frame = POOL.read(cap)
         if ret:
+            METRICS.inc("frames_dropped", getattr(cap, "skipped", 0))
             # 🪞 Mirror the frame horizontally
-            frame = cv2.flip(frame, 1)
+            frame = POOL.flip("mirror", frame, 1)
 
             h, w, _ = frame.shape
-            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            rgb = POOL.cvt_color("rgb", frame, cv2.COLOR_BGR2RGB)
 
-            face_results = face_detection.process(rgb)
-            mesh_results = face_mesh.process(rgb)
+            face_results = mesh_results = None
+            if face_mesh is not None:
+                with METRICS.time("face_detection"):
+                    face_results = face_detection.process(rgb)
+                with METRICS.time("face_mesh"):
+                    mesh_results = face_mesh.process(rgb)
+                METRICS.inc("frames_processed")
+                METRICS.inc("detections", len(face_results.detections or []))
 
             # Draw bounding boxes for all detected faces
-            if face_results.detections:
+            if face_results and face_results.detections:
                 for i, detection in enumerate(face_results.detections):
                     bboxC = detection.location_data.relative_bounding_box
                     x, y, bw, bh = int(bboxC.xmin * w), int(bboxC.ymin * h), int(bboxC.width * w), int(bboxC.height * h)
@@ -102,7 +171,7 @@ def update_frame():
                                 cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
 
             # Draw reduced mesh and label features
-            if mesh_results.multi_face_landmarks:
+            if mesh_results and mesh_results.multi_face_landmarks:
                 for landmarks in mesh_results.multi_face_landmarks:
                     mp_drawing.draw_landmarks(
                         image=frame,
@@ -144,13 +213,23 @@ def update_frame():
 
             if recording and out:
                 out.write(frame)  # ✅ Write mirrored frame
+                METRICS.inc("frames_recorded")
 
             # Display in Tkinter
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            img = Image.fromarray(frame_rgb)
-            imgtk = ImageTk.PhotoImage(image=img)
-            video_label.imgtk = imgtk
-            video_label.configure(image=imgtk)
+            with METRICS.time("display"):
+                # The models are done with rgb, so the annotated frame reuses its buffer
+                frame_rgb = POOL.cvt_color("rgb", frame, cv2.COLOR_BGR2RGB)
+                img = Image.fromarray(frame_rgb)
+                imgtk = ImageTk.PhotoImage(image=img)
+                video_label.imgtk = imgtk
+                video_label.configure(image=imgtk)
+            POOL.end_frame()
+            STARTUP.mark("first_frame")
+            if face_mesh is not None:
+                STARTUP.mark("first_prediction")
+                if STARTUP.benchmarking:
+                    finish_startup_benchmark()
+                    return
 
         video_label.after(10, update_frame)
 
@@ -198,4 +277,10 @@ ttk.Button(control_frame, text="Take Snapshot", command=take_snapshot).pack(fill
 status_bar = tk.Label(root, text="Ready", bg="#0d1a3a", fg="white", anchor='w')
 status_bar.pack(fill=tk.X, side=tk.BOTTOM)
 
+# The window comes up right away; MediaPipe is imported and both graphs are built meanwhile
+root.after(0, STARTUP.mark, "window_shown")
+threading.Thread(target=load_models, daemon=True).start()
+root.after(50, poll_models)
+if STARTUP.benchmarking:
+    root.after(0, start_camera)  # time to the first camera frame and the first processed one
 root.mainloop()
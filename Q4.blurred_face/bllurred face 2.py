@@ -7,6 +7,17 @@ from tkinter import ttk
 from PIL import Image, ImageTk
 import sys
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.frame_pool import FramePool
+from common.frame_ring import RingCapture
+from common.metrics import Metrics
+from face_redaction import detect_faces, load_cascade, redact
+
+# Prometheus endpoint / JSON log via METRICS_PORT / METRICS_LOG (see common/metrics.py)
+METRICS = Metrics("q4_blur").start_from_env()
+# Reused per-frame buffers (FRAME_POOL_DEBUG=1 reports allocations)
+POOL = FramePool()
+
 # --- Globals ---
 cap = None
 is_recording = False
@@ -16,28 +27,24 @@ prev_time = 0
 last_faces = []
 fourcc = cv2.VideoWriter_fourcc(*'mp4v')
 output_dir = "recordings"
+# Read frames from a capture daemon (python -m common.frame_ring) instead of a camera
+FRAME_RING = os.environ.get("FRAME_RING")
 os.makedirs(output_dir, exist_ok=True)
 
-# --- Haar Cascade (using OpenCV’s built-in file) ---
-import cv2.data
-face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+# --- Haar Cascade (OpenCV’s built-in file; same detector settings as redact_video.py) ---
+face_cascade = load_cascade()
 
 # --- Helper Functions ---
 def make_filename():
     t = datetime.now().strftime("%Y%m%d_%H%M%S")
     return os.path.join(output_dir, f"recording_{t}.mp4")
 
-def pixelate_face(roi, blocks=15):
-    h, w = roi.shape[:2]
-    temp = cv2.resize(roi, (blocks, blocks), interpolation=cv2.INTER_LINEAR)
-    return cv2.resize(temp, (w, h), interpolation=cv2.INTER_NEAREST)
-
 # --- Camera Functions ---
 def start_camera():
     global cap
     if cap is None:
         print("Opening camera...")
-        cap = cv2.VideoCapture(0, cv2.CAP_MSMF)
+        cap = RingCapture(FRAME_RING) if FRAME_RING else cv2.VideoCapture(0, cv2.CAP_MSMF)
         if not cap.isOpened():
             status_label.config(text="Error: Camera not found", foreground="#ff4d6d")
             return
@@ -88,14 +95,17 @@ def stop_recording():
 def update_frame():
     global cap, prev_time, last_faces, is_recording, recorder
     if cap:
-        ret, frame = cap.read()
+        with METRICS.time("read"):
+            ret, frame = POOL.read(cap)
         if ret:
-            frame = cv2.flip(frame, 1)  # 🪞 Mirror the frame horizontally
+            METRICS.inc("frames_dropped", getattr(cap, "skipped", 0))
+            frame = POOL.flip("mirror", frame, 1)  # 🪞 Mirror the frame horizontally
 
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            faces = face_cascade.detectMultiScale(
-                gray, scaleFactor=1.1, minNeighbors=5, minSize=(60, 60)
-            )
+            with METRICS.time("detect"):
+                gray = POOL.cvt_color("gray", frame, cv2.COLOR_BGR2GRAY)
+                faces = detect_faces(face_cascade, frame, gray=gray)
+            METRICS.inc("frames_processed")
+            METRICS.inc("detections", len(faces))
 
             if len(faces) == 0 and len(last_faces) > 0:
                 faces = last_faces
@@ -103,16 +113,14 @@ def update_frame():
                 last_faces = faces
 
             if blur_enabled:
-                for (x, y, w, h) in faces:
-                    roi = frame[y:y+h, x:x+w]
-                    roi_pix = pixelate_face(roi, blocks=20)
-                    roi_blur = cv2.GaussianBlur(roi_pix, (51, 51), 30)
-                    frame[y:y+h, x:x+w] = roi_blur
+                with METRICS.time("blur"):
+                    redact(frame, faces)  # pixelate + Gaussian blur (face_redaction.py)
 
             # FPS
             curr_time = time.time()
             fps = 1 / (curr_time - prev_time) if prev_time else 0
             prev_time = curr_time
+            METRICS.gauge("fps", fps)
             cv2.putText(frame, f"FPS: {fps:.1f}", (10, 30),
                         cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
 
@@ -121,17 +129,20 @@ def update_frame():
                             cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 0, 0), 2)
                 if recorder:
                     recorder.write(frame)
+                    METRICS.inc("frames_recorded")
 
             # Resize frame for label
             label_width = video_label.winfo_width() or 800
             label_height = video_label.winfo_height() or 600
-            frame = cv2.resize(frame, (label_width, label_height))
-
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            img = Image.fromarray(frame_rgb)
-            imgtk = ImageTk.PhotoImage(image=img)
-            video_label.imgtk = imgtk
-            video_label.configure(image=imgtk)
+            frame = POOL.resize("display", frame, (label_width, label_height))
+
+            with METRICS.time("display"):
+                frame_rgb = POOL.cvt_color("display_rgb", frame, cv2.COLOR_BGR2RGB)
+                img = Image.fromarray(frame_rgb)
+                imgtk = ImageTk.PhotoImage(image=img)
+                video_label.imgtk = imgtk
+                video_label.configure(image=imgtk)
+            POOL.end_frame()
 
         video_label.after(10, update_frame)
 
@@ -0,0 +1,57 @@
+# ========================= Q4: Face Redaction =========================
+# Haar-cascade face detection and the pixelate + Gaussian blur used to
+# anonymize faces, shared by the live app (bllurred face 2.py) and the
+# offline redaction command (redact_video.py).
+import cv2
+import cv2.data
+
+CASCADE_PATH = cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
+SCALE_FACTOR = 1.1
+MIN_NEIGHBORS = 5
+MIN_SIZE = 60  # px, smallest face at full resolution
+PIXEL_BLOCKS = 20
+BLUR_KERNEL = (51, 51)
+BLUR_SIGMA = 30
+
+
+def load_cascade(path=CASCADE_PATH):
+    cascade = cv2.CascadeClassifier(path)
+    if cascade.empty():
+        raise OSError(f"cannot load face cascade {path}")
+    return cascade
+
+def detect_faces(cascade, frame, detect_width=None, gray=None):
+    """Face boxes (x, y, w, h) in frame coordinates, detected on a copy at most detect_width wide.
+
+    gray: the frame already converted to grayscale (e.g. into a reused buffer), to skip the conversion.
+    """
+    if gray is None:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    scale = 1.0
+    if detect_width and gray.shape[1] > detect_width:
+        scale = detect_width / gray.shape[1]
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    min_size = max(24, int(MIN_SIZE * scale))  # 24 px is the cascade's own window
+    faces = cascade.detectMultiScale(gray, scaleFactor=SCALE_FACTOR, minNeighbors=MIN_NEIGHBORS,
+                                     minSize=(min_size, min_size))
+    if scale == 1.0:
+        return list(faces)
+    return [tuple(int(round(v / scale)) for v in face) for face in faces]
+
+def pixelate_face(roi, blocks=15):
+    h, w = roi.shape[:2]
+    temp = cv2.resize(roi, (blocks, blocks), interpolation=cv2.INTER_LINEAR)
+    return cv2.resize(temp, (w, h), interpolation=cv2.INTER_NEAREST)
+
+def redact(frame, faces, margin=0.0):
+    """Pixelate and blur each face box in place, grown by margin times its size on each side."""
+    fh, fw = frame.shape[:2]
+    for (x, y, w, h) in faces:
+        dx, dy = int(w * margin), int(h * margin)
+        x1, y1 = max(0, x - dx), max(0, y - dy)
+        x2, y2 = min(fw, x + w + dx), min(fh, y + h + dy)
+        if x2 <= x1 or y2 <= y1:
+            continue
+        roi_pix = pixelate_face(frame[y1:y2, x1:x2], blocks=PIXEL_BLOCKS)
+        frame[y1:y2, x1:x2] = cv2.GaussianBlur(roi_pix, BLUR_KERNEL, BLUR_SIGMA)
+    return frame
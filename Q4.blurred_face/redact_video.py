@@ -0,0 +1,193 @@
+# ========================= Q4: Offline Video Redaction =========================
+# Anonymizes recorded videos (e.g. recordings/ made with blur switched off)
+# with the live app's face detection and pixelation, faster than real time:
+#
+#   python redact_video.py recordings/ --workers 4
+#   python redact_video.py recordings/recording_20250928_185049.mp4 --output-dir archive/
+#
+# Each video is cut into SEGMENT_SECONDS frame ranges that a process pool
+# redacts independently (each worker seeks to its range and writes its own
+# segment file). The segments are then joined with ffmpeg's concat demuxer
+# without re-encoding, keeping the source's container metadata (creation time
+# etc.) and dropping any audio. Without ffmpeg the segments are re-encoded
+# into one file with OpenCV instead, and a warning is printed.
+#
+# Faces are detected on every frame; a face that is missed for up to
+# HOLD_FRAMES frames keeps its last box, so detector flicker doesn't leak it.
+import argparse
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import cv2
+
+from face_redaction import detect_faces, load_cascade, redact
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv")
+SEGMENT_SECONDS = 20.0
+HOLD_FRAMES = 5
+DETECT_WIDTH = 960  # px; wider frames are downscaled for detection only
+FOURCC = "mp4v"  # same codec as the live app's recordings
+
+_cascade = None  # loaded once per worker process
+
+
+# ------------------ Inputs ------------------
+def collect_videos(inputs):
+    videos = []
+    for item in inputs:
+        if os.path.isdir(item):
+            videos += sorted(os.path.join(item, name) for name in os.listdir(item)
+                             if name.lower().endswith(VIDEO_EXTENSIONS))
+        else:
+            videos.append(item)
+    return videos
+
+def probe(path):
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise OSError(f"cannot open video {path}")
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    finally:
+        cap.release()
+    if fps <= 0 or frames <= 0:
+        raise OSError(f"{path}: unknown frame rate or length")
+    return fps, frames, size
+
+def plan_segments(frames, fps, seconds=SEGMENT_SECONDS):
+    length = max(1, int(round(seconds * fps)))
+    return [(start, min(frames, start + length)) for start in range(0, frames, length)]
+
+# ------------------ Workers ------------------
+def init_worker():
+    global _cascade
+    cv2.setNumThreads(1)  # parallelism comes from the processes
+    _cascade = load_cascade()
+
+def redact_segment(task):
+    """Redact frames [start, end) of a video into out_path; returns (start, frames written, faces found)."""
+    path, start, end, out_path, fps, size, detect_width, margin = task
+    cap = cv2.VideoCapture(path)
+    writer = cv2.VideoWriter(out_path, cv2.VideoWriter_fourcc(*FOURCC), fps, size)
+    written = found = 0
+    held, missed = [], HOLD_FRAMES + 1
+    try:
+        if start:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+        for _ in range(start, end):
+            ok, frame = cap.read()
+            if not ok:
+                break
+            faces = detect_faces(_cascade, frame, detect_width)
+            found += len(faces)
+            if faces:
+                held, missed = faces, 0
+            else:
+                missed += 1
+                if missed <= HOLD_FRAMES:
+                    faces = held
+            writer.write(redact(frame, faces, margin))
+            written += 1
+    finally:
+        cap.release()
+        writer.release()
+    return start, written, found
+
+# ------------------ Joining ------------------
+def join_segments(segment_paths, source, output):
+    """Concatenate segment files into output; returns True if no re-encoding was needed."""
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg:
+        list_path = os.path.join(os.path.dirname(segment_paths[0]), "segments.txt")
+        with open(list_path, "w") as f:
+            for path in segment_paths:
+                # Quoted for the concat demuxer: ' becomes '\''
+                quoted = os.path.abspath(path).replace("'", "'\\''")
+                f.write(f"file '{quoted}'\n")
+        subprocess.run([ffmpeg, "-loglevel", "error", "-y", "-f", "concat", "-safe", "0", "-i", list_path,
+                        "-i", source, "-map", "0:v", "-map_metadata", "1", "-c", "copy", "-an", output],
+                       check=True)
+        return True
+    writer = None
+    for path in segment_paths:
+        cap = cv2.VideoCapture(path)
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            if writer is None:
+                writer = cv2.VideoWriter(output, cv2.VideoWriter_fourcc(*FOURCC), cap.get(cv2.CAP_PROP_FPS),
+                                         (frame.shape[1], frame.shape[0]))
+            writer.write(frame)
+        cap.release()
+    if writer is not None:
+        writer.release()
+    return False
+
+def redact_video(path, output, pool, segment_seconds=SEGMENT_SECONDS, detect_width=DETECT_WIDTH, margin=0.1):
+    """Redact one video into output with pool; returns (frames, faces, seconds of video, lossless join)."""
+    fps, frames, size = probe(path)
+    work_dir = tempfile.mkdtemp(prefix=".redact-", dir=os.path.dirname(os.path.abspath(output)))
+    try:
+        segments = plan_segments(frames, fps, segment_seconds)
+        tasks = [(path, start, end, os.path.join(work_dir, f"segment_{i:05d}.mp4"), fps, size, detect_width, margin)
+                 for i, (start, end) in enumerate(segments)]
+        results = sorted(pool.imap_unordered(redact_segment, tasks))
+        segment_paths = [task[3] for task, (_, written, _) in zip(tasks, results) if written]
+        if not segment_paths:
+            raise OSError(f"{path}: no frames could be read")
+        lossless = join_segments(segment_paths, path, output)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    written = sum(r[1] for r in results)
+    return written, sum(r[2] for r in results), written / fps, lossless
+
+# ------------------ Main ------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pixelate faces in recorded videos.")
+    parser.add_argument("inputs", nargs="+", help="video files and folders")
+    parser.add_argument("--output-dir", default="redacted")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--segment-seconds", type=float, default=SEGMENT_SECONDS)
+    parser.add_argument("--detect-width", type=int, default=DETECT_WIDTH, help="0: detect at full resolution")
+    parser.add_argument("--margin", type=float, default=0.1, help="grow each face box by this fraction per side")
+    args = parser.parse_args(argv)
+
+    videos = collect_videos(args.inputs)
+    if not videos:
+        parser.error("no videos found")
+    try:
+        load_cascade()  # fail here rather than in every worker
+    except (OSError, AttributeError) as e:
+        parser.error(f"face detector unavailable: {e}")
+    os.makedirs(args.output_dir, exist_ok=True)
+    if not shutil.which("ffmpeg"):
+        print("ffmpeg not found: segments will be re-encoded while joining", file=sys.stderr)
+
+    failed = 0
+    with multiprocessing.Pool(max(1, args.workers), initializer=init_worker) as pool:
+        for path in videos:
+            stem = os.path.splitext(os.path.basename(path))[0]
+            output = os.path.join(args.output_dir, f"{stem}_redacted.mp4")
+            started = time.perf_counter()
+            try:
+                frames, faces, duration, _ = redact_video(path, output, pool, args.segment_seconds,
+                                                          args.detect_width, args.margin)
+            except (OSError, subprocess.CalledProcessError) as e:
+                print(f"{path}: {e}", file=sys.stderr)
+                failed += 1
+                continue
+            elapsed = time.perf_counter() - started
+            print(f"{path} -> {output}: {frames} frames, {faces} face detections, "
+                  f"{duration:.1f}s of video in {elapsed:.1f}s ({duration / elapsed:.1f}x real time)")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -3,11 +3,60 @@ from tkinter import scrolledtext, ttk
 from difflib import SequenceMatcher
 
 # --- Core function ---
+# One matcher is reused between calls: difflib caches its index of str2, so
+# when only the first string changes (set_seq1) that work is not repeated.
+_matcher = SequenceMatcher(None, '', '')
+# Expansion of each opcode into report/alignment rows, keyed by its text, so
+# opcodes unchanged since the previous comparison are not expanded again.
+_segment_cache = {}
+SEGMENT_CACHE_SIZE = 4096
+
+def expand_opcode(tag, a, b):
+    report, s1, s2, line, colors = [], [], [], [], []
+    matches = mismatches = 0
+    if tag == 'equal':
+        for c1, c2 in zip(a, b):
+            report.append(f"Match: {c1} == {c2}")
+            s1.append(c1)
+            s2.append(c2)
+            line.append('|')
+            matches += 1
+            colors.append('match')
+    elif tag == 'replace':
+        for c1, c2 in zip(a, b):
+            report.append(f"Mismatch: {c1} != {c2}")
+            s1.append(c1)
+            s2.append(c2)
+            line.append('.')
+            mismatches += 1
+            colors.append('mismatch')
+    elif tag == 'insert':
+        for c in b:
+            report.append(f"Inserted in str2: {c}")
+            s1.append('-')
+            s2.append(c)
+            line.append('.')
+            mismatches += 1
+            colors.append('mismatch')
+    elif tag == 'delete':
+        for c in a:
+            report.append(f"Deleted from str1: {c}")
+            s1.append(c)
+            s2.append('-')
+            line.append('.')
+            mismatches += 1
+            colors.append('mismatch')
+    return report, ''.join(s1), ''.join(s2), ''.join(line), matches, mismatches, colors
+
 def string_similarity_alignment(str1, str2):
-    matcher = SequenceMatcher(None, str1, str2)
-    ratio = matcher.ratio()
-    similarity_percentage = ratio * 100
-    
+    if _matcher.b != str2:
+        _matcher.set_seq2(str2)
+    if _matcher.a != str1:
+        _matcher.set_seq1(str1)
+    similarity_percentage = _matcher.ratio() * 100
+
+    if len(_segment_cache) > SEGMENT_CACHE_SIZE:
+        _segment_cache.clear()
     match_report = []
     aligned_str1 = []
     aligned_str2 = []
@@ -16,62 +65,48 @@ def string_similarity_alignment(str1, str2):
     mismatch_count = 0
     color_info = []
 
-    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
-        if tag == 'equal':
-            for c1, c2 in zip(str1[i1:i2], str2[j1:j2]):
-                match_report.append(f"Match: {c1} == {c2}")
-                aligned_str1.append(c1)
-                aligned_str2.append(c2)
-                alignment_line.append('|')
-                match_count += 1
-                color_info.append('match')
-        elif tag == 'replace':
-            for c1, c2 in zip(str1[i1:i2], str2[j1:j2]):
-                match_report.append(f"Mismatch: {c1} != {c2}")
-                aligned_str1.append(c1)
-                aligned_str2.append(c2)
-                alignment_line.append('.')
-                mismatch_count += 1
-                color_info.append('mismatch')
-        elif tag == 'insert':
-            for c in str2[j1:j2]:
-                match_report.append(f"Inserted in str2: {c}")
-                aligned_str1.append('-')
-                aligned_str2.append(c)
-                alignment_line.append('.')
-                mismatch_count += 1
-                color_info.append('mismatch')
-        elif tag == 'delete':
-            for c in str1[i1:i2]:
-                match_report.append(f"Deleted from str1: {c}")
-                aligned_str1.append(c)
-                aligned_str2.append('-')
-                alignment_line.append('.')
-                mismatch_count += 1
-                color_info.append('mismatch')
+    for tag, i1, i2, j1, j2 in _matcher.get_opcodes():
+        key = (tag, str1[i1:i2], str2[j1:j2])
+        segment = _segment_cache.get(key)
+        if segment is None:
+            segment = _segment_cache[key] = expand_opcode(*key)
+        report, s1, s2, line, matches, mismatches, colors = segment
+        match_report.extend(report)
+        aligned_str1.append(s1)
+        aligned_str2.append(s2)
+        alignment_line.append(line)
+        match_count += matches
+        mismatch_count += mismatches
+        color_info.extend(colors)
 
     return (similarity_percentage, match_report,
             ''.join(aligned_str1), ''.join(aligned_str2),
             ''.join(alignment_line), match_count + mismatch_count,
             match_count, mismatch_count, color_info)
 
-# --- GUI Function ---
-def run_similarity():
-    str1 = entry1.get()
-    str2 = entry2.get()
-    
-    if not str1 or not str2:
-        for tab in [similarity_text, visual_text, report_text, summary_text]:
-            tab.configure(state='normal')
-            tab.delete('1.0', tk.END)
-            tab.insert(tk.END, "Please enter both strings.")
-            tab.configure(state='disabled')
-        return
-    
-    (similarity, report, a_str1, a_str2, alignment, total_chars,
-     match_count, mismatch_count, color_info) = string_similarity_alignment(str1, str2)
+# --- Live Comparison State ---
+DEBOUNCE_MS = 150          # wait this long after the last keystroke
+REPORT_CHUNK_LINES = 500   # match report lines inserted per event-loop tick
+pending_job = None         # after() id of the scheduled comparison
+generation = 0             # bumped whenever current_result changes; renders of older generations stop
+current_result = None      # (str1, str2, result) of the latest comparison
+rendered = {}              # tab frame name -> generation it shows
 
-    # ---- Similarity Tab ----
+def schedule_similarity(*args):
+    global pending_job
+    if pending_job is not None:
+        root.after_cancel(pending_job)
+    pending_job = root.after(DEBOUNCE_MS, run_similarity)
+
+def set_text(widget, text):
+    widget.configure(state='normal')
+    widget.delete('1.0', tk.END)
+    widget.insert(tk.END, text)
+    widget.configure(state='disabled')
+
+# --- Tab Renderers ---
+def render_similarity(result, gen):
+    similarity = result[0]
     similarity_text.configure(state='normal')
     similarity_text.delete('1.0', tk.END)
     similarity_text.tag_configure('heading', font=('Helvetica', 16, 'bold'), foreground="#00BFFF")
@@ -80,33 +115,48 @@ def run_similarity():
     similarity_text.insert(tk.END, f"{similarity:.2f}%\n", 'value')
     similarity_text.configure(state='disabled')
 
-    # ---- Visual Alignment Tab ----
+def insert_colored(widget, text, color_info):
+    # One insert per run of equally colored characters instead of one per character
+    start = 0
+    for idx in range(1, len(text) + 1):
+        if idx == len(text) or color_info[idx] != color_info[start]:
+            widget.insert(tk.END, text[start:idx], color_info[start])
+            start = idx
+
+def render_visual(result, gen):
+    a_str1, a_str2, alignment, color_info = result[2], result[3], result[4], result[8]
     visual_text.configure(state='normal')
     visual_text.delete('1.0', tk.END)
     visual_text.tag_configure('match', foreground='#00FFCC', font=('Consolas', 14, 'bold'))
     visual_text.tag_configure('mismatch', foreground='#FF5555', font=('Consolas', 14, 'bold'))
     visual_text.insert(tk.END, "Visual Alignment:\n\n", 'match')
-    for idx, char in enumerate(a_str1):
-        visual_text.insert(tk.END, char, color_info[idx])
+    insert_colored(visual_text, a_str1, color_info)
     visual_text.insert(tk.END, "\n")
-    for idx, char in enumerate(alignment):
-        visual_text.insert(tk.END, char, color_info[idx])
+    insert_colored(visual_text, alignment, color_info)
     visual_text.insert(tk.END, "\n")
-    for idx, char in enumerate(a_str2):
-        visual_text.insert(tk.END, char, color_info[idx])
+    insert_colored(visual_text, a_str2, color_info)
     visual_text.configure(state='disabled')
 
-    # ---- Match Report Tab ----
+def render_report(result, gen, start=0):
+    report = result[1]
+    if gen != generation:
+        return  # input changed since this render started
     report_text.configure(state='normal')
-    report_text.delete('1.0', tk.END)
-    report_text.tag_configure('heading', font=('Helvetica', 16, 'bold'), foreground="#00BFFF")
-    report_text.tag_configure('line', font=('Consolas', 14))
-    report_text.insert(tk.END, "Match Report:\n\n", 'heading')
-    for line in report:
-        report_text.insert(tk.END, line + "\n", 'line')
+    if start == 0:
+        report_text.delete('1.0', tk.END)
+        report_text.tag_configure('heading', font=('Helvetica', 16, 'bold'), foreground="#00BFFF")
+        report_text.tag_configure('line', font=('Consolas', 14))
+        report_text.insert(tk.END, "Match Report:\n\n", 'heading')
+    chunk = report[start:start + REPORT_CHUNK_LINES]
+    if chunk:
+        report_text.insert(tk.END, "\n".join(chunk) + "\n", 'line')
     report_text.configure(state='disabled')
+    if start + REPORT_CHUNK_LINES < len(report):
+        # Long reports are inserted a chunk per tick so typing stays responsive
+        root.after(1, render_report, result, gen, start + REPORT_CHUNK_LINES)
 
-    # ---- Summary Tab ----
+def render_summary(result, gen):
+    total_chars, match_count, mismatch_count = result[5], result[6], result[7]
     summary_text.configure(state='normal')
     summary_text.delete('1.0', tk.END)
     summary_text.tag_configure('heading', font=('Helvetica', 16, 'bold'), foreground="#00BFFF")
@@ -117,6 +167,39 @@ def run_similarity():
     summary_text.insert(tk.END, f"Mismatched characters: {mismatch_count}\n", 'value')
     summary_text.configure(state='disabled')
 
+def render_visible_tab(event=None):
+    tab = notebook.select()
+    if not tab or rendered.get(tab) == generation:
+        return
+    rendered[tab] = generation
+    widget, renderer = TAB_RENDERERS[tab]
+    if current_result is None:
+        set_text(widget, "Please enter both strings.")
+    else:
+        renderer(current_result[2], generation)
+
+# --- GUI Function ---
+def run_similarity():
+    global pending_job, current_result, generation
+    if pending_job is not None:
+        root.after_cancel(pending_job)
+        pending_job = None
+    str1 = entry1.get()
+    str2 = entry2.get()
+
+    if not str1 or not str2:
+        result = None
+    elif current_result is not None and current_result[:2] == (str1, str2):
+        result = current_result
+    else:
+        result = (str1, str2, string_similarity_alignment(str1, str2))
+    if result is not current_result:
+        # Bumped with the result itself, so a tab drawn while the comparison was pending is redrawn
+        current_result = result
+        generation += 1
+    # Only the visible tab is drawn now; the others when they are selected
+    render_visible_tab()
+
 # --- Exit Function ---
 def exit_app(event=None):
     root.destroy()
@@ -140,13 +223,19 @@ input_frame = tk.Frame(root, bg="#1a1a1a", padx=15, pady=15)
 input_frame.pack(fill='x', padx=10, pady=10)
 
 tk.Label(input_frame, text="Enter first string:", bg="#1a1a1a", fg="#00BFFF", font=label_font).grid(row=0, column=0, sticky="w", pady=5)
-entry1 = tk.Entry(input_frame, width=70, font=entry_font, bg="#333333", fg="white", insertbackground="white")
+str1_var = tk.StringVar()
+entry1 = tk.Entry(input_frame, textvariable=str1_var, width=70, font=entry_font, bg="#333333", fg="white", insertbackground="white")
 entry1.grid(row=0, column=1, padx=5, pady=5)
 
 tk.Label(input_frame, text="Enter second string:", bg="#1a1a1a", fg="#00BFFF", font=label_font).grid(row=1, column=0, sticky="w", pady=5)
-entry2 = tk.Entry(input_frame, width=70, font=entry_font, bg="#333333", fg="white", insertbackground="white")
+str2_var = tk.StringVar()
+entry2 = tk.Entry(input_frame, textvariable=str2_var, width=70, font=entry_font, bg="#333333", fg="white", insertbackground="white")
 entry2.grid(row=1, column=1, padx=5, pady=5)
 
+# Compare live as the user types (debounced); the button compares immediately
+str1_var.trace_add('write', schedule_similarity)
+str2_var.trace_add('write', schedule_similarity)
+
 run_button = tk.Button(input_frame, text="Check Similarity", command=run_similarity,
                        bg="#00BFFF", fg="black", font=button_font, padx=10, pady=5)
 run_button.grid(row=2, column=0, columnspan=2, pady=15)
@@ -185,4 +274,12 @@ report_text.pack(fill='both', expand=True, padx=5, pady=5)
 summary_text = scrolledtext.ScrolledText(summary_tab, font=('Consolas', 16), bg="#333333", fg="white", insertbackground="white", state='disabled')
 summary_text.pack(fill='both', expand=True, padx=5, pady=5)
 
+TAB_RENDERERS = {
+    str(similarity_tab): (similarity_text, render_similarity),
+    str(visual_tab): (visual_text, render_visual),
+    str(report_tab): (report_text, render_report),
+    str(summary_tab): (summary_text, render_summary),
+}
+notebook.bind('<<NotebookTabChanged>>', render_visible_tab)
+
 root.mainloop()
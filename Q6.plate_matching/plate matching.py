@@ -1,64 +1,240 @@
 # ========================= Q6: Automated License Plate Testing =========================
+import asyncio
+import json
+import os
 import random
-import string
+import time
+import numpy as np
 import pytest
-from difflib import SequenceMatcher
-
-# ------------------ Core function ------------------
-def string_similarity_alignment(str1, str2):
-    matcher = SequenceMatcher(None, str1, str2)
-    similarity_percentage = matcher.ratio() * 100
-    return similarity_percentage
-
-# ------------------ License Plate Generators ------------------
-def random_valid_plate():
-    state = ''.join(random.choices(string.ascii_uppercase, k=2))
-    district = ''.join(random.choices(string.digits, k=2))
-    series = ''.join(random.choices(string.ascii_uppercase, k=2))
-    number = str(random.randint(1, 9999))
-    return f"{state}{district}{series}{number}"
-
-def random_invalid_plate(valid_plate, failure_chance=0.05):
-    """Generate invalid plate; sometimes accidental match to simulate failure."""
-    if random.random() < failure_chance:
-        return valid_plate
-    plate = list(valid_plate)
-    while True:
-        idx = random.randint(0, len(plate)-1)
-        new_char = random.choice(string.ascii_uppercase + string.digits)
-        if plate[idx] != new_char:
-            plate[idx] = new_char
-            break
-    return ''.join(plate)
-
-# ------------------ Generate Test Plates ------------------
-NUM_TESTS = 1000
-valid_plates = [random_valid_plate() for _ in range(NUM_TESTS // 2)]
-invalid_plates = [random_invalid_plate(p, failure_chance=0.05) for p in valid_plates]
+from concurrent.futures import ProcessPoolExecutor
+
+from plate_generator import (random_valid_plate, random_invalid_plate,
+                             generate_pairs, check_chunk)
+from plate_similarity import string_similarity_alignment, BACKENDS
+from plate_index import PlateIndex
+from plate_benchmark import ALPHANUMERIC, CONFUSABLES, OcrErrorModel, make_pairs, precision_recall
+from similarity_service import SimilarityService
+from plate_format import (STATE_CODES, normalize_plate, normalize_many, validate_many,
+                          positional_score, screen_candidates)
+
+# ------------------ Test Configuration ------------------
+# Small by default so a plain pytest run stays quick; large runs are opt-in from the
+# environment, e.g. PLATE_NUM_TESTS=2000000 or PLATE_NUM_TESTS=20000000 PLATE_WORKERS=16
+NUM_TESTS = int(os.environ.get("PLATE_NUM_TESTS", 20_000))
+CHUNK_SIZE = int(os.environ.get("PLATE_CHUNK_SIZE", 50_000))
+WORKERS = int(os.environ.get("PLATE_WORKERS", os.cpu_count() or 1))
+SEED = int(os.environ.get("PLATE_SEED", random.randrange(2**32)))
+# Chance that an "invalid" plate accidentally equals the valid one (simulated failures)
+FAILURE_CHANCE = float(os.environ.get("PLATE_FAILURE_CHANCE", 0.0))
+MAX_REPORTED = 20
+
+# ------------------ Chunked Test Driver ------------------
+def run_checks(num_pairs=NUM_TESTS // 2, chunk_size=CHUNK_SIZE, workers=WORKERS,
+               seed=SEED, failure_chance=FAILURE_CHANCE):
+    """Check num_pairs valid/invalid pairs in chunks; returns the failing cases only."""
+    sizes = [min(chunk_size, num_pairs - start) for start in range(0, num_pairs, chunk_size)]
+    args = [(string_similarity_alignment, seed, chunk, size, failure_chance)
+            for chunk, size in enumerate(sizes)]
+    failures = []
+    if workers <= 1 or len(args) <= 1:
+        for a in args:
+            failures.extend(check_chunk(*a))
+        return failures
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk_failures in pool.map(check_chunk, *zip(*args)):
+            failures.extend(chunk_failures)
+    return failures
+
+def format_failures(failures):
+    lines = [f"{len(failures)} failing case(s); reproduce a case with "
+             f"generate_pairs(seed, chunk, size, {FAILURE_CHANCE}) and index by row"]
+    for f in failures[:MAX_REPORTED]:
+        lines.append(f"  seed={f['seed']} chunk={f['chunk']} size={f['size']} row={f['row']}: "
+                     f"{f['plate']!r} vs {f['other']!r} -> {f['similarity']:.2f}%")
+    if len(failures) > MAX_REPORTED:
+        lines.append(f"  ... {len(failures) - MAX_REPORTED} more")
+    return "\n".join(lines)
 
 # ------------------ Pytest Tests ------------------
-@pytest.mark.parametrize("plate", valid_plates)
-def test_valid_plate(plate):
-    similarity = string_similarity_alignment(plate, plate)
-    assert similarity == 100
-
-@pytest.mark.parametrize("valid,invalid", zip(valid_plates, invalid_plates))
-def test_invalid_plate(valid, invalid):
-    similarity = string_similarity_alignment(valid, invalid)
+@pytest.fixture(scope="module")
+def failures():
+    return run_checks()
+
+def test_valid_plates(failures):
+    valid_failures = [f for f in failures if f["kind"] == "valid"]
+    assert not valid_failures, format_failures(valid_failures)
+
+def test_invalid_plates(failures):
+    invalid_failures = [f for f in failures if f["kind"] == "invalid"]
     # Invalid plate should ideally be less than 100
-    assert similarity < 100
+    assert not invalid_failures, format_failures(invalid_failures)
+
+def test_generator_is_reproducible():
+    assert generate_pairs(SEED, 3, 100) == generate_pairs(SEED, 3, 100)
+    assert generate_pairs(SEED, 3, 100) != generate_pairs(SEED, 4, 100)
+
+def test_generator_matches_plate_scheme():
+    valid_plates, invalid_plates = generate_pairs(SEED, 0, 1000, failure_chance=0.0)
+    for valid, invalid in zip(valid_plates, invalid_plates):
+        assert valid[:2] in STATE_CODES and valid[2:4].isdigit() and valid[4:6].isalpha()
+        assert valid[6:].isdigit() and 1 <= int(valid[6:]) <= 9999 and valid[6] != "0"
+        assert len(invalid) == len(valid)
+        assert sum(a != b for a, b in zip(valid, invalid)) == 1
+
+def test_scalar_generators():
+    plate = random_valid_plate()
+    assert random_invalid_plate(plate, failure_chance=0.0) != plate
+    assert random_invalid_plate(plate, failure_chance=1.0) == plate
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+def test_similarity_backends(backend):
+    similarity = BACKENDS[backend]
+    assert similarity("MH12AB1234", "MH12AB1234") == 100
+    assert similarity("MH12AB1234", "MH12AB1284") < 100
+    assert similarity("MH12AB1234", "") == 0
+
+def test_levenshtein_similarity():
+    assert BACKENDS["levenshtein"]("KA01AB123", "KA01AB1234") == pytest.approx(90.0)
+    assert BACKENDS["levenshtein"]("KA01AB1234", "KA01A81234") == pytest.approx(90.0)
+
+def test_generated_plates_validate():
+    valid_plates, _ = generate_pairs(SEED, 0, 10000)
+    assert validate_many(valid_plates).all()
+    assert normalize_many(valid_plates) == valid_plates
+
+@pytest.mark.parametrize("text,expected", [
+    ("MH12AB1234", "MH12AB1234"),
+    ("mh-12 ab 1234", "MH12AB1234"),
+    ("MH12A81234", "MH12AB1234"),    # 8 read for B in the series
+    ("MHI2AB1234", "MH12AB1234"),    # I read for 1 in the district
+    ("MH12AB12O4", "MH12AB1204"),    # O read for 0 in the number
+    ("K412AB1234", "KA12AB1234"),    # 4 read for A in the state code
+    ("DL3CAB0001", "DL3CAB0001"),
+    ("GJ1K45", "GJ1K45"),
+    ("XX12AB1234", None),            # unknown state code
+    ("MH12ABCD1234", None),          # series too long
+    ("", None),
+])
+def test_normalize_plate(text, expected):
+    assert normalize_plate(text) == expected
+
+def test_validate_many_matches_scalar():
+    texts = ["MH12AB1234", "", "KA01AB12345", "TN9Z1", "MH12AB1234X", "DL3CAB0001", "AB12"]
+    assert validate_many(texts).tolist() == [normalize_plate(t) == t for t in texts]
+
+def test_positional_score():
+    assert positional_score("MH12AB1234", "MH12AB1284") == 90
+    assert positional_score("MH12AB1234", "MH12A1234") is None
+
+def test_screen_candidates_skips_definite_mismatches():
+    candidates = ["MH12AB1234", "MH12AB1284", "??", "KA1", "MH12AB1"]
+    scores, aligned = screen_candidates("MH12AB1234", candidates, threshold=90)
+    assert scores[0] == 100 and scores[1] == pytest.approx(90)
+    assert scores[2] == scores[3] == scores[4] == 0
+    assert aligned == 1
+
+def test_plate_index_matches_brute_force():
+    registry, readings = generate_pairs(SEED, 0, 2000)
+    index = PlateIndex(registry)
+    normalized, results = index.search_many(readings[:20], k=3)
+    for query, matches in zip(normalized, results):
+        if query is None:
+            assert matches == []
+            continue
+        expected = sorted((string_similarity_alignment(query, p) for p in index.plates), reverse=True)[:3]
+        assert [score for _, score in matches] == pytest.approx(expected)
+
+def test_similarity_service_batches_concurrent_queries():
+    registry, readings = generate_pairs(SEED, 0, 500)
+    index = PlateIndex(registry)
+
+    async def scenario():
+        service = SimilarityService(index, max_wait_ms=50)
+        server = await service.start(port=0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        for i, reading in enumerate(readings[:20]):
+            writer.write(json.dumps({"id": i, "query": reading, "k": 2, "align": True}).encode() + b"\n")
+        writer.write(json.dumps({"id": "s", "op": "stats"}).encode() + b"\n")
+        await writer.drain()
+        replies = [json.loads(await reader.readline()) for _ in range(21)]
+        writer.close()
+        server.close()
+        service.worker.cancel()
+        return service, {r["id"]: r for r in replies}
+
+    service, replies = asyncio.run(scenario())
+    assert service.batches < 20
+    for i, reading in enumerate(readings[:20]):
+        expected = index.search(reading, k=2)
+        assert [(m["plate"], m["score"]) for m in replies[i]["matches"]] == [tuple(m) for m in expected]
+        for m in replies[i]["matches"]:
+            assert len(set(map(len, m["alignment"]))) == 1
+    assert replies["s"]["registry_size"] == len(index)
+
+def error_rate(model, plate, trials=20000, seed=SEED):
+    """Fraction of per-character readings of `plate` that differ from it, and the readings."""
+    rng = random.Random(seed)
+    readings = [model.corrupt(plate, rng) for _ in range(trials)]
+    return sum(r != plate for r in readings) / trials, readings
+
+@pytest.mark.parametrize("band,expected", [
+    ("confusable", 0.0),        # K has no look-alikes: the band leaves it unchanged
+    ("substitution", 0.2 * (len(ALPHANUMERIC) - 1) / len(ALPHANUMERIC)),
+    ("insertion", 0.2),
+    ("deletion", 0.2),
+])
+def test_ocr_error_bands_on_a_plain_character(band, expected):
+    model = OcrErrorModel(**{"confusable": 0, "substitution": 0, "insertion": 0, "deletion": 0, band: 0.2})
+    rate, _ = error_rate(model, "K")
+    assert rate == pytest.approx(expected, abs=0.01)
+
+def test_ocr_confusable_band_uses_look_alikes():
+    model = OcrErrorModel(confusable=0.2, substitution=0, insertion=0, deletion=0)
+    rate, readings = error_rate(model, "O")
+    assert rate == pytest.approx(0.2, abs=0.01)
+    assert {r for r in readings if r != "O"} <= set(CONFUSABLES["O"])
+
+def test_ocr_bands_do_not_overlap():
+    # Confusable + substitution on a character without look-alikes: only the substitution band applies
+    model = OcrErrorModel(confusable=0.3, substitution=0.1, insertion=0, deletion=0)
+    rate, _ = error_rate(model, "K")
+    assert rate == pytest.approx(0.1 * (len(ALPHANUMERIC) - 1) / len(ALPHANUMERIC), abs=0.01)
+
+def test_make_pairs_is_reproducible_and_leaves_global_rng_alone():
+    random.seed(99)
+    expected_next = random.random()
+    random.seed(99)
+    pairs = make_pairs(400, OcrErrorModel(), seed=7)
+    assert random.random() == expected_next
+    assert pairs == make_pairs(400, OcrErrorModel(), seed=7)
+    assert pairs != make_pairs(400, OcrErrorModel(), seed=8)
+    assert sum(same for _, _, same in pairs) == 200
+
+def test_precision_recall_on_known_scores():
+    scores = np.array([100, 90, 80, 70, 60, 50])
+    labels = np.array([True, True, False, True, False, False])
+    rows = {r["threshold"]: r for r in precision_recall(scores, labels, thresholds=[75, 65, 110])}
+    assert (rows[75]["precision"], rows[75]["recall"]) == pytest.approx((2 / 3, 2 / 3))
+    assert (rows[65]["precision"], rows[65]["recall"]) == pytest.approx((3 / 4, 1.0))
+    assert rows[65]["f1"] == pytest.approx(2 * 0.75 / 1.75)
+    assert (rows[110]["precision"], rows[110]["recall"], rows[110]["f1"]) == (1.0, 0.0, 0.0)
 
 # ------------------ Run pytest with verbose output and custom summary ------------------
 if __name__ == "__main__":
     print("Running Automated License Plate Tests...\n")
+    print(f"Seed: {SEED} | pairs: {NUM_TESTS // 2} | chunk size: {CHUNK_SIZE} | workers: {WORKERS}\n")
+    os.environ["PLATE_SEED"] = str(SEED)  # pytest re-imports this file
+    start = time.perf_counter()
     # Run pytest in verbose mode
     exit_code = pytest.main([__file__, "-v", "--disable-warnings"])
+    elapsed = time.perf_counter() - start
 
     # Custom summary
     print("\n=== CUSTOM SUMMARY ===")
-    print(f"Total tests executed: {NUM_TESTS}")
+    print(f"Total plate checks executed: {NUM_TESTS} in {elapsed:.1f}s ({NUM_TESTS / elapsed:,.0f}/s)")
     if exit_code == 0:
         print("All tests passed ✅")
     else:
-        print("Some tests failed ❌ (see verbose output above)")
+        print("Some tests failed ❌ (failing cases and their seeds are listed above)")
     print("=====================")
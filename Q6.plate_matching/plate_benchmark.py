@@ -0,0 +1,198 @@
+# ========================= Q6: Plate Similarity Benchmark =========================
+# Measures speed (comparisons/s, latency percentiles, peak memory) and
+# discriminative power (precision/recall per threshold) of every backend in
+# plate_similarity.BACKENDS on OCR-like errors, and writes the results as JSON.
+#
+#   python plate_benchmark.py --pairs 20000 --output results.json --compare old.json
+import argparse
+import json
+import platform
+import random
+import string
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+
+from plate_generator import random_valid_plate, random_invalid_plate
+from plate_similarity import BACKENDS
+
+# Characters OCR engines commonly confuse on Indian plates
+CONFUSABLES = {
+    'O': '0DQ', '0': 'ODQ', 'D': '0O', 'Q': 'O0',
+    'I': '1LT', '1': 'IL7', 'L': '1I', 'T': '1I', '7': '1T',
+    'B': '8', '8': 'B3', 'S': '5', '5': 'S', 'Z': '2', '2': 'Z',
+    'G': '6C', '6': 'G', 'A': '4', '4': 'A', 'E': 'F', 'F': 'E',
+    'U': 'V', 'V': 'U', 'M': 'N', 'N': 'M', 'H': 'M', 'C': 'G',
+}
+ALPHANUMERIC = string.ascii_uppercase + string.digits
+THRESHOLDS = [50, 60, 70, 75, 80, 85, 90, 95, 100]
+
+# ------------------ OCR Error Model ------------------
+class OcrErrorModel:
+    """Per-character error probabilities applied to a clean plate string."""
+
+    def __init__(self, confusable=0.04, substitution=0.01, insertion=0.005, deletion=0.01):
+        self.confusable = confusable
+        self.substitution = substitution
+        self.insertion = insertion
+        self.deletion = deletion
+
+    def as_dict(self):
+        return dict(vars(self))
+
+    def corrupt(self, plate, rng):
+        out = []
+        for c in plate:
+            r = rng.random()
+            if r < self.deletion:
+                continue
+            r -= self.deletion
+            if r < self.confusable:
+                # Characters without look-alikes keep this band, so it doesn't inflate substitutions
+                c = rng.choice(CONFUSABLES[c]) if c in CONFUSABLES else c
+            elif r < self.confusable + self.substitution:
+                c = rng.choice(ALPHANUMERIC)
+            out.append(c)
+            if rng.random() < self.insertion:
+                out.append(rng.choice(ALPHANUMERIC))
+        return ''.join(out)
+
+def make_pairs(n, error_model, seed):
+    """n labelled (plate, ocr_reading, same_plate) triples.
+
+    Half are positives (a reading of the same plate). Negatives are split
+    between near misses (a one-character-different plate, see
+    random_invalid_plate) and unrelated plates.
+    """
+    rng = random.Random(seed)  # local, so callers' global RNG state is left alone
+    pairs = []
+    for i in range(n):
+        plate = random_valid_plate(rng)
+        if i % 2 == 0:
+            pairs.append((plate, error_model.corrupt(plate, rng), True))
+        elif i % 4 == 1:
+            other = random_invalid_plate(plate, failure_chance=0.0, rng=rng)
+            pairs.append((plate, error_model.corrupt(other, rng), False))
+        else:
+            pairs.append((plate, error_model.corrupt(random_valid_plate(rng), rng), False))
+    return pairs
+
+# ------------------ Measurements ------------------
+def measure_throughput(similarity, pairs, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for a, b, _ in pairs:
+            similarity(a, b)
+        best = min(best, time.perf_counter() - start)
+    return len(pairs) / best
+
+def measure_latency(similarity, pairs):
+    clock = time.perf_counter_ns
+    latencies = np.empty(len(pairs), dtype=np.int64)
+    scores = np.empty(len(pairs), dtype=np.float64)
+    for i, (a, b, _) in enumerate(pairs):
+        t0 = clock()
+        scores[i] = similarity(a, b)
+        latencies[i] = clock() - t0
+    p50, p90, p99, p999 = np.percentile(latencies, [50, 90, 99, 99.9]) / 1000
+    return scores, {"p50_us": p50, "p90_us": p90, "p99_us": p99, "p999_us": p999,
+                    "max_us": latencies.max() / 1000}
+
+def measure_memory(similarity, pairs):
+    tracemalloc.start()
+    for a, b, _ in pairs:
+        similarity(a, b)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+def precision_recall(scores, labels, thresholds=THRESHOLDS):
+    rows = []
+    for t in thresholds:
+        predicted = scores >= t
+        tp = int(np.sum(predicted & labels))
+        fp = int(np.sum(predicted & ~labels))
+        fn = int(np.sum(~predicted & labels))
+        precision = tp / (tp + fp) if tp + fp else 1.0
+        recall = tp / (tp + fn) if tp + fn else 1.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        rows.append({"threshold": t, "precision": precision, "recall": recall, "f1": f1})
+    return rows
+
+def benchmark_backend(similarity, pairs, repeat=3):
+    labels = np.array([same for _, _, same in pairs], dtype=bool)
+    scores, latency = measure_latency(similarity, pairs)
+    return {
+        "comparisons_per_sec": measure_throughput(similarity, pairs, repeat),
+        "latency": latency,
+        "peak_memory_bytes": measure_memory(similarity, pairs),
+        "accuracy": precision_recall(scores, labels),
+    }
+
+def run_benchmark(n_pairs=20000, seed=0, backends=None, error_model=None, repeat=3):
+    error_model = error_model or OcrErrorModel()
+    pairs = make_pairs(n_pairs, error_model, seed)
+    backends = backends or list(BACKENDS)
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "pairs": n_pairs,
+            "seed": seed,
+            "error_model": error_model.as_dict(),
+        },
+        "backends": {},
+    }
+    for name in backends:
+        print(f"Benchmarking {name} ...", flush=True)
+        results["backends"][name] = benchmark_backend(BACKENDS[name], pairs, repeat)
+    return results
+
+# ------------------ Reporting ------------------
+def print_report(results, baseline=None):
+    print(f"\n=== SIMILARITY BENCHMARK ({results['meta']['pairs']} pairs) ===")
+    for name, r in results["backends"].items():
+        best = max(r["accuracy"], key=lambda row: row["f1"])
+        line = (f"{name:<22} {r['comparisons_per_sec']:>12,.0f} cmp/s  "
+                f"p50 {r['latency']['p50_us']:6.1f}us  p99 {r['latency']['p99_us']:7.1f}us  "
+                f"peak {r['peak_memory_bytes'] / 1024:7.1f} KiB  "
+                f"best F1 {best['f1']:.3f} @ {best['threshold']}")
+        old = (baseline or {}).get("backends", {}).get(name)
+        if old:
+            change = r["comparisons_per_sec"] / old["comparisons_per_sec"] - 1
+            line += f"  ({change:+.1%} vs baseline)"
+        print(line)
+    print("=" * 40)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark plate similarity backends.")
+    parser.add_argument("--pairs", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="throughput runs (best is kept)")
+    parser.add_argument("--backends", nargs="+", choices=sorted(BACKENDS), default=None)
+    parser.add_argument("--confusable", type=float, default=0.04)
+    parser.add_argument("--substitution", type=float, default=0.01)
+    parser.add_argument("--insertion", type=float, default=0.005)
+    parser.add_argument("--deletion", type=float, default=0.01)
+    parser.add_argument("--output", default="plate_benchmark.json")
+    parser.add_argument("--compare", help="earlier results file to compare throughput against")
+    args = parser.parse_args(argv)
+
+    error_model = OcrErrorModel(args.confusable, args.substitution, args.insertion, args.deletion)
+    results = run_benchmark(args.pairs, args.seed, args.backends, error_model, args.repeat)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
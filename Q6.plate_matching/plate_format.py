@@ -0,0 +1,137 @@
+# ========================= Q6: Plate Format Validation & Normalization =========================
+# Indian plates: state code, district (1-2 digits), series (0-3 letters), number (1-4 digits)
+#   MH12AB1234, DL3CAB0001, GJ1K45
+# Bharat-series plates (22BH1234AA) use a different layout and are not handled here.
+import re
+from itertools import product
+
+import numpy as np
+
+from plate_similarity import string_similarity_alignment
+
+STATE_CODES = (
+    "AN", "AP", "AR", "AS", "BR", "CG", "CH", "DD", "DL", "DN", "GA", "GJ", "HP",
+    "HR", "JH", "JK", "KA", "KL", "LA", "LD", "MH", "ML", "MN", "MP", "MZ", "NL",
+    "OD", "OR", "PB", "PY", "RJ", "SK", "TN", "TR", "TS", "UK", "UP", "WB",
+)
+_STATES = '|'.join(STATE_CODES)
+PLATE_PATTERN = rf"(?P<state>{_STATES})(?P<district>[0-9]{{1,2}})(?P<series>[A-Z]{{0,3}})(?P<number>[0-9]{{1,4}})"
+PLATE_RE = re.compile(PLATE_PATTERN)
+
+# OCR look-alikes, used to repair characters that are in the wrong class for their position
+TO_LETTER = {'0': 'O', '1': 'I', '2': 'Z', '4': 'A', '5': 'S', '6': 'G', '7': 'T', '8': 'B'}
+TO_DIGIT = {'O': '0', 'D': '0', 'Q': '0', 'I': '1', 'L': '1', 'T': '7', 'Z': '2',
+            'A': '4', 'S': '5', 'G': '6', 'B': '8'}
+_DIGITS = frozenset('0123456789')
+_SEPARATORS = str.maketrans('', '', ' -._/\\|·\t\n')
+
+
+# ------------------ Normalization ------------------
+def clean_plate(text):
+    """Upper-case and drop separators: 'mh-12 ab 1234' -> 'MH12AB1234'."""
+    return text.upper().translate(_SEPARATORS)
+
+def _as_letters(chars):
+    out = []
+    for c in chars:
+        if c in _DIGITS:
+            if c not in TO_LETTER:
+                return None, 0
+            c = TO_LETTER[c]
+        out.append(c)
+    return ''.join(out), sum(a != b for a, b in zip(chars, out))
+
+def _as_digits(chars):
+    out = []
+    for c in chars:
+        if c not in _DIGITS:
+            if c not in TO_DIGIT:
+                return None, 0
+            c = TO_DIGIT[c]
+        out.append(c)
+    return ''.join(out), sum(a != b for a, b in zip(chars, out))
+
+def repair_plate(text):
+    """Cheapest look-alike repair of a cleaned string that fails PLATE_RE, or None."""
+    state, cost = _as_letters(text[:2])
+    if state not in STATE_CODES:
+        return None
+    rest = text[2:]
+    best = None
+    # district 2 / series 2 is the common layout, so it wins ties
+    for d_len, s_len in product((2, 1), (2, 3, 1, 0)):
+        n_len = len(rest) - d_len - s_len
+        if not 1 <= n_len <= 4:
+            continue
+        district, c1 = _as_digits(rest[:d_len])
+        series, c2 = _as_letters(rest[d_len:d_len + s_len])
+        number, c3 = _as_digits(rest[d_len + s_len:])
+        if district is None or series is None or number is None:
+            continue
+        total = cost + c1 + c2 + c3
+        candidate = state + district + series + number
+        if (best is None or total < best[0]) and PLATE_RE.fullmatch(candidate):
+            best = (total, candidate)
+    return best[1] if best else None
+
+def normalize_plate(text):
+    """Canonical plate string, or None if it can't be an Indian plate."""
+    plate = clean_plate(text)
+    if PLATE_RE.fullmatch(plate):
+        return plate
+    return repair_plate(plate)
+
+def parse_plate(text):
+    """(state, district, series, number) of a normalized plate, or None."""
+    m = PLATE_RE.fullmatch(text)
+    return m.groups() if m else None
+
+
+# ------------------ Bulk validation ------------------
+def validate_many(plates):
+    """Boolean mask of which (already cleaned) strings are valid plates."""
+    plates = list(plates)
+    # map() keeps the per-item loop in C; the compiled regex does the matching
+    return np.fromiter(map(bool, map(PLATE_RE.fullmatch, plates)), dtype=bool, count=len(plates))
+
+def normalize_many(texts):
+    """normalize_plate() over a batch; invalid entries become None."""
+    cleaned = [clean_plate(t) for t in texts]
+    valid = validate_many(cleaned)
+    return [p if ok else repair_plate(p) for p, ok in zip(cleaned, valid)]
+
+
+# ------------------ Scoring pre-pass ------------------
+def positional_score(plate1, plate2):
+    """Per-segment positional match percentage, or None if the layouts differ."""
+    parts1, parts2 = parse_plate(plate1), parse_plate(plate2)
+    if parts1 is None or parts2 is None or [len(p) for p in parts1] != [len(p) for p in parts2]:
+        return None
+    return sum(c1 == c2 for c1, c2 in zip(plate1, plate2)) / len(plate1) * 100
+
+def length_bound(plate1, plate2):
+    """Upper bound of the SequenceMatcher percentage from the lengths alone."""
+    total = len(plate1) + len(plate2)
+    return 200 * min(len(plate1), len(plate2)) / total if total else 100.0
+
+def screen_candidates(query, candidates, threshold=0.0, similarity=string_similarity_alignment):
+    """Score query against candidates, sending only plausible pairs to full alignment.
+
+    Malformed strings and pairs whose length bound is below threshold score 0
+    without running similarity(). Returns (scores, number_of_full_alignments).
+    """
+    query = normalize_plate(query)
+    normalized = normalize_many(candidates)
+    scores = np.zeros(len(normalized), dtype=np.float64)
+    aligned = 0
+    if query is None:
+        return scores, aligned
+    for i, plate in enumerate(normalized):
+        if plate is None:
+            continue
+        if plate == query:
+            scores[i] = 100.0
+        elif length_bound(query, plate) >= threshold:
+            scores[i] = similarity(query, plate)
+            aligned += 1
+    return scores, aligned
@@ -0,0 +1,111 @@
+# ========================= Q6: License Plate Generators =========================
+import random
+import string
+
+import numpy as np
+
+from plate_format import STATE_CODES
+
+PLATE_WIDTH = 10  # XX00XX0000 -> longest plate is 10 characters
+LETTERS = np.frombuffer(string.ascii_uppercase.encode(), dtype=np.uint8)
+DIGITS = np.frombuffer(string.digits.encode(), dtype=np.uint8)
+ALPHANUMERIC = np.concatenate([LETTERS, DIGITS])
+STATES = np.frombuffer(''.join(STATE_CODES).encode(), dtype=np.uint8).reshape(-1, 2)
+
+# byte value -> position in ALPHANUMERIC (used to pick a *different* character)
+_ALNUM_INDEX = np.full(256, -1, dtype=np.int16)
+_ALNUM_INDEX[ALPHANUMERIC] = np.arange(len(ALPHANUMERIC))
+
+
+# ------------------ Scalar generators (one plate at a time) ------------------
+# rng: a random.Random for reproducible plates; the module-level RNG by default
+def random_valid_plate(rng=random):
+    state = rng.choice(STATE_CODES)
+    district = ''.join(rng.choices(string.digits, k=2))
+    series = ''.join(rng.choices(string.ascii_uppercase, k=2))
+    number = str(rng.randint(1, 9999))
+    return f"{state}{district}{series}{number}"
+
+def random_invalid_plate(valid_plate, failure_chance=0.05, rng=random):
+    """Generate invalid plate; sometimes accidental match to simulate failure."""
+    if rng.random() < failure_chance:
+        return valid_plate
+    plate = list(valid_plate)
+    while True:
+        idx = rng.randint(0, len(plate)-1)
+        new_char = rng.choice(string.ascii_uppercase + string.digits)
+        if plate[idx] != new_char:
+            plate[idx] = new_char
+            break
+    return ''.join(plate)
+
+
+# ------------------ Vectorized generators (NumPy uint8 plates) ------------------
+# Plates are stored as an (n, PLATE_WIDTH) uint8 array of ASCII codes, padded
+# with zeros on the right, plus an (n,) array of lengths.
+
+def generate_valid_plates(n, rng):
+    """Vectorized random_valid_plate(): returns (plates, lengths)."""
+    rng = np.random.default_rng(rng)
+    plates = np.zeros((n, PLATE_WIDTH), dtype=np.uint8)
+    plates[:, 0:2] = STATES[rng.integers(0, len(STATES), size=n)]
+    plates[:, 2:4] = rng.choice(DIGITS, size=(n, 2))
+    plates[:, 4:6] = rng.choice(LETTERS, size=(n, 2))
+
+    # Number is 1..9999 written without leading zeros
+    number = rng.integers(1, 10000, size=n)
+    n_digits = 1 + (number >= 10) + (number >= 100) + (number >= 1000)
+    padded = (number[:, None] // 10 ** np.arange(3, -1, -1)) % 10
+    idx = np.arange(4)[None, :] + (4 - n_digits)[:, None]
+    digits = np.take_along_axis(padded, np.minimum(idx, 3), axis=1)
+    plates[:, 6:] = np.where(idx < 4, digits + ord('0'), 0)
+    return plates, 6 + n_digits
+
+def generate_invalid_plates(plates, lengths, rng, failure_chance=0.05):
+    """Vectorized random_invalid_plate(): change one character of every plate."""
+    rng = np.random.default_rng(rng)
+    n = len(plates)
+    invalid = plates.copy()
+    rows = np.arange(n)
+    pos = rng.integers(0, lengths)
+    # Shift by 1..35 inside the alphabet so the new character always differs
+    offset = rng.integers(1, len(ALPHANUMERIC), size=n)
+    current = _ALNUM_INDEX[plates[rows, pos]]
+    invalid[rows, pos] = ALPHANUMERIC[(current + offset) % len(ALPHANUMERIC)]
+    # Accidental matches simulate recognition failures
+    keep = rng.random(n) < failure_chance
+    invalid[keep] = plates[keep]
+    return invalid
+
+def decode_plates(plates):
+    """(n, PLATE_WIDTH) uint8 array -> list of str (zero padding is dropped)."""
+    plates = np.ascontiguousarray(plates, dtype=np.uint8)
+    return plates.view(f"S{plates.shape[1]}")[:, 0].astype(str).tolist()
+
+def chunk_rng(seed, chunk):
+    """Reproducible generator for one chunk of a run."""
+    return np.random.default_rng([seed, chunk])
+
+def generate_pairs(seed, chunk, size, failure_chance=0.05):
+    """Valid/invalid plate pairs for one chunk, as lists of str."""
+    rng = chunk_rng(seed, chunk)
+    plates, lengths = generate_valid_plates(size, rng)
+    invalid = generate_invalid_plates(plates, lengths, rng, failure_chance)
+    return decode_plates(plates), decode_plates(invalid)
+
+
+# ------------------ Chunked checking ------------------
+def check_chunk(similarity, seed, chunk, size, failure_chance=0.05):
+    """Check one chunk of pairs and return only the failing cases."""
+    valid_plates, invalid_plates = generate_pairs(seed, chunk, size, failure_chance)
+    failures = []
+    for row, (valid, invalid) in enumerate(zip(valid_plates, invalid_plates)):
+        score = similarity(valid, valid)
+        if score != 100:
+            failures.append({"kind": "valid", "seed": seed, "chunk": chunk, "size": size, "row": row,
+                             "plate": valid, "other": valid, "similarity": score})
+        score = similarity(valid, invalid)
+        if score >= 100:
+            failures.append({"kind": "invalid", "seed": seed, "chunk": chunk, "size": size, "row": row,
+                             "plate": valid, "other": invalid, "similarity": score})
+    return failures
@@ -0,0 +1,93 @@
+# ========================= Q6: Plate Registry Index =========================
+# Top-k lookup of OCR readings against a registry of known plates.
+#
+# Every registry plate is stored as a character histogram. For a batch of
+# queries the histogram intersection with all plates is computed in one NumPy
+# pass; 200 * intersection / (len1 + len2) is SequenceMatcher.quick_ratio(),
+# an upper bound of the exact score. Plates are then scored exactly in order
+# of that bound, stopping once the bound can no longer beat the k-th best.
+import string
+
+import numpy as np
+
+from plate_format import normalize_many, normalize_plate
+from plate_similarity import string_similarity_alignment
+
+ALPHABET = string.ascii_uppercase + string.digits
+_CHAR_INDEX = np.full(256, -1, dtype=np.int16)
+_CHAR_INDEX[np.frombuffer(ALPHABET.encode(), dtype=np.uint8)] = np.arange(len(ALPHABET))
+MAX_CHUNK_BYTES = 64 * 1024 * 1024  # cap on the (queries x plates x alphabet) temporary
+
+
+def char_histograms(plates):
+    """(n, len(ALPHABET)) uint8 counts of each character in each plate."""
+    width = max(map(len, plates), default=0)
+    padded = ''.join(p.ljust(width, '\0') for p in plates).encode('ascii', errors='replace')
+    codes = _CHAR_INDEX[np.frombuffer(padded, dtype=np.uint8)].reshape(len(plates), width)
+    flat = (np.arange(len(plates))[:, None] * len(ALPHABET) + codes)[codes >= 0]
+    counts = np.bincount(flat, minlength=len(plates) * len(ALPHABET))
+    return counts.reshape(len(plates), len(ALPHABET)).astype(np.uint8)
+
+def load_registry(path):
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+class PlateIndex:
+    def __init__(self, plates):
+        normalized = [p for p in normalize_many(plates) if p is not None]
+        self.plates = list(dict.fromkeys(normalized))  # de-duplicated, order kept
+        self.positions = {p: i for i, p in enumerate(self.plates)}
+        self.lengths = np.array([len(p) for p in self.plates], dtype=np.int32)
+        self.counts = char_histograms(self.plates)
+
+    def __len__(self):
+        return len(self.plates)
+
+    def upper_bounds(self, queries):
+        """(len(queries), len(self)) quick_ratio upper bounds, in percent."""
+        q_counts = char_histograms(queries)
+        q_lengths = np.array([len(q) for q in queries], dtype=np.int32)
+        bounds = np.empty((len(queries), len(self)), dtype=np.float64)
+        step = max(1, MAX_CHUNK_BYTES // max(1, len(queries) * len(ALPHABET)))
+        for start in range(0, len(self), step):
+            stop = start + step
+            inter = np.minimum(q_counts[:, None, :], self.counts[None, start:stop, :]).sum(axis=2, dtype=np.int32)
+            total = q_lengths[:, None] + self.lengths[None, start:stop]
+            bounds[:, start:stop] = 200.0 * inter / np.maximum(total, 1)
+        return bounds
+
+    def search_many(self, queries, k=5, threshold=0.0):
+        """Top-k (plate, score) lists for each query, best first.
+
+        Queries that can't be normalized to a valid plate get no matches.
+        Returns (normalized_queries, results).
+        """
+        normalized = [normalize_plate(q) for q in queries]
+        valid = [i for i, q in enumerate(normalized) if q is not None]
+        results = [[] for _ in queries]
+        if not valid or not len(self):
+            return normalized, results
+        bounds = self.upper_bounds([normalized[i] for i in valid])
+        for row, i in enumerate(valid):
+            results[i] = self._refine(normalized[i], bounds[row], k, threshold)
+        return normalized, results
+
+    def search(self, query, k=5, threshold=0.0):
+        return self.search_many([query], k, threshold)[1][0]
+
+    def _refine(self, query, bounds, k, threshold):
+        exact = self.positions.get(query)
+        best = [(self.plates[exact], 100.0)] if exact is not None else []
+        candidates = np.flatnonzero(bounds >= threshold - 1e-9)
+        for idx in candidates[np.argsort(-bounds[candidates], kind='stable')]:
+            if len(best) >= k and bounds[idx] <= best[-1][1] + 1e-9:
+                break  # nothing left can beat the current k-th best
+            if idx == exact:
+                continue
+            score = string_similarity_alignment(query, self.plates[idx])
+            if score >= threshold and (len(best) < k or score > best[-1][1]):
+                best.append((self.plates[idx], score))
+                best.sort(key=lambda m: -m[1])
+                del best[k:]
+        return best
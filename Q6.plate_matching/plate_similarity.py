@@ -0,0 +1,74 @@
+# ========================= Q6: Plate Similarity Backends =========================
+from difflib import SequenceMatcher
+
+try:
+    from rapidfuzz.distance import Indel, Levenshtein
+except ImportError:  # optional, pip install rapidfuzz
+    Indel = Levenshtein = None
+
+# ------------------ Core function ------------------
+def string_similarity_alignment(str1, str2):
+    matcher = SequenceMatcher(None, str1, str2)
+    similarity_percentage = matcher.ratio() * 100
+    return similarity_percentage
+
+def alignment(str1, str2):
+    """Aligned str1, match line ('|' match, '.' mismatch) and aligned str2."""
+    aligned_str1, alignment_line, aligned_str2 = [], [], []
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, str1, str2).get_opcodes():
+        if tag in ('equal', 'replace'):
+            aligned_str1.append(str1[i1:i2])
+            aligned_str2.append(str2[j1:j2])
+            # replace blocks can have different lengths on each side
+            width = max(i2 - i1, j2 - j1)
+            aligned_str1.append('-' * (width - (i2 - i1)))
+            aligned_str2.append('-' * (width - (j2 - j1)))
+            alignment_line.append(('|' if tag == 'equal' else '.') * width)
+        elif tag == 'insert':
+            aligned_str1.append('-' * (j2 - j1))
+            aligned_str2.append(str2[j1:j2])
+            alignment_line.append('.' * (j2 - j1))
+        elif tag == 'delete':
+            aligned_str1.append(str1[i1:i2])
+            aligned_str2.append('-' * (i2 - i1))
+            alignment_line.append('.' * (i2 - i1))
+    return ''.join(aligned_str1), ''.join(alignment_line), ''.join(aligned_str2)
+
+# ------------------ Alternative metrics ------------------
+def levenshtein_similarity(str1, str2):
+    """100 * (1 - edit distance / longer length), pure Python."""
+    if str1 == str2:
+        return 100.0
+    longest = max(len(str1), len(str2))
+    previous = list(range(len(str2) + 1))
+    for i, c1 in enumerate(str1, 1):
+        current = [i]
+        for j, c2 in enumerate(str2, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (c1 != c2)))
+        previous = current
+    return (1 - previous[-1] / longest) * 100
+
+def hamming_similarity(str1, str2):
+    """Positional match percentage; characters past the shorter string count as mismatches."""
+    longest = max(len(str1), len(str2))
+    if longest == 0:
+        return 100.0
+    return sum(c1 == c2 for c1, c2 in zip(str1, str2)) / longest * 100
+
+# name -> similarity(str1, str2) returning a percentage in [0, 100]
+BACKENDS = {
+    "difflib": string_similarity_alignment,
+    "levenshtein": levenshtein_similarity,
+    "hamming": hamming_similarity,
+}
+
+if Levenshtein is not None:
+    def rapidfuzz_indel_similarity(str1, str2):
+        return Indel.normalized_similarity(str1, str2) * 100
+
+    def rapidfuzz_levenshtein_similarity(str1, str2):
+        return Levenshtein.normalized_similarity(str1, str2) * 100
+
+    BACKENDS["rapidfuzz_indel"] = rapidfuzz_indel_similarity
+    BACKENDS["rapidfuzz_levenshtein"] = rapidfuzz_levenshtein_similarity
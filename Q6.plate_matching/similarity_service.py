@@ -0,0 +1,235 @@
+# ========================= Q6: Plate Similarity Service =========================
+# Long-running local service: the plate registry is loaded and indexed once,
+# and concurrent queries are micro-batched into one vectorized PlateIndex pass.
+#
+# Protocol: one JSON object per line, one JSON reply per line.
+#   {"id": 1, "query": "MH12AB1234", "k": 5, "threshold": 60, "align": true}
+#   {"id": 2, "op": "compare", "a": "MH12AB1234", "b": "MH12A81234", "align": true}
+#   {"id": 3, "op": "stats"}
+#
+#   python similarity_service.py --registry plates.txt --port 8765
+#   python similarity_service.py --registry plates.txt --unix /tmp/plates.sock
+import argparse
+import asyncio
+import json
+import socket
+import time
+from collections import deque
+
+import numpy as np
+
+from plate_format import normalize_plate
+from plate_index import PlateIndex, load_registry
+from plate_similarity import alignment, string_similarity_alignment
+
+DEFAULT_PORT = 8765
+MAX_BATCH = 256
+MAX_WAIT_MS = 2.0
+
+
+class SimilarityService:
+    def __init__(self, index, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+        self.index = index
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue = None
+        self.latencies = deque(maxlen=10000)  # seconds, most recent queries
+        self.queries = 0
+        self.batches = 0
+        self.started = time.time()
+
+    # ------------------ Batching ------------------
+    async def batch_worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            # Score in a thread so the loop keeps accepting requests meanwhile
+            try:
+                replies = await loop.run_in_executor(None, self.score_batch, [r for r, _, _ in batch])
+            except Exception as e:
+                replies = [{"error": str(e)}] * len(batch)
+            self.batches += 1
+            now = time.perf_counter()
+            for (_, future, received), reply in zip(batch, replies):
+                self.latencies.append(now - received)
+                if not future.done():
+                    future.set_result(reply)
+
+    def score_batch(self, requests):
+        # k and threshold were checked per request in handle_request
+        k = max(r["k"] for r in requests)
+        threshold = min(r["threshold"] for r in requests)
+        normalized, results = self.index.search_many([str(r["query"]) for r in requests], k, threshold)
+        replies = []
+        for request, query, matches in zip(requests, normalized, results):
+            matches = [m for m in matches if m[1] >= request["threshold"]][:request["k"]]
+            reply = {"query": request["query"], "normalized": query,
+                     "matches": [{"plate": plate, "score": score} for plate, score in matches]}
+            if request.get("align") and query is not None:
+                for match in reply["matches"]:
+                    match["alignment"] = alignment(query, match["plate"])
+            replies.append(reply)
+        return replies
+
+    # ------------------ Requests ------------------
+    async def handle_request(self, request):
+        op = request.get("op", "search")
+        if op == "stats":
+            return self.stats()
+        if op == "compare":
+            if "a" not in request or "b" not in request:
+                return {"error": "compare needs \"a\" and \"b\""}
+            a, b = str(request["a"]), str(request["b"])
+            if request.get("normalize", True):
+                a, b = normalize_plate(a) or a, normalize_plate(b) or b
+            reply = {"a": a, "b": b, "score": string_similarity_alignment(a, b)}
+            if request.get("align"):
+                reply["alignment"] = alignment(a, b)
+            return reply
+        if op != "search" or "query" not in request:
+            return {"error": f"unknown request: {request}"}
+        # Rejected here, so one bad request can't fail the rest of its micro-batch
+        try:
+            k, threshold = int(request.get("k", 5)), float(request.get("threshold", 0.0))
+        except (TypeError, ValueError):
+            return {"error": f"bad k or threshold: {request.get('k')!r}, {request.get('threshold')!r}"}
+        if k < 1:
+            return {"error": f"k must be at least 1, got {k}"}
+        request = {**request, "k": k, "threshold": threshold}
+        self.queries += 1
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((request, future, time.perf_counter()))
+        return await future
+
+    async def handle_client(self, reader, writer):
+        pending = set()
+        lock = asyncio.Lock()
+
+        async def answer(request):
+            if isinstance(request, dict):
+                try:
+                    reply = await self.handle_request(request)
+                except Exception as e:
+                    reply = {"error": f"{type(e).__name__}: {e}"}
+                if "id" in request:
+                    reply = {"id": request["id"], **reply}
+            else:
+                reply = {"error": request}
+            async with lock:
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError as e:
+                    request = f"bad json: {e}"
+                # Requests on one connection are answered as they complete (match by "id")
+                task = asyncio.create_task(answer(request))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        finally:
+            writer.close()
+
+    def stats(self):
+        latencies = np.array(self.latencies) * 1000
+        percentiles = np.percentile(latencies, [50, 90, 99]) if len(latencies) else [0.0] * 3
+        return {
+            "registry_size": len(self.index),
+            "queue_depth": self.queue.qsize() if self.queue else 0,
+            "queries": self.queries,
+            "batches": self.batches,
+            "avg_batch_size": self.queries / self.batches if self.batches else 0.0,
+            "latency_ms": dict(zip(("p50", "p90", "p99"), map(float, percentiles))),
+            "uptime_s": time.time() - self.started,
+        }
+
+    async def start(self, host="127.0.0.1", port=DEFAULT_PORT, unix_path=None):
+        """Start listening and batching; returns the asyncio server."""
+        self.queue = asyncio.Queue()
+        self.worker = asyncio.create_task(self.batch_worker())
+        if unix_path:
+            return await asyncio.start_unix_server(self.handle_client, path=unix_path)
+        return await asyncio.start_server(self.handle_client, host, port)
+
+
+# ------------------ Blocking client ------------------
+class SimilarityClient:
+    """Minimal client for other processes: one request at a time over one connection."""
+
+    def __init__(self, host="127.0.0.1", port=DEFAULT_PORT, unix_path=None, timeout=5.0):
+        if unix_path:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.settimeout(timeout)
+            self.sock.connect(unix_path)
+        else:
+            self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.file = self.sock.makefile("rwb")
+
+    def request(self, **request):
+        self.file.write(json.dumps(request).encode() + b"\n")
+        self.file.flush()
+        return json.loads(self.file.readline())
+
+    def search(self, query, k=5, threshold=0.0, align=False):
+        return self.request(query=query, k=k, threshold=threshold, align=align)
+
+    def compare(self, a, b, align=False):
+        return self.request(op="compare", a=a, b=b, align=align)
+
+    def stats(self):
+        return self.request(op="stats")
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+
+# ------------------ Main ------------------
+async def serve(args):
+    start = time.perf_counter()
+    if args.registry:
+        plates = load_registry(args.registry)
+    else:
+        from plate_generator import generate_valid_plates, decode_plates
+        plates = decode_plates(generate_valid_plates(args.demo_size, 0)[0])
+    index = PlateIndex(plates)
+    print(f"Indexed {len(index)} plates in {time.perf_counter() - start:.2f}s")
+
+    service = SimilarityService(index, args.max_batch, args.max_wait_ms)
+    server = await service.start(args.host, args.port, args.unix)
+    where = args.unix or f"{args.host}:{args.port}"
+    print(f"Similarity service listening on {where}")
+    async with server:
+        await server.serve_forever()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Plate similarity service.")
+    parser.add_argument("--registry", help="text file with one plate per line")
+    parser.add_argument("--demo-size", type=int, default=100000,
+                        help="random registry size when --registry is not given")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", help="listen on this Unix socket path instead of TCP")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,50 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import torch
-from torchvision import models, transforms
 from PIL import Image, ImageTk
 import os
+import queue
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.metrics import Metrics
+from common.startup import StartupTimer
+from embedding_index import EmbeddingStore
+from image_files import iter_image_files
+from pet_labels import DEFAULT_PROFILE, LABELS, describe_prediction
+from prediction_cache import PredictionCache, TOP_K
+
+STARTUP = StartupTimer()
+# Prometheus endpoint / JSON log via METRICS_PORT / METRICS_LOG (see common/metrics.py)
+METRICS = Metrics("q7_pets").start_from_env()
+
+BATCH_SIZE = 32  # images per forward pass
+LOADER_WORKERS = min(8, os.cpu_count() or 1)  # threads decoding/preprocessing images
+MODEL_PROFILE = os.environ.get("CATDOG_PROFILE", DEFAULT_PROFILE)  # see pet_model.PROFILES
+# Optional CPU tuning (see cpu_optimize.py): INT8/channels_last model file, threads, torch.compile
+OPTIMIZED_MODEL = os.environ.get("CATDOG_OPTIMIZED_MODEL")
+CPU_THREADS = int(os.environ.get("CATDOG_THREADS", "0"))  # 0: torch default
+COMPILE_MODEL = os.environ.get("CATDOG_COMPILE") == "1"
+CACHE_LOOKUP_CHUNK = 512  # paths hashed and looked up before their misses are classified
+SCAN_CHUNK = 1000  # paths per message from the folder scan thread
+SCAN_CHUNKS_PER_TICK = 5  # chunks added to the GUI per poll, to keep it responsive
+WHEEL_ROWS = 3  # result rows scrolled per mouse wheel step
+# Embedding index (see embedding_index.py), one store per model version
+EMBEDDING_DIR = os.environ.get(
+    "CATDOG_EMBEDDINGS", os.path.join(os.path.expanduser("~"), ".cache", "cat_dog_classifier", "embeddings"))
+IVF_MIN_ROWS = 50000  # switch "find similar"/duplicate search to the approximate index from here on
+SIMILAR_RESULTS = 12
+
+def import_model_modules():
+    """Import torch and the model code; slow, so it runs on the model-loading thread."""
+    global torch, transforms, BatchLoader, PREPROCESS_VERSION, load_classifier, warm_up
+    import torch
+    from torchvision import transforms
+    from image_pipeline import BatchLoader, PREPROCESS_VERSION
+    from pet_model import load_classifier, warm_up
 
 class DarkStyle(ttk.Style):
     def __init__(self, root):
@@ -17,25 +58,70 @@ class DarkStyle(ttk.Style):
                  background=[('active', '#0055ff')])
 
 class CatDogClassifierGUI:
-    def __init__(self, root):
+    def __init__(self, root, batch_size=BATCH_SIZE, loader_workers=LOADER_WORKERS, profile=MODEL_PROFILE):
         self.root = root
+        self.profile = profile
+        self.batch_size = batch_size
+        self.loader_workers = loader_workers
         self.root.title("Cat vs Dog Breed Classifier")
         self.root.geometry("1050x700")
         self.root.configure(bg="#1c1c2e")
         DarkStyle(self.root)
 
         self.model = None
-        self.class_labels = {}
-        self.setup_model()
+        self.cache = None
+        self.embeddings = None     # EmbeddingStore, needs the cache's content digests as keys
+        self.model_ready = threading.Event()
+        self.model_error = None
+        self.analysis_pending = False
+        # Path index: a path's id is its position in image_paths, stable until "Clear All"
         self.image_paths = []
+        self.path_ids = {}         # path -> id
+        self.scan_queue = queue.Queue()
+        self.scan_cancel = threading.Event()
+        self.scanning = False
+
+        # Background analysis state; results survive cancellation
+        self.results = {}          # path -> (animal_type, breed_name, confidence, duplicate_of)
+        self.failed = set()        # paths that could not be loaded
+        self.result_queue = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.worker = None
+        self.discard_results = False
+        METRICS.gauge("result_queue_depth", lambda: self.result_queue.qsize())
+        METRICS.gauge("scan_queue_depth", lambda: self.scan_queue.qsize())
+
+        # Virtualized results table: only the visible window of result_ids is in the Treeview
+        self.result_ids = []       # ids of classified images, in arrival order
+        self.results_top = 0       # index in result_ids of the first visible row
+        self.visible_rows = 18
+        self.selected_result = None
 
         self.setup_gui()
+        self.root.after(0, STARTUP.mark, "window_shown")
+
+        # The window is usable right away; the model loads in the background
+        self.status_bar.config(text="Loading model...")
+        threading.Thread(target=self.setup_model, daemon=True).start()
+        self.root.after(50, self.poll_model)
 
     def setup_model(self):
+        # Runs off the Tk thread; poll_model() reports the outcome
         try:
-            self.model = models.resnet50(pretrained=True)
-            self.model.eval()
-            self.load_labels()
+            import_model_modules()
+            STARTUP.mark("imports_done")
+            if CPU_THREADS:
+                torch.set_num_threads(CPU_THREADS)
+            # Backbone + head sliced to the cat/dog classes and "Other"
+            model = load_classifier(self.profile)
+            if OPTIMIZED_MODEL:
+                from cpu_optimize import load_optimized
+                model = load_optimized(OPTIMIZED_MODEL, model)
+            if COMPILE_MODEL:
+                model = torch.compile(model)
+            STARTUP.mark("model_loaded")
+            warm_up(model)
+            STARTUP.mark("warmed_up")
             self.preprocess = transforms.Compose([
                 transforms.Resize(256),
                 transforms.CenterCrop(224),
@@ -45,39 +131,51 @@ class CatDogClassifierGUI:
                     std=[0.229, 0.224, 0.225]
                 )
             ])
+            self.model = model
+        except Exception as e:
+            self.model_error = e
+            self.model_ready.set()
+            return
+        try:
+            model_version = f"{self.model.version}/{PREPROCESS_VERSION}"
+            self.cache = PredictionCache(model_version=model_version)
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to load model: {e}")
-
-    def load_labels(self):
-        # Full cat and dog breeds from ImageNet
-        self.class_labels = {
-            # Cats
-            281: 'Tabby cat', 282: 'Tiger cat', 283: 'Persian cat', 284: 'Siamese cat', 285: 'Egyptian cat',
-            # Dogs
-            151: 'Chihuahua', 152: 'Japanese spaniel', 153: 'Maltese dog', 154: 'Pekinese', 155: 'Shih-Tzu',
-            156: 'Blenheim spaniel', 157: 'Papillon', 158: 'Toy terrier', 159: 'Rhodesian ridgeback', 160: 'Afghan hound',
-            161: 'Basset', 162: 'Beagle', 163: 'Bloodhound', 164: 'Bluetick', 165: 'Black-and-tan coonhound',
-            166: 'Walker hound', 167: 'English foxhound', 168: 'Redbone', 169: 'Borzoi', 170: 'Irish wolfhound',
-            171: 'Italian greyhound', 172: 'Whippet', 173: 'Ibizan hound', 174: 'Norwegian elkhound', 175: 'Otterhound',
-            176: 'Saluki', 177: 'Scottish deerhound', 178: 'Weimaraner', 179: 'Staffordshire bullterrier',
-            180: 'American Staffordshire terrier', 181: 'Bedlington terrier', 182: 'Border terrier', 183: 'Kerry blue terrier',
-            184: 'Irish terrier', 185: 'Norfolk terrier', 186: 'Norwich terrier', 187: 'Yorkshire terrier', 188: 'Wire-haired fox terrier',
-            189: 'Lakeland terrier', 190: 'Sealyham terrier', 191: 'Airedale', 192: 'Cairn', 193: 'Australian terrier',
-            194: 'Dandie Dinmont', 195: 'Boston bull', 196: 'Miniature schnauzer', 197: 'Giant schnauzer', 198: 'Standard schnauzer',
-            199: 'Scotch terrier', 200: 'Tibetan terrier', 201: 'Silky terrier', 202: 'Soft-coated wheaten terrier', 203: 'West Highland white terrier',
-            204: 'Lhasa', 205: 'Flat-coated retriever', 206: 'Curly-coated retriever', 207: 'Golden retriever', 208: 'Labrador retriever',
-            209: 'Chesapeake Bay retriever', 210: 'German short-haired pointer', 211: 'Vizsla', 212: 'English setter', 213: 'Irish setter',
-            214: 'Gordon setter', 215: 'Brittany spaniel', 216: 'Clumber', 217: 'English springer', 218: 'Welsh springer spaniel',
-            219: 'Cocker spaniel', 220: 'Sussex spaniel', 221: 'Irish water spaniel', 222: 'Kuvasz', 223: 'Schipperke', 224: 'Groenendael',
-            225: 'Malinois', 226: 'Briard', 227: 'Kelpie', 228: 'Komondor', 229: 'Old English sheepdog', 230: 'Shetland sheepdog',
-            231: 'Collie', 232: 'Border collie', 233: 'Bouvier des Flandres', 234: 'Rottweiler', 235: 'German shepherd', 236: 'Doberman',
-            237: 'Miniature pinscher', 238: 'Greater Swiss Mountain dog', 239: 'Bernese mountain dog', 240: 'Appenzeller', 241: 'EntleBucher',
-            242: 'Boxer', 243: 'Bull mastiff', 244: 'Tibetan mastiff', 245: 'French bulldog', 246: 'Great Dane', 247: 'Saint Bernard',
-            248: 'Eskimo dog', 249: 'Malamute', 250: 'Siberian husky', 251: 'Dalmatian', 252: 'Affenpinscher', 253: 'Basenji', 254: 'Pug',
-            255: 'Leonberg', 256: 'Newfoundland', 257: 'Great Pyrenees', 258: 'Samoyed', 259: 'Pomeranian', 260: 'Chow', 261: 'Keeshond',
-            262: 'Brabancon griffon', 263: 'Pembroke', 264: 'Cardigan', 265: 'Toy poodle', 266: 'Miniature poodle', 267: 'Standard poodle',
-            268: 'Mexican hairless', 269: 'Dingo', 270: 'Dhole', 271: 'African hunting dog'
-        }
+            print(f"Prediction cache disabled: {e}")
+        if self.cache is not None:
+            try:
+                directory = os.path.join(EMBEDDING_DIR, model_version.replace('/', '_'))
+                self.embeddings = EmbeddingStore(directory, self.model.head.linear.in_features)
+                if len(self.embeddings) >= IVF_MIN_ROWS:
+                    self.embeddings.build_ivf()
+            except Exception as e:
+                print(f"Embedding index disabled: {e}")
+        self.model_ready.set()
+
+    def poll_model(self):
+        if not self.model_ready.is_set():
+            self.root.after(50, self.poll_model)
+            return
+        if self.model_error is not None:
+            self.status_bar.config(text="Model failed to load")
+            messagebox.showerror("Error", f"Failed to load model: {self.model_error}")
+            return
+        self.status_bar.config(text=f"Model ready ({self.profile}, {STARTUP.marks['warmed_up']:.1f}s after start)")
+        if STARTUP.benchmarking:
+            self.run_startup_benchmark()
+        elif self.analysis_pending:
+            self.analysis_pending = False
+            self.analyze_images()
+
+    def run_startup_benchmark(self):
+        image_path = os.environ.get("STARTUP_BENCH_IMAGE")
+        if image_path:
+            self.classify_image(image_path)
+        else:
+            self.predict(torch.zeros(1, 3, 224, 224))
+        STARTUP.mark("first_prediction")
+        STARTUP.write()
+        print(STARTUP.report())
+        self.root.destroy()
 
     def setup_gui(self):
         tk.Label(self.root, text="Cat vs Dog Breed Classifier",
@@ -95,9 +193,20 @@ class CatDogClassifierGUI:
         self.image_list.pack(fill=tk.Y, expand=False)
 
         ttk.Button(left, text="Add Images", command=self.add_images).pack(fill=tk.X, pady=3)
+        ttk.Button(left, text="Add Folder", command=self.add_folder).pack(fill=tk.X, pady=3)
         ttk.Button(left, text="Clear All", command=self.clear_images).pack(fill=tk.X, pady=3)
         ttk.Button(left, text="Analyze Images", command=self.analyze_images).pack(fill=tk.X, pady=3)
+        self.cancel_button = ttk.Button(left, text="Cancel Analysis", command=self.cancel_analysis, state='disabled')
+        self.cancel_button.pack(fill=tk.X, pady=3)
+        self.resume_button = ttk.Button(left, text="Resume Analysis", command=self.resume_analysis, state='disabled')
+        self.resume_button.pack(fill=tk.X, pady=3)
         ttk.Button(left, text="Clear Results", command=self.clear_results).pack(fill=tk.X, pady=3)
+        ttk.Button(left, text="Find Similar", command=self.find_similar).pack(fill=tk.X, pady=3)
+
+        self.progress = ttk.Progressbar(left, mode='determinate')
+        self.progress.pack(fill=tk.X, pady=(10, 3))
+        self.progress_label = ttk.Label(left, text="")
+        self.progress_label.pack(anchor='w')
 
         # --- Right Panel ---
         right = tk.Frame(main_frame, bg="#1c1c2e")
@@ -105,14 +214,22 @@ class CatDogClassifierGUI:
 
         ttk.Label(right, text="Results:", font=('Arial', 12, 'bold')).pack(anchor='w', pady=(0,5))
 
-        columns = ('Image', 'Animal Type', 'Breed', 'Confidence')
-        self.results_tree = ttk.Treeview(right, columns=columns, show='headings', height=18)
+        table = tk.Frame(right, bg="#1c1c2e")
+        table.pack(fill=tk.BOTH, expand=True, pady=(0,10))
+        columns = ('Image', 'Animal Type', 'Breed', 'Confidence', 'Duplicate Of')
+        self.results_tree = ttk.Treeview(table, columns=columns, show='headings',
+                                         height=self.visible_rows, selectmode='browse')
         for col in columns:
             self.results_tree.heading(col, text=col)
-            self.results_tree.column(col, width=150, anchor='center')
-        self.results_tree.pack(fill=tk.BOTH, expand=True, pady=(0,10))
+            self.results_tree.column(col, width=130, anchor='center')
+        self.results_scroll = ttk.Scrollbar(table, orient=tk.VERTICAL, command=self.scroll_results)
+        self.results_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.results_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
         self.results_tree.bind("<<TreeviewSelect>>", self.show_selected_image)
+        self.results_tree.bind("<Configure>", self.on_results_resize)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.results_tree.bind(sequence, self.on_results_wheel)
 
         self.image_label = tk.Label(right, text="Image preview will appear here", bg="#1c1c2e", fg="white")
         self.image_label.pack(fill=tk.BOTH, expand=True, pady=5)
@@ -123,84 +240,434 @@ class CatDogClassifierGUI:
     def add_images(self):
         files = filedialog.askopenfilenames(title="Select images",
                                             filetypes=[("Image files", "*.jpg *.jpeg *.png")])
-        for file in files:
-            if file not in self.image_paths:
-                self.image_paths.append(file)
-                self.image_list.insert(tk.END, os.path.basename(file))
+        self.add_paths(files)
+
+    def add_paths(self, paths):
+        names = []
+        for path in map(os.path.normpath, paths):
+            if path in self.path_ids:
+                continue
+            self.path_ids[path] = len(self.image_paths)
+            self.image_paths.append(path)
+            names.append(os.path.basename(path))
+        if names:
+            self.image_list.insert(tk.END, *names)
+
+    # --- Folder scan ---
+    def add_folder(self):
+        folder = filedialog.askdirectory(title="Select a folder of images")
+        if not folder:
+            return
+        self.scan_cancel.set()  # a new scan replaces any running one
+        self.scan_cancel = threading.Event()
+        self.scan_queue = queue.Queue()
+        threading.Thread(target=self.scan_worker, args=(folder, self.scan_cancel, self.scan_queue),
+                         daemon=True).start()
+        if not self.scanning:
+            self.scanning = True
+            self.root.after(50, self.poll_scan)
+
+    def scan_worker(self, folder, cancel_event, scan_queue):
+        chunk = []
+        for path in iter_image_files(folder):
+            if cancel_event.is_set():
+                return
+            chunk.append(path)
+            if len(chunk) >= SCAN_CHUNK:
+                scan_queue.put(chunk)
+                chunk = []
+        scan_queue.put(chunk)
+        scan_queue.put(None)
+
+    def poll_scan(self):
+        if self.scan_cancel.is_set():
+            self.scanning = False
+            return
+        finished = False
+        try:
+            for _ in range(SCAN_CHUNKS_PER_TICK):
+                chunk = self.scan_queue.get_nowait()
+                if chunk is None:
+                    finished = True
+                    break
+                self.add_paths(chunk)
+        except queue.Empty:
+            pass
+        if finished:
+            self.scanning = False
+            self.status_bar.config(text=f"{len(self.image_paths)} images selected.")
+            return
+        self.status_bar.config(text=f"Scanning folder... {len(self.image_paths)} images found")
+        self.root.after(50, self.poll_scan)
 
     def clear_images(self):
+        self.cancel_analysis()
+        self.scan_cancel.set()
         self.image_paths.clear()
+        self.path_ids.clear()
         self.image_list.delete(0, tk.END)
         self.clear_results()
         self.image_label.configure(image='', text="Image preview will appear here")
         self.status_bar.config(text="Ready")
 
     def clear_results(self):
-        for item in self.results_tree.get_children():
-            self.results_tree.delete(item)
-
-    def classify_image(self, image_path):
+        if self.worker is not None:
+            # Batches still in flight belong to the cleared results
+            self.discard_results = True
+            self.cancel_analysis()
+        self.results.clear()
+        self.failed.clear()
+        self.resume_button.config(state='disabled')
+        self.result_ids.clear()
+        self.results_top = 0
+        self.selected_result = None
+        self.refresh_results()
+
+    def load_image(self, image_path):
         try:
             image = Image.open(image_path).convert('RGB')
-            input_tensor = self.preprocess(image)
-            input_batch = input_tensor.unsqueeze(0)
-            with torch.no_grad():
-                output = self.model(input_batch)
-            probabilities = torch.nn.functional.softmax(output[0], dim=0)
-            top_prob, top_catid = torch.topk(probabilities, 1)
-            class_id = top_catid[0].item()
-            class_name = self.class_labels.get(class_id, f"class_{class_id}")
-            confidence = top_prob[0].item()
-            return class_name, confidence, image
+            return image, self.preprocess(image)
         except Exception as e:
             print(e)
+            return None, None
+
+    def forward(self, input_batch):
+        """(cat/dog/Other logits, pooled embeddings) for a preprocessed batch."""
+        with torch.inference_mode():
+            return self.model(input_batch)
+
+    def label_for(self, class_index, confidence):
+        return LABELS[class_index], confidence
+
+    def predict(self, input_batch):
+        """(class_name, confidence) for each image of a preprocessed batch."""
+        logits, _ = self.forward(input_batch)
+        probabilities = torch.nn.functional.softmax(logits, dim=1)
+        top_prob, top_catid = probabilities.max(dim=1)
+        return [self.label_for(class_id, confidence)
+                for class_id, confidence in zip(top_catid.tolist(), top_prob.tolist())]
+
+    def classify_batch(self, image_paths):
+        """Classify several images in one forward pass.
+
+        Returns one (class_name, confidence) per path; (None, None) for images
+        that could not be loaded.
+        """
+        results = [(None, None)] * len(image_paths)
+        loaded = [(i, tensor) for i, (_, tensor) in
+                  enumerate(map(self.load_image, image_paths)) if tensor is not None]
+        if not loaded:
+            return results
+        predictions = self.predict(torch.stack([tensor for _, tensor in loaded]))
+        for (i, _), prediction in zip(loaded, predictions):
+            results[i] = prediction
+        return results
+
+    def classify_paths(self, image_paths):
+        """Yield lists of (path, class_name, confidence, duplicate_of) batch by batch, decoding ahead of the model.
+
+        Images already in the prediction cache skip decoding and the model.
+        duplicate_of is the path of an earlier copy or near-identical image, else None.
+        Images that fail to load are yielded as (path, None, None, None).
+        """
+        if self.cache is None:
+            for batch in self.classify_uncached(image_paths, {}):
+                yield [row[:3] + (None,) for row in batch]
+            return
+        for start in range(0, len(image_paths), CACHE_LOOKUP_CHUNK):
+            chunk = image_paths[start:start + CACHE_LOOKUP_CHUNK]
+            with METRICS.time("cache_lookup"):
+                digests = self.cache.digests(chunk)
+                hits = self.cache.get_many(digests.values())
+            METRICS.inc("cache_hits", len(hits))
+            cached = [(p, *self.label_for(int(hits[digests[p]].class_ids[0]),
+                                          float(hits[digests[p]].probabilities()[0])),
+                       hits[digests[p]].embedding)
+                      for p in chunk if digests[p] in hits]
+            # One index lookup for the whole chunk of hits, not one per batch
+            cached = self.link_duplicates(cached, digests)
+            for i in range(0, len(cached), self.batch_size):
+                yield cached[i:i + self.batch_size]
+            misses = [p for p in chunk if digests[p] not in hits]
+            for batch in self.classify_uncached(misses, digests):
+                yield self.link_duplicates(batch, digests)
+        self.cache.evict()
+
+    def classify_uncached(self, image_paths, digests):
+        """Run the model over image_paths, storing results under their content digests.
+
+        Yields lists of (path, class_name, confidence, embedding).
+        """
+        loader = BatchLoader(image_paths, self.batch_size, self.loader_workers)
+        waiting = time.perf_counter()
+        for batch_paths, batch, ok in loader:
+            # Time the model spends waiting for the decoding threads
+            METRICS.observe("decode_wait", time.perf_counter() - waiting)
+            METRICS.inc("images_classified", sum(ok))
+            METRICS.inc("images_failed", len(ok) - sum(ok))
+            predictions = []
+            if any(ok):
+                with METRICS.time("forward"):
+                    logits, embeddings = self.forward(batch if all(ok) else batch[torch.tensor(ok)])
+                    top_prob, top_catid = torch.nn.functional.softmax(logits, dim=1).max(dim=1)
+                predictions = [(*self.label_for(class_id, confidence), embedding) for class_id, confidence, embedding
+                               in zip(top_catid.tolist(), top_prob.tolist(), embeddings.numpy())]
+                self.store_predictions([p for p, good in zip(batch_paths, ok) if good],
+                                       digests, logits, embeddings)
+            predictions = iter(predictions)
+            yield [(p, *next(predictions)) if good else (p, None, None, None)
+                   for p, good in zip(batch_paths, ok)]
+            waiting = time.perf_counter()
+
+    def link_duplicates(self, rows, digests):
+        """Add the embeddings of (path, class_name, confidence, embedding) rows to the index and
+        replace each embedding with the path of an earlier copy or near-duplicate (or None)."""
+        duplicates = {}
+        stored = [(digests[p], embedding, p) for p, _, _, embedding in rows
+                  if embedding is not None and digests.get(p)]
+        if self.embeddings is not None and stored:
+            keys, vectors, paths = zip(*stored)
+            store_rows = self.embeddings.add(keys, np.stack(vectors), paths)
+            if self.embeddings.ivf is None and len(self.embeddings) >= IVF_MIN_ROWS:
+                self.embeddings.build_ivf()
+            with METRICS.time("duplicate_search"):
+                near = self.embeddings.near_duplicates(keys)
+            for path, row, (near_path, _) in zip(paths, store_rows, near):
+                # Same content hash stored under another path: an exact copy
+                first_path = self.embeddings.paths[row]
+                duplicates[path] = first_path if first_path != path else near_path
+        METRICS.inc("duplicates", sum(d is not None for d in duplicates.values()))
+        return [(p, class_name, confidence, duplicates.get(p)) for p, class_name, confidence, _ in rows]
+
+    def store_predictions(self, paths, digests, logits, embeddings):
+        if self.cache is None:
+            return
+        top_logits, top_ids = logits.topk(TOP_K, dim=1)
+        logsumexp = torch.logsumexp(logits, dim=1)
+        entries = [(digests[p], ids, lg, lse, emb) for p, ids, lg, lse, emb in
+                   zip(paths, top_ids.numpy(), top_logits.numpy(), logsumexp.tolist(), embeddings.numpy())
+                   if digests.get(p)]
+        if entries:
+            with METRICS.time("cache_store"):
+                self.cache.put_many(entries)
+
+    def classify_image(self, image_path):
+        image, input_tensor = self.load_image(image_path)
+        if input_tensor is None:
             return None, None, None
+        class_name, confidence = self.predict(input_tensor.unsqueeze(0))[0]
+        return class_name, confidence, image
 
     def analyze_images(self):
         if not self.image_paths:
             messagebox.showwarning("Warning", "Please add images first!")
             return
-
+        if self.worker is not None:
+            messagebox.showinfo("Info", "Analysis is already running.")
+            return
+        if self.model is None:
+            if self.model_ready.is_set():
+                messagebox.showerror("Error", f"Model is not available: {self.model_error}")
+            else:
+                # Starts from poll_model() once loading finishes
+                self.analysis_pending = True
+                self.status_bar.config(text="Loading model... analysis will start when it is ready.")
+            return
         self.clear_results()
+        self.start_analysis(list(self.image_paths))
 
-        for img_path in self.image_paths:
-            filename = os.path.basename(img_path)
-            predicted_class, confidence, image = self.classify_image(img_path)
-
-            if not predicted_class:
-                continue
+    def resume_analysis(self):
+        remaining = [p for p in self.image_paths if p not in self.results and p not in self.failed]
+        if remaining:
+            self.start_analysis(remaining)
 
-            # Determine animal type
-            if 'cat' in predicted_class.lower():
-                animal_type = "Cat"
-            elif 'dog' in predicted_class.lower() or 'hound' in predicted_class.lower():
-                animal_type = "Dog"
-            else:
-                animal_type = "Dog"  # fallback, all breeds now covered
+    def cancel_analysis(self):
+        if self.worker is not None:
+            self.cancel_event.set()
+            self.status_bar.config(text="Cancelling analysis...")
 
-            # Clean breed name
-            breed_name = predicted_class.replace('dog', '').replace('cat', '').strip().title()
+    # --- Background analysis ---
+    def start_analysis(self, paths):
+        if self.worker is not None:
+            return
+        self.cancel_event = threading.Event()
+        self.result_queue = queue.Queue()
+        self.discard_results = False
+        self.run_total = len(self.results) + len(self.failed) + len(paths)
+        self.run_done = 0
+        self.run_started = time.perf_counter()
+        self.progress.config(maximum=self.run_total, value=self.run_total - len(paths))
+        self.cancel_button.config(state='normal')
+        self.resume_button.config(state='disabled')
+        self.worker = threading.Thread(target=self.analysis_worker,
+                                       args=(paths, self.cancel_event, self.result_queue), daemon=True)
+        self.worker.start()
+        self.root.after(50, self.poll_results)
+
+    def analysis_worker(self, paths, cancel_event, result_queue):
+        # Runs off the Tk thread; only talks to the GUI through result_queue
+        try:
+            for batch_results in self.classify_paths(paths):
+                result_queue.put(('batch', batch_results))
+                if cancel_event.is_set():
+                    break
+        except Exception as e:
+            result_queue.put(('error', e))
+        result_queue.put(('done', cancel_event.is_set()))
 
-            self.results_tree.insert('', tk.END, values=(
-                filename, animal_type, breed_name, f"{confidence:.2%}"
+    def poll_results(self):
+        finished = None
+        try:
+            while True:
+                kind, payload = self.result_queue.get_nowait()
+                if kind == 'batch':
+                    self.add_batch_results(payload)
+                elif kind == 'error':
+                    messagebox.showerror("Error", f"Analysis failed: {payload}")
+                else:
+                    finished = payload
+        except queue.Empty:
+            pass
+
+        self.update_progress()
+        if finished is None:
+            self.root.after(50, self.poll_results)
+            return
+        self.worker = None
+        self.cancel_button.config(state='disabled')
+        remaining = self.run_total - len(self.results) - len(self.failed)
+        if self.discard_results:
+            self.progress.config(value=0)
+            self.progress_label.config(text="")
+            self.status_bar.config(text="Ready")
+        elif finished and remaining:
+            self.resume_button.config(state='normal')
+            self.status_bar.config(text=f"Analysis cancelled: {len(self.results)} done, {remaining} remaining.")
+        else:
+            self.status_bar.config(text=f"Analysis complete for {len(self.image_paths)} images.")
+
+    def add_batch_results(self, batch_results):
+        if self.discard_results:
+            return
+        for img_path, predicted_class, confidence, duplicate_of in batch_results:
+            self.run_done += 1
+            if not predicted_class:
+                self.failed.add(img_path)
+                continue
+            animal_type, breed_name = describe_prediction(predicted_class)
+            self.results[img_path] = (animal_type, breed_name, confidence, duplicate_of)
+            self.result_ids.append(self.path_ids[img_path])
+        self.refresh_results()
+
+    # --- Virtualized results table ---
+    def refresh_results(self):
+        """Show the rows of result_ids[results_top:results_top + visible_rows] and update the scrollbar."""
+        total = len(self.result_ids)
+        self.results_top = max(0, min(self.results_top, total - self.visible_rows))
+        window = self.result_ids[self.results_top:self.results_top + self.visible_rows]
+        self.results_tree.delete(*self.results_tree.get_children())
+        for result_id in window:
+            img_path = self.image_paths[result_id]
+            animal_type, breed_name, confidence, duplicate_of = self.results[img_path]
+            self.results_tree.insert('', tk.END, iid=str(result_id), values=(
+                os.path.basename(img_path), animal_type, breed_name, f"{confidence:.2%}",
+                os.path.basename(duplicate_of) if duplicate_of else ""
             ))
-
-        self.status_bar.config(text=f"Analysis complete for {len(self.image_paths)} images.")
+        if self.selected_result in window:
+            self.results_tree.selection_set(str(self.selected_result))
+        if total:
+            self.results_scroll.set(self.results_top / total, (self.results_top + len(window)) / total)
+        else:
+            self.results_scroll.set(0.0, 1.0)
+
+    def scroll_results(self, action, amount, unit=None):
+        # Scrollbar command: ('moveto', fraction) or ('scroll', n, 'units' | 'pages')
+        if action == 'moveto':
+            self.results_top = int(float(amount) * len(self.result_ids))
+        else:
+            step = self.visible_rows if unit == 'pages' else 1
+            self.results_top += int(amount) * step
+        self.refresh_results()
+
+    def on_results_wheel(self, event):
+        up = event.num == 4 or getattr(event, 'delta', 0) > 0
+        self.scroll_results('scroll', -WHEEL_ROWS if up else WHEEL_ROWS)
+        return "break"
+
+    def on_results_resize(self, event):
+        row_height = int(ttk.Style(self.root).lookup('Treeview', 'rowheight') or 20)
+        heading_height = row_height + 4
+        rows = max(1, (event.height - heading_height) // row_height)
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            self.refresh_results()
+
+    def update_progress(self):
+        done = len(self.results) + len(self.failed)
+        self.progress.config(value=done)
+        elapsed = time.perf_counter() - self.run_started
+        rate = self.run_done / elapsed if elapsed > 0 else 0.0
+        remaining = self.run_total - done
+        eta = f"{remaining / rate:.0f}s" if rate > 0 else "--"
+        self.progress_label.config(text=f"{done}/{self.run_total} | {rate:.1f} img/s | ETA {eta}")
+        if self.worker is not None and not self.cancel_event.is_set():
+            self.status_bar.config(text=f"Analyzing... {done}/{self.run_total} images")
 
     def show_selected_image(self, event):
         selected = self.results_tree.selection()
         if not selected:
             return
-        item = selected[0]
-        values = self.results_tree.item(item, 'values')
-        filename = values[0]
-        img_path = next((p for p in self.image_paths if os.path.basename(p) == filename), None)
-        if img_path:
+        result_id = int(selected[0])
+        if result_id == self.selected_result:
+            return  # re-selected after scrolling; already shown
+        self.selected_result = result_id
+        self.show_image(self.image_paths[result_id])
+
+    def show_image(self, img_path):
+        try:
             img = Image.open(img_path)
             img.thumbnail((400, 400))
-            img_tk = ImageTk.PhotoImage(img)
-            self.image_label.configure(image=img_tk, text="")
-            self.image_label.image = img_tk
+        except Exception as e:
+            self.image_label.configure(image='', text=f"Cannot open {os.path.basename(img_path)}: {e}")
+            return
+        img_tk = ImageTk.PhotoImage(img)
+        self.image_label.configure(image=img_tk, text="")
+        self.image_label.image = img_tk
+
+    # --- Similar images ---
+    def find_similar(self):
+        if self.selected_result is None:
+            messagebox.showwarning("Warning", "Select a result first!")
+            return
+        if self.embeddings is None:
+            messagebox.showinfo("Info", "The embedding index is not available.")
+            return
+        img_path = self.image_paths[self.selected_result]
+        vector = self.embeddings.vector(self.cache.digests([img_path]).get(img_path))
+        if vector is None:
+            messagebox.showinfo("Info", "This image is not in the embedding index yet.")
+            return
+        rows, scores = self.embeddings.search(vector, SIMILAR_RESULTS + 1)
+        matches = [(self.embeddings.paths[row], score) for row, score in zip(rows[0], scores[0])
+                   if row >= 0 and self.embeddings.paths[row] != img_path]
+        self.show_similar(img_path, matches[:SIMILAR_RESULTS])
+
+    def show_similar(self, img_path, matches):
+        window = tk.Toplevel(self.root)
+        window.title(f"Similar to {os.path.basename(img_path)}")
+        window.configure(bg="#1c1c2e")
+        columns = ('Image', 'Similarity', 'Path')
+        tree = ttk.Treeview(window, columns=columns, show='headings', height=SIMILAR_RESULTS, selectmode='browse')
+        for col in columns:
+            tree.heading(col, text=col)
+        tree.column('Image', width=160)
+        tree.column('Similarity', width=90, anchor='center')
+        tree.column('Path', width=400)
+        for i, (path, score) in enumerate(matches):
+            tree.insert('', tk.END, iid=str(i), values=(os.path.basename(path), f"{score:.1%}", path))
+        tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        tree.bind("<<TreeviewSelect>>",
+                  lambda event: tree.selection() and self.show_image(matches[int(tree.selection()[0])][0]))
 
 
 def main():
@@ -0,0 +1,237 @@
+# ========================= Q7: Headless Batch Classifier =========================
+# Classifies folders and file lists without Tkinter, with the GUI's preprocessing
+# (image_pipeline.BatchLoader), model profiles and labels, and streams one
+# record per image to JSONL or CSV.
+#
+# The model is loaded once in the parent and worker processes are forked after
+# that, so they share its weights copy-on-write (with spawn, each worker loads
+# the memory-mapped weight file instead, which the OS also shares). The parent
+# owns the prediction cache: cached images are written without touching a worker.
+#
+# The output file is the checkpoint: records are flushed and fsync'ed chunk by
+# chunk, and --resume skips every path already in it.
+#
+#   python classify_pets.py photos/ more_photos/ --output results.jsonl --workers 4
+#   python classify_pets.py --list paths.txt --output results.csv --resume
+import argparse
+import collections
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import torch
+
+from image_files import iter_image_files
+from image_pipeline import PREPROCESS_VERSION, BatchLoader
+from pet_labels import LABELS, describe_prediction
+from pet_model import DEFAULT_PROFILE, PROFILES, load_classifier
+from prediction_cache import CachedPrediction, PredictionCache, TOP_K
+
+CHUNK = 256  # paths per worker task (and per output flush)
+FIELDS = ("path", "animal_type", "breed", "label", "confidence", "error")
+
+_model = None  # set in the parent before forking, or loaded by each spawned worker
+
+
+# ------------------ Inputs ------------------
+def collect_paths(inputs, list_file=None):
+    """Image paths from files and folders (scanned recursively) and an optional list file ('-': stdin)."""
+    for item in inputs:
+        if os.path.isdir(item):
+            yield from iter_image_files(item)
+        else:
+            yield os.path.normpath(item)
+    if list_file:
+        f = sys.stdin if list_file == "-" else open(list_file, encoding="utf-8")
+        with f:
+            for line in f:
+                if line.strip():
+                    yield os.path.normpath(line.strip())
+
+def chunks(paths, size=CHUNK):
+    for start in range(0, len(paths), size):
+        yield paths[start:start + size]
+
+# ------------------ Model / workers ------------------
+def build_model(profile, optimized=None):
+    model = load_classifier(profile)
+    if optimized:
+        from cpu_optimize import load_optimized
+        model = load_optimized(optimized, model)
+    return model
+
+def init_worker(profile, optimized, threads):
+    global _model
+    torch.set_num_threads(threads)
+    if _model is None:
+        _model = build_model(profile, optimized)
+
+def classify_chunk(paths, batch_size, loader_workers, with_embeddings):
+    """(path, CachedPrediction or None) for each path, from the worker's model."""
+    results = []
+    with torch.inference_mode():
+        for batch_paths, batch, ok in BatchLoader(paths, batch_size, loader_workers):
+            predictions = []
+            if any(ok):
+                logits, embeddings = _model(batch if all(ok) else batch[torch.tensor(ok)])
+                top_logits, top_ids = logits.topk(TOP_K, dim=1)
+                logsumexp = torch.logsumexp(logits, dim=1)
+                embeddings = embeddings.numpy().astype('float16') if with_embeddings else [None] * len(logits)
+                predictions = [CachedPrediction(ids, lg, lse, emb) for ids, lg, lse, emb in
+                               zip(top_ids.numpy(), top_logits.numpy(), logsumexp.tolist(), embeddings)]
+            predictions = iter(predictions)
+            results.extend((p, next(predictions) if loaded else None) for p, loaded in zip(batch_paths, ok))
+    return results
+
+def record_for(path, prediction):
+    if prediction is None:
+        return {"path": path, "animal_type": None, "breed": None, "label": None,
+                "confidence": None, "error": "could not load image"}
+    label = LABELS[int(prediction.class_ids[0])]
+    animal_type, breed = describe_prediction(label)
+    return {"path": path, "animal_type": animal_type, "breed": breed, "label": label,
+            "confidence": round(float(prediction.probabilities()[0]), 6), "error": None}
+
+# ------------------ Output / checkpoint ------------------
+def output_format(path, fmt=None):
+    return fmt or ("csv" if path.lower().endswith(".csv") else "jsonl")
+
+def completed_paths(path, fmt):
+    """Paths already recorded in an earlier run's output; drops a partly written last line."""
+    if path == "-" or not os.path.exists(path):
+        return set()
+    with open(path, "rb+") as f:
+        data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            f.truncate(end)
+    lines = data[:end].decode("utf-8").splitlines()
+    if fmt == "csv":
+        return {row["path"] for row in csv.DictReader(lines)}
+    return {json.loads(line)["path"] for line in lines if line.strip()}
+
+class ResultWriter:
+    def __init__(self, path, fmt, append=False):
+        self.fmt = fmt
+        new = path == "-" or not append or not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = sys.stdout if path == "-" else open(path, "a" if append else "w", encoding="utf-8", newline="")
+        if fmt == "csv":
+            self.csv = csv.DictWriter(self.file, FIELDS)
+            if new:
+                self.csv.writeheader()
+
+    def write(self, records):
+        for record in records:
+            if self.fmt == "csv":
+                self.csv.writerow(record)
+            else:
+                self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+        if self.file is not sys.stdout:
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+
+# ------------------ Main ------------------
+def run(paths, writer, args, cache=None):
+    """Classify paths with args.workers processes (0: in this process), writing records as chunks finish."""
+    total, done, started = len(paths), 0, time.perf_counter()
+    pending = collections.deque()  # (async result or results, digests)
+    pool = None
+    if args.workers:
+        method = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+        pool = multiprocessing.get_context(method).Pool(
+            args.workers, init_worker, (args.profile, args.optimized_model, args.threads))
+    else:
+        init_worker(args.profile, args.optimized_model, args.threads)
+
+    def finish(item):
+        nonlocal done
+        results, digests = item
+        results = results.get() if hasattr(results, "get") else results
+        if cache is not None:
+            cache.put_many([(digests[p], pr.class_ids, pr.logits, pr.logsumexp, pr.embedding)
+                            for p, pr in results if pr is not None and digests.get(p)])
+        writer.write([record_for(p, pr) for p, pr in results])
+        done += len(results)
+        rate = done / (time.perf_counter() - started)
+        print(f"{done}/{total} images, {rate:.1f} img/s", file=sys.stderr, flush=True)
+
+    try:
+        for chunk in chunks(paths):
+            digests = {}
+            if cache is not None:
+                digests = cache.digests(chunk)
+                hits = cache.get_many(digests.values())
+                if hits:
+                    finish(([(p, hits[digests[p]]) for p in chunk if digests[p] in hits], {}))
+                    chunk = [p for p in chunk if digests[p] not in hits]
+                if not chunk:
+                    continue
+            task = (chunk, args.batch_size, args.loader_workers, cache is not None)
+            pending.append((pool.apply_async(classify_chunk, task) if pool else classify_chunk(*task), digests))
+            # Keep every worker busy with one task queued behind it, no more
+            while len(pending) > 2 * max(1, args.workers):
+                finish(pending.popleft())
+        while pending:
+            finish(pending.popleft())
+    finally:
+        if pool is not None:
+            pool.terminate()
+        if cache is not None:
+            cache.evict()
+    return done
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Classify cat/dog images without the GUI.")
+    parser.add_argument("inputs", nargs="*", help="image files and folders (scanned recursively)")
+    parser.add_argument("--list", help="file with one image path per line ('-': stdin)")
+    parser.add_argument("--output", default="-", help="JSONL or CSV file (default: JSONL on stdout)")
+    parser.add_argument("--format", choices=("jsonl", "csv"), help="default: from the output extension")
+    parser.add_argument("--resume", action="store_true", help="skip images already in --output")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default=DEFAULT_PROFILE)
+    parser.add_argument("--optimized-model", help="model file written by cpu_optimize.py")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 1) // 2),
+                        help="worker processes (0: classify in this process)")
+    parser.add_argument("--threads", type=int, default=0, help="torch threads per worker (default: cores / workers)")
+    parser.add_argument("--loader-workers", type=int, default=2, help="decoding threads per worker")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--no-cache", action="store_true", help="don't read or write the prediction cache")
+    args = parser.parse_args(argv)
+    if not args.inputs and not args.list:
+        parser.error("give image files/folders or --list")
+    args.threads = args.threads or max(1, (os.cpu_count() or 1) // max(1, args.workers))
+
+    fmt = output_format(args.output, args.format)
+    skip = completed_paths(args.output, fmt) if args.resume else set()
+    paths = list(dict.fromkeys(p for p in collect_paths(args.inputs, args.list) if p not in skip))
+    print(f"{len(paths)} images to classify ({len(skip)} already done)", file=sys.stderr)
+
+    global _model
+    # No forward pass (and so no OpenMP thread pool) in the parent before forking
+    torch.set_num_threads(1)
+    _model = build_model(args.profile, args.optimized_model)
+    cache = None
+    if not args.no_cache:
+        try:
+            cache = PredictionCache(model_version=f"{_model.version}/{PREPROCESS_VERSION}")
+        except Exception as e:
+            print(f"Prediction cache disabled: {e}", file=sys.stderr)
+
+    writer = ResultWriter(args.output, fmt, append=args.resume)
+    try:
+        done = run(paths, writer, args, cache)
+    finally:
+        writer.close()
+        if cache is not None:
+            cache.close()
+    print(f"Classified {done} images.", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
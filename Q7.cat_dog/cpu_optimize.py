@@ -0,0 +1,201 @@
+# ========================= Q7: Optimized CPU Inference =========================
+# Faster CPU variant of a PetClassifier:
+#   - post-training static INT8 quantization of the backbone (FX graph mode),
+#     calibrated on a folder of local images;
+#   - channels_last memory format for the backbone and its input;
+#   - configurable intra-op threads and optional torch.compile.
+# The head stays FP32 (127 outputs, negligible cost). Before the model is
+# saved, a parity check compares it with the FP32 model on the cat/dog classes.
+#
+#   python cpu_optimize.py --calibrate calib_images/ --eval eval_images/ --threads 4
+#   CATDOG_OPTIMIZED_MODEL=~/.cache/cat_dog_classifier/models/pets_int8.pt python "cat vs dog.py"
+import argparse
+import copy
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import torch
+from torch import nn
+from torch.ao.quantization import get_default_qconfig_mapping
+from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+from image_files import iter_image_files
+from image_pipeline import CROP, BatchLoader
+from pet_labels import CAT_LABELS, OTHER_INDEX
+from pet_model import DEFAULT_PROFILE, MODEL_CACHE_DIR, PROFILES, load_classifier
+
+QUANT_BACKEND = 'x86' if 'x86' in torch.backends.quantized.supported_engines else 'qnnpack'
+DEFAULT_OUTPUT = os.path.join(MODEL_CACHE_DIR, "pets_int8.pt")
+
+
+def set_threads(threads):
+    """Intra-op threads used by each forward pass (0 keeps torch's default)."""
+    if threads:
+        torch.set_num_threads(threads)
+
+def list_images(folder, limit=None):
+    paths = list(iter_image_files(folder))
+    return paths[:limit] if limit else paths
+
+
+class OptimizedClassifier(nn.Module):
+    """PetClassifier-compatible wrapper: forward returns (logits, embeddings)."""
+
+    def __init__(self, backbone, head, version, channels_last=True):
+        super().__init__()
+        self.backbone = backbone
+        self.head = head
+        self.version = version
+        self.channels_last = channels_last
+
+    def forward(self, x):
+        if self.channels_last:
+            x = x.contiguous(memory_format=torch.channels_last)
+        embeddings = torch.flatten(self.backbone(x), 1)
+        return self.head(embeddings), embeddings
+
+
+# ------------------ Building ------------------
+def prepare_backbone(backbone):
+    torch.backends.quantized.engine = QUANT_BACKEND
+    example = (torch.zeros(1, 3, CROP, CROP),)
+    return prepare_fx(copy.deepcopy(backbone).eval(), get_default_qconfig_mapping(QUANT_BACKEND), example)
+
+def quantize_backbone(backbone, calibration_paths, batch_size=16):
+    """INT8 copy of `backbone`, activation ranges observed on calibration_paths."""
+    prepared = prepare_backbone(backbone)
+    with torch.inference_mode():
+        for _, batch, ok in BatchLoader(calibration_paths, batch_size):
+            if any(ok):
+                prepared(batch if all(ok) else batch[torch.tensor(ok)])
+    return convert_fx(prepared)
+
+def calibration_id(paths):
+    h = hashlib.blake2b(digest_size=4)
+    for path in paths:
+        h.update(f"{os.path.basename(path)}:{os.path.getsize(path)}\n".encode())
+    return h.hexdigest()
+
+def optimize_for_cpu(model, calibration_paths=None, channels_last=True):
+    """OptimizedClassifier from an FP32 PetClassifier; INT8 when calibration_paths are given."""
+    if model.backbone_name.endswith("_int8"):
+        raise ValueError(f"{model.backbone_name} is already quantized")
+    version = model.version
+    if calibration_paths:
+        backbone = quantize_backbone(model.backbone, calibration_paths)
+        version += f"/int8-{QUANT_BACKEND}-{calibration_id(calibration_paths)}"
+    else:
+        backbone = copy.deepcopy(model.backbone)
+    if channels_last:
+        backbone = backbone.to(memory_format=torch.channels_last)
+    return OptimizedClassifier(backbone, copy.deepcopy(model.head), version, channels_last).eval()
+
+# ------------------ Saving / loading ------------------
+def save_optimized(optimized, base, path, report=None):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    torch.save({"base_version": base.version, "version": optimized.version,
+                "channels_last": optimized.channels_last, "quantized": "/int8-" in optimized.version,
+                "state_dict": optimized.state_dict(), "parity": report}, path)
+
+def load_optimized(path, base):
+    """Rebuild a saved OptimizedClassifier around `base`, the FP32 model it was made from."""
+    saved = torch.load(path, weights_only=True)
+    if saved["base_version"] != base.version:
+        raise ValueError(f"{path} was built from {saved['base_version']}, not {base.version}")
+    backbone = convert_fx(prepare_backbone(base.backbone)) if saved["quantized"] else base.backbone
+    if saved["channels_last"]:
+        backbone = backbone.to(memory_format=torch.channels_last)
+    optimized = OptimizedClassifier(backbone, base.head, saved["version"], saved["channels_last"])
+    optimized.load_state_dict(saved["state_dict"])
+    return optimized.eval()
+
+# ------------------ Parity ------------------
+def animal_types(indices):
+    """0 = cat, 1 = dog, 2 = other for head output indices."""
+    return np.where(indices == OTHER_INDEX, 2, np.where(indices < len(CAT_LABELS), 0, 1))
+
+def parity_check(reference, candidate, paths, batch_size=16):
+    """Compare candidate with the FP32 reference on the cat/dog/Other head outputs."""
+    ref_probs, cand_probs = [], []
+    ref_time = cand_time = 0.0
+    with torch.inference_mode():
+        for _, batch, ok in BatchLoader(paths, batch_size):
+            if not any(ok):
+                continue
+            batch = batch if all(ok) else batch[torch.tensor(ok)]
+            start = time.perf_counter()
+            ref_logits, _ = reference(batch)
+            ref_time += time.perf_counter() - start
+            start = time.perf_counter()
+            cand_logits, _ = candidate(batch)
+            cand_time += time.perf_counter() - start
+            ref_probs.append(torch.softmax(ref_logits, dim=1).numpy())
+            cand_probs.append(torch.softmax(cand_logits, dim=1).numpy())
+    if not ref_probs:
+        raise ValueError("no images could be loaded for the parity check")
+    ref_probs, cand_probs = np.concatenate(ref_probs), np.concatenate(cand_probs)
+    ref_top, cand_top = ref_probs.argmax(1), cand_probs.argmax(1)
+    diff = np.abs(ref_probs - cand_probs)
+    n = len(ref_probs)
+    return {
+        "images": n,
+        "top1_agreement": float(np.mean(ref_top == cand_top)),
+        "animal_agreement": float(np.mean(animal_types(ref_top) == animal_types(cand_top))),
+        "max_abs_prob_diff": float(diff.max()),
+        "mean_abs_prob_diff": float(diff.mean()),
+        "fp32_ms_per_image": 1000 * ref_time / n,
+        "optimized_ms_per_image": 1000 * cand_time / n,
+        "speedup": ref_time / cand_time if cand_time else float('inf'),
+    }
+
+# ------------------ Main ------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build an INT8/channels_last CPU model for the cat/dog GUI.")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default=DEFAULT_PROFILE)
+    parser.add_argument("--calibrate", required=True, help="folder of representative images")
+    parser.add_argument("--calibration-images", type=int, default=200)
+    parser.add_argument("--eval", help="folder for the parity check (default: the calibration folder)")
+    parser.add_argument("--eval-images", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=0, help="intra-op threads (0: torch default)")
+    parser.add_argument("--no-channels-last", action="store_true")
+    parser.add_argument("--compile", action="store_true", help="also time a torch.compile'd model")
+    parser.add_argument("--min-agreement", type=float, default=0.98,
+                        help="required top-1 agreement with FP32 before the model is saved")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--report", help="write the parity report as JSON")
+    args = parser.parse_args(argv)
+
+    set_threads(args.threads)
+    base = load_classifier(args.profile)
+    calibration = list_images(args.calibrate, args.calibration_images)
+    evaluation = list_images(args.eval, args.eval_images) if args.eval else calibration
+    if not calibration or not evaluation:
+        parser.error("no images found")
+
+    print(f"Calibrating {base.version} on {len(calibration)} images ({QUANT_BACKEND}) ...", flush=True)
+    optimized = optimize_for_cpu(base, calibration, channels_last=not args.no_channels_last)
+    candidate = torch.compile(optimized) if args.compile else optimized
+    report = parity_check(base, candidate, evaluation)
+    report.update(threads=torch.get_num_threads(), compiled=args.compile, version=optimized.version)
+
+    print(f"\n=== PARITY vs FP32 ({report['images']} images) ===")
+    print(f"top-1 agreement      {report['top1_agreement']:.2%}")
+    print(f"cat/dog/other agree  {report['animal_agreement']:.2%}")
+    print(f"max |dp| / mean |dp| {report['max_abs_prob_diff']:.4f} / {report['mean_abs_prob_diff']:.5f}")
+    print(f"ms/image             {report['fp32_ms_per_image']:.1f} -> {report['optimized_ms_per_image']:.1f} "
+          f"({report['speedup']:.2f}x, {report['threads']} threads)")
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    if report["top1_agreement"] < args.min_agreement:
+        print(f"Top-1 agreement below {args.min_agreement:.0%}; model not saved.")
+        return 1
+    save_optimized(optimized, base, args.output, report)
+    print(f"Saved {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,238 @@
+# ========================= Q7: Embedding Index =========================
+# Pooled backbone embeddings of every classified image, L2-normalized and kept
+# in a memory-mapped float16 matrix (vectors.f16) with one "key<TAB>path" line
+# per row in keys.tsv. The key is the image's content digest, so a copy of an
+# image already stored adds nothing.
+#
+# search() is exact by default: cosine similarity against all rows, one BLAS
+# matmul per block. build_ivf() switches to an approximate mode: rows are
+# bucketed by k-means centroid (IVF) and only the n_probe closest buckets are
+# scanned; with pq_subvectors the rows in those buckets are first scored from
+# product-quantized uint8 codes, and only the best few are re-ranked exactly.
+import os
+import threading
+
+import numpy as np
+
+BLOCK_ROWS = 8192  # rows converted to float32 per matmul (64 MB at 2048-d)
+GROW_ROWS = 4096
+NEAR_DUPLICATE = 0.95  # cosine similarity above which two images count as the same photo
+
+
+def normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12)
+
+def top_k(scores, k):
+    """(indices, values) of the k largest scores in each row, best first."""
+    k = min(k, scores.shape[1])
+    if k == 0:
+        return np.empty((len(scores), 0), dtype=np.int64), np.empty((len(scores), 0), dtype=scores.dtype)
+    idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    values = np.take_along_axis(scores, idx, axis=1)
+    order = np.argsort(-values, axis=1, kind='stable')
+    return np.take_along_axis(idx, order, axis=1), np.take_along_axis(values, order, axis=1)
+
+def kmeans(x, k, iters=10, seed=0, spherical=False):
+    """(k, d) centroids of the rows of x; spherical k-means keeps them unit length."""
+    rng = np.random.default_rng(seed)
+    centroids = x[rng.choice(len(x), k, replace=len(x) < k)].copy()
+    for _ in range(iters):
+        if spherical:
+            assign = np.argmax(x @ centroids.T, axis=1)
+        else:
+            assign = np.argmax(2 * x @ centroids.T - (centroids ** 2).sum(axis=1), axis=1)
+        onehot = np.zeros((k, len(x)), dtype=x.dtype)
+        onehot[assign, np.arange(len(x))] = 1
+        sums = onehot @ x  # per-cluster sums as one matmul; np.add.at is far slower
+        counts = np.bincount(assign, minlength=k)
+        empty = counts == 0
+        centroids = sums / np.maximum(counts, 1)[:, None]
+        centroids[empty] = x[rng.integers(len(x), size=int(empty.sum()))]  # re-seed empty clusters
+        if spherical:
+            centroids = normalize(centroids)
+    return centroids
+
+
+class EmbeddingStore:
+    def __init__(self, directory, dim):
+        os.makedirs(directory, exist_ok=True)
+        self.dim = dim
+        self.vectors_path = os.path.join(directory, "vectors.f16")
+        self.keys_path = os.path.join(directory, "keys.tsv")
+        self.lock = threading.RLock()
+        self.keys, self.paths = [], []
+        if os.path.exists(self.keys_path):
+            with open(self.keys_path, encoding="utf-8") as f:
+                for line in f:
+                    key, _, path = line.rstrip('\n').partition('\t')
+                    self.keys.append(key)
+                    self.paths.append(path)
+        self.rows = {key: row for row, key in enumerate(self.keys)}
+        self.matrix = None
+        self._open(max(len(self.keys), GROW_ROWS))
+        self.ivf = None
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _open(self, capacity):
+        # Rows past len(self) are spare capacity; keys.tsv decides how many are valid
+        size = capacity * self.dim * 2
+        if not os.path.exists(self.vectors_path):
+            open(self.vectors_path, 'wb').close()
+        if os.path.getsize(self.vectors_path) < size:
+            with open(self.vectors_path, 'r+b') as f:
+                f.truncate(size)
+        capacity = os.path.getsize(self.vectors_path) // (self.dim * 2)
+        if self.matrix is not None:
+            self.matrix.flush()
+        self.matrix = np.memmap(self.vectors_path, dtype=np.float16, mode='r+', shape=(capacity, self.dim))
+
+    def add(self, keys, vectors, paths):
+        """Store the vectors whose keys are new; returns the row of every key."""
+        with self.lock:
+            new = {}
+            for i, key in enumerate(keys):
+                if key not in self.rows and key not in new:
+                    new[key] = i
+            if new:
+                start = len(self)
+                stop = start + len(new)
+                if stop > len(self.matrix):
+                    self._open(max(2 * len(self.matrix), stop))
+                self.matrix[start:stop] = normalize(np.asarray(vectors)[list(new.values())])
+                self.matrix.flush()
+                with open(self.keys_path, 'a', encoding="utf-8") as f:
+                    for key, i in new.items():
+                        path = paths[i].replace('\t', ' ').replace('\n', ' ')
+                        f.write(f"{key}\t{path}\n")
+                        self.rows[key] = len(self.keys)
+                        self.keys.append(key)
+                        self.paths.append(path)
+                if self.ivf is not None:
+                    self.ivf.add(start, stop)
+            return [self.rows[key] for key in keys]
+
+    def vector(self, key):
+        row = self.rows.get(key)
+        return None if row is None else np.array(self.matrix[row], dtype=np.float32)
+
+    # ------------------ Search ------------------
+    def search(self, queries, k=10, exact=False, before=None):
+        """(rows, scores) of the k most similar stored vectors per query, best first.
+
+        before optionally limits each query to rows below before[i]; missing
+        results are padded with row -1 and score -inf.
+        """
+        with self.lock:
+            if self.ivf is not None and not exact:
+                return self.ivf.search(queries, k, before=before)
+            return self.search_exact(queries, k, before)
+
+    def search_exact(self, queries, k=10, before=None):
+        queries = normalize(np.atleast_2d(queries))
+        rows = np.empty((len(queries), 0), dtype=np.int64)
+        scores = np.empty((len(queries), 0), dtype=np.float32)
+        for start in range(0, len(self), BLOCK_ROWS):
+            block = np.asarray(self.matrix[start:min(len(self), start + BLOCK_ROWS)], dtype=np.float32)
+            block_rows = np.broadcast_to(np.arange(start, start + len(block)), (len(queries), len(block)))
+            block_scores = queries @ block.T
+            if before is not None:
+                block_scores[block_rows >= np.asarray(before)[:, None]] = -np.inf
+            idx, scores = top_k(np.concatenate([scores, block_scores], axis=1), k)
+            rows = np.take_along_axis(np.concatenate([rows, block_rows], axis=1), idx, axis=1)
+        rows = np.where(np.isneginf(scores), -1, rows)
+        return rows, scores
+
+    def near_duplicates(self, keys, threshold=NEAR_DUPLICATE):
+        """For each stored key, (path, similarity) of its closest match stored before it, or (None, 0.0).
+
+        Only earlier rows count, so the first copy of a photo is the original
+        and re-checking it later never points it at its own duplicates.
+        """
+        with self.lock:
+            own = np.array([self.rows[key] for key in keys], dtype=np.int64)
+            if not len(own):
+                return []
+            found, scores = self.search(np.asarray(self.matrix[own], dtype=np.float32), 1, before=own)
+            return [(self.paths[row], float(score)) if row >= 0 and score >= threshold else (None, 0.0)
+                    for row, score in zip(found[:, 0], scores[:, 0])]
+
+    def build_ivf(self, n_lists=None, n_probe=8, pq_subvectors=None, seed=0):
+        """Switch search() to the approximate IVF (optionally IVF-PQ) mode."""
+        with self.lock:
+            n_lists = n_lists or max(1, int(np.sqrt(len(self))))
+            self.ivf = IVFIndex(self, n_lists, n_probe, pq_subvectors, seed=seed)
+            return self.ivf
+
+
+class IVFIndex:
+    """Inverted-file index over an EmbeddingStore's rows."""
+
+    def __init__(self, store, n_lists, n_probe=8, pq_subvectors=None, sample=20000, rerank=10, seed=0):
+        self.store = store
+        self.n_probe = n_probe
+        self.rerank = rerank
+        rng = np.random.default_rng(seed)
+        rows = np.sort(rng.choice(len(store), min(sample, len(store)), replace=False))
+        x = np.asarray(store.matrix[rows], dtype=np.float32)
+        self.centroids = kmeans(x, n_lists, seed=seed, spherical=True)
+        self.codebooks = None
+        if pq_subvectors:
+            if store.dim % pq_subvectors:
+                raise ValueError(f"dim {store.dim} is not divisible by {pq_subvectors} subvectors")
+            residuals = x - self.centroids[np.argmax(x @ self.centroids.T, axis=1)]
+            residuals = residuals.reshape(len(x), pq_subvectors, -1)
+            self.codebooks = np.stack([kmeans(residuals[:, j], 256, seed=seed + j)
+                                       for j in range(pq_subvectors)])
+        self.assign = np.empty(0, dtype=np.int32)
+        self.codes = np.empty((0, pq_subvectors or 0), dtype=np.uint8)
+        self.lists = None
+        self.add(0, len(store))
+
+    def _split(self, x):
+        """(n, d) -> (n, m, d / m) for the m PQ subvectors."""
+        return x.reshape(len(x), len(self.codebooks), -1)
+
+    def add(self, start, stop):
+        for block in range(start, stop, BLOCK_ROWS):
+            x = np.asarray(self.store.matrix[block:min(stop, block + BLOCK_ROWS)], dtype=np.float32)
+            assign = np.argmax(x @ self.centroids.T, axis=1).astype(np.int32)
+            self.assign = np.concatenate([self.assign, assign])
+            if self.codebooks is not None:
+                residuals = self._split(x - self.centroids[assign])
+                distances = (np.einsum('nmd,mcd->nmc', residuals, self.codebooks) * -2
+                             + (self.codebooks ** 2).sum(axis=2)[None])
+                self.codes = np.concatenate([self.codes, np.argmin(distances, axis=2).astype(np.uint8)])
+        self.lists = None
+
+    def _candidates(self, probe):
+        if self.lists is None:
+            order = np.argsort(self.assign, kind='stable')
+            bounds = np.searchsorted(self.assign[order], np.arange(len(self.centroids) + 1))
+            self.lists = [order[bounds[i]:bounds[i + 1]] for i in range(len(self.centroids))]
+        return np.sort(np.concatenate([self.lists[c] for c in probe]))
+
+    def search(self, queries, k=10, n_probe=None, before=None):
+        queries = normalize(np.atleast_2d(queries))
+        centroid_scores = queries @ self.centroids.T
+        probes, _ = top_k(centroid_scores, n_probe or self.n_probe)
+        rows = np.full((len(queries), k), -1, dtype=np.int64)
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        for i, (query, probe) in enumerate(zip(queries, probes)):
+            candidates = self._candidates(probe)
+            if before is not None:
+                candidates = candidates[candidates < before[i]]
+            if self.codebooks is not None and len(candidates) > k * self.rerank:
+                # q.(c + r) ~= q.c + sum_j q_j.codebook_j[code_j]
+                tables = np.einsum('md,mcd->mc', self._split(query[None])[0], self.codebooks)
+                approx = (centroid_scores[i, self.assign[candidates]]
+                          + tables[np.arange(len(tables)), self.codes[candidates]].sum(axis=1))
+                keep, _ = top_k(approx[None], k * self.rerank)
+                candidates = np.sort(candidates[keep[0]])
+            exact = np.asarray(self.store.matrix[candidates], dtype=np.float32) @ query
+            idx, best = top_k(exact[None], k)
+            rows[i, :idx.shape[1]] = candidates[idx[0]]
+            scores[i, :idx.shape[1]] = best[0]
+        return rows, scores
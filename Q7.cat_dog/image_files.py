@@ -0,0 +1,28 @@
+# ========================= Q7: Image File Discovery =========================
+# Streams image paths out of a directory tree without building the full listing
+# first, so callers can show or classify the first files while the scan goes on.
+import os
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def iter_image_files(folder):
+    """Yield image paths under `folder`, depth first and in name order; unreadable dirs are skipped."""
+    stack = [folder]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
+        subdirs = []
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                    continue
+            except OSError:
+                continue
+            if entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                yield entry.path
+        stack.extend(reversed(subdirs))
@@ -0,0 +1,123 @@
+# ========================= Q7: Prefetching Image Pipeline =========================
+# Decodes and preprocesses images on a thread pool while the model runs on the
+# previous batch. Preprocessing matches the classifier's transforms.Compose
+# (Resize 256, CenterCrop 224, ToTensor, Normalize) but:
+#   - JPEGs are decoded in draft mode at the smallest 1/2, 1/4 or 1/8 scale
+#     that still covers the resize target, so large photos decode much faster;
+#   - images are written straight into preallocated (pinned, when CUDA is
+#     available) batch tensors that are reused for the whole run.
+# PIL releases the GIL while decoding and resizing, so threads scale across cores.
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import torch
+from PIL import Image
+
+RESIZE = 256
+CROP = 224
+# Preprocessing part of prediction cache keys (the model part comes from PetClassifier.version)
+PREPROCESS_VERSION = f"resize{RESIZE}-crop{CROP}-draft"
+MEAN = torch.tensor([0.485, 0.456, 0.406]).view(1, 3, 1, 1)
+STD = torch.tensor([0.229, 0.224, 0.225]).view(1, 3, 1, 1)
+
+
+def load_pixels(path, draft=True):
+    """Decode, resize (shorter side RESIZE) and center-crop to a CROPxCROPx3 uint8 array."""
+    with Image.open(path) as img:
+        if draft:
+            img.draft('RGB', (RESIZE, RESIZE))
+        img = img.convert('RGB')
+    w, h = img.size
+    if w <= h:
+        size = (RESIZE, int(RESIZE * h / w))
+    else:
+        size = (int(RESIZE * w / h), RESIZE)
+    img = img.resize(size, Image.BILINEAR)
+    left = int(round((size[0] - CROP) / 2.0))
+    top = int(round((size[1] - CROP) / 2.0))
+    img = img.crop((left, top, left + CROP, top + CROP))
+    return np.array(img)
+
+
+def normalize_(batch):
+    """In-place ToTensor scaling + Normalize on a (n, 3, CROP, CROP) float batch."""
+    return batch.div_(255.0).sub_(MEAN).div_(STD)
+
+
+class BatchLoader:
+    """Iterate over (paths, batch, ok) for `paths`, loading ahead of the consumer.
+
+    `batch` is a view into a reused buffer: it is only valid until the next
+    iteration. `ok[i]` is False for images that failed to load; their rows
+    hold stale data and must be skipped.
+    """
+
+    def __init__(self, paths, batch_size=32, workers=None, prefetch=2, draft=True, pin_memory=None):
+        self.paths = list(paths)
+        self.batch_size = batch_size
+        self.workers = workers or min(8, os.cpu_count() or 1)
+        self.prefetch = prefetch
+        self.draft = draft
+        self.pin_memory = torch.cuda.is_available() if pin_memory is None else pin_memory
+        # `prefetch` batches being filled or waiting, plus the one being consumed
+        self.buffers = [self._allocate() for _ in range(prefetch + 1)]
+
+    def __len__(self):
+        return (len(self.paths) + self.batch_size - 1) // self.batch_size
+
+    def _allocate(self):
+        # Normal tensors even under inference_mode: the producer thread fills them outside it
+        with torch.inference_mode(False):
+            buffer = torch.empty((self.batch_size, 3, CROP, CROP), dtype=torch.float32)
+        return buffer.pin_memory() if self.pin_memory else buffer
+
+    def _fill(self, path, row):
+        try:
+            row.copy_(torch.from_numpy(load_pixels(path, self.draft)).permute(2, 0, 1))
+            return True
+        except Exception as e:
+            print(f"Failed to load {path}: {e}")
+            return False
+
+    def _produce(self, free, ready, stop):
+        try:
+            with ThreadPoolExecutor(self.workers) as pool:
+                for start in range(0, len(self.paths), self.batch_size):
+                    buffer = None
+                    while buffer is None and not stop.is_set():
+                        try:
+                            buffer = free.get(timeout=0.1)
+                        except queue.Empty:
+                            pass
+                    if stop.is_set():
+                        return
+                    batch_paths = self.paths[start:start + self.batch_size]
+                    batch = buffer[:len(batch_paths)]
+                    ok = list(pool.map(self._fill, batch_paths, batch.unbind(0)))
+                    normalize_(batch)
+                    ready.put((batch_paths, buffer, ok))
+            ready.put(None)
+        except BaseException as e:
+            ready.put(e)
+
+    def __iter__(self):
+        free, ready, stop = queue.Queue(), queue.Queue(), threading.Event()
+        for buffer in self.buffers:
+            free.put(buffer)
+        producer = threading.Thread(target=self._produce, args=(free, ready, stop), daemon=True)
+        producer.start()
+        try:
+            while True:
+                item = ready.get()
+                if item is None:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                batch_paths, buffer, ok = item
+                yield batch_paths, buffer[:len(batch_paths)], ok
+                free.put(buffer)
+        finally:
+            stop.set()
@@ -0,0 +1,51 @@
+# ========================= Q7: Cat/Dog Labels =========================
+# ImageNet cat/dog classes and the order of the pet head's outputs. Kept free of
+# torch so the GUI can import it before the model has loaded.
+
+# Full cat and dog breeds from ImageNet
+CAT_LABELS = {
+    281: 'Tabby cat', 282: 'Tiger cat', 283: 'Persian cat', 284: 'Siamese cat', 285: 'Egyptian cat',
+}
+DOG_LABELS = {
+    151: 'Chihuahua', 152: 'Japanese spaniel', 153: 'Maltese dog', 154: 'Pekinese', 155: 'Shih-Tzu',
+    156: 'Blenheim spaniel', 157: 'Papillon', 158: 'Toy terrier', 159: 'Rhodesian ridgeback', 160: 'Afghan hound',
+    161: 'Basset', 162: 'Beagle', 163: 'Bloodhound', 164: 'Bluetick', 165: 'Black-and-tan coonhound',
+    166: 'Walker hound', 167: 'English foxhound', 168: 'Redbone', 169: 'Borzoi', 170: 'Irish wolfhound',
+    171: 'Italian greyhound', 172: 'Whippet', 173: 'Ibizan hound', 174: 'Norwegian elkhound', 175: 'Otterhound',
+    176: 'Saluki', 177: 'Scottish deerhound', 178: 'Weimaraner', 179: 'Staffordshire bullterrier',
+    180: 'American Staffordshire terrier', 181: 'Bedlington terrier', 182: 'Border terrier', 183: 'Kerry blue terrier',
+    184: 'Irish terrier', 185: 'Norfolk terrier', 186: 'Norwich terrier', 187: 'Yorkshire terrier', 188: 'Wire-haired fox terrier',
+    189: 'Lakeland terrier', 190: 'Sealyham terrier', 191: 'Airedale', 192: 'Cairn', 193: 'Australian terrier',
+    194: 'Dandie Dinmont', 195: 'Boston bull', 196: 'Miniature schnauzer', 197: 'Giant schnauzer', 198: 'Standard schnauzer',
+    199: 'Scotch terrier', 200: 'Tibetan terrier', 201: 'Silky terrier', 202: 'Soft-coated wheaten terrier', 203: 'West Highland white terrier',
+    204: 'Lhasa', 205: 'Flat-coated retriever', 206: 'Curly-coated retriever', 207: 'Golden retriever', 208: 'Labrador retriever',
+    209: 'Chesapeake Bay retriever', 210: 'German short-haired pointer', 211: 'Vizsla', 212: 'English setter', 213: 'Irish setter',
+    214: 'Gordon setter', 215: 'Brittany spaniel', 216: 'Clumber', 217: 'English springer', 218: 'Welsh springer spaniel',
+    219: 'Cocker spaniel', 220: 'Sussex spaniel', 221: 'Irish water spaniel', 222: 'Kuvasz', 223: 'Schipperke', 224: 'Groenendael',
+    225: 'Malinois', 226: 'Briard', 227: 'Kelpie', 228: 'Komondor', 229: 'Old English sheepdog', 230: 'Shetland sheepdog',
+    231: 'Collie', 232: 'Border collie', 233: 'Bouvier des Flandres', 234: 'Rottweiler', 235: 'German shepherd', 236: 'Doberman',
+    237: 'Miniature pinscher', 238: 'Greater Swiss Mountain dog', 239: 'Bernese mountain dog', 240: 'Appenzeller', 241: 'EntleBucher',
+    242: 'Boxer', 243: 'Bull mastiff', 244: 'Tibetan mastiff', 245: 'French bulldog', 246: 'Great Dane', 247: 'Saint Bernard',
+    248: 'Eskimo dog', 249: 'Malamute', 250: 'Siberian husky', 251: 'Dalmatian', 252: 'Affenpinscher', 253: 'Basenji', 254: 'Pug',
+    255: 'Leonberg', 256: 'Newfoundland', 257: 'Great Pyrenees', 258: 'Samoyed', 259: 'Pomeranian', 260: 'Chow', 261: 'Keeshond',
+    262: 'Brabancon griffon', 263: 'Pembroke', 264: 'Cardigan', 265: 'Toy poodle', 266: 'Miniature poodle', 267: 'Standard poodle',
+    268: 'Mexican hairless', 269: 'Dingo', 270: 'Dhole', 271: 'African hunting dog'
+}
+OTHER_LABEL = 'Other'
+
+# Head output i is ImageNet class PET_CLASS_IDS[i]; the last output is "Other"
+PET_CLASS_IDS = sorted(CAT_LABELS) + sorted(DOG_LABELS)
+LABELS = [CAT_LABELS.get(i) or DOG_LABELS[i] for i in PET_CLASS_IDS] + [OTHER_LABEL]
+OTHER_INDEX = len(LABELS) - 1
+# Model profile used when none is chosen (see pet_model.PROFILES); here so the GUI can read it early
+DEFAULT_PROFILE = "accurate"
+
+
+def describe_prediction(predicted_class):
+    """(animal_type, breed_name) for a label from LABELS."""
+    if predicted_class == OTHER_LABEL:
+        return OTHER_LABEL, "Not a cat or dog"
+    animal_type = "Cat" if predicted_class in CAT_LABELS.values() else "Dog"
+    # Clean breed name
+    breed_name = predicted_class.replace('dog', '').replace('cat', '').strip().title()
+    return animal_type, breed_name
@@ -0,0 +1,123 @@
+# ========================= Q7: Cat/Dog Model =========================
+# ImageNet backbones with a slimmed classification head: the final FC layer is
+# sliced down to the 126 cat and dog classes, plus one "Other" logit for images
+# that are neither. Softmax/top-k then run over 127 classes instead of 1000.
+#
+# The "Other" logit is a constant (zero weights, bias = other_logit): it wins
+# whenever no cat/dog logit reaches it, i.e. the backbone sees no pet with
+# reasonable evidence. Raise it to reject more out-of-domain images.
+#
+# load_classifier() keeps a local copy of each profile's weights and loads it
+# memory-mapped into a model built on the meta device, which skips random
+# initialization and the copy of 100 MB of weights on every start.
+import os
+
+import torch
+from torch import nn
+from torchvision import models
+from torchvision.models import quantization
+
+from pet_labels import DEFAULT_PROFILE, LABELS, PET_CLASS_IDS
+
+# name -> (builder, weights, path of the final ImageNet Linear)
+BACKBONES = {
+    "resnet50": (models.resnet50, models.ResNet50_Weights.IMAGENET1K_V1, "fc"),
+    "efficientnet_b0": (models.efficientnet_b0, models.EfficientNet_B0_Weights.IMAGENET1K_V1, "classifier.1"),
+    "mobilenet_v3_large": (models.mobilenet_v3_large, models.MobileNet_V3_Large_Weights.IMAGENET1K_V1, "classifier.3"),
+    "resnet50_int8": (quantization.resnet50, quantization.ResNet50_QuantizedWeights.IMAGENET1K_FBGEMM_V1, "fc"),
+}
+
+# Latency/accuracy trade-offs (ImageNet-1K top-1, GFLOPs per image):
+#   accurate  ResNet50 FP32        76.1%  4.1   the original model
+#   balanced  ResNet50 INT8        75.9%  4.1   ~2-3x faster on x86/ARM CPUs
+#   fast      MobileNetV3-Large    74.0%  0.22
+PROFILES = {
+    "accurate": {"backbone_name": "resnet50", "other_logit": 6.0},
+    "balanced": {"backbone_name": "resnet50_int8", "other_logit": 6.0},
+    "fast": {"backbone_name": "mobilenet_v3_large", "other_logit": 6.0},
+}
+MODEL_CACHE_DIR = os.environ.get(
+    "CATDOG_MODEL_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "cat_dog_classifier", "models"))
+
+
+def classifier_version(backbone_name, other_logit):
+    weights = BACKBONES[backbone_name][1]
+    return f"{backbone_name}-{weights.name.lower()}/pets{len(PET_CLASS_IDS)}+other{other_logit:g}"
+
+
+class PetHead(nn.Module):
+    """The rows of an ImageNet Linear for PET_CLASS_IDS, plus a constant "Other" logit."""
+
+    def __init__(self, linear, other_logit):
+        super().__init__()
+        weight, bias = linear.weight, linear.bias
+        if callable(weight):  # quantized Linear: weight() / bias() accessors
+            weight, bias = weight().dequantize(), bias()
+        ids = torch.tensor(PET_CLASS_IDS)
+        self.linear = nn.Linear(weight.shape[1], len(LABELS))
+        with torch.no_grad():
+            self.linear.weight.zero_()
+            self.linear.weight[:-1] = weight.detach()[ids]
+            self.linear.bias[:-1] = bias.detach()[ids]
+            self.linear.bias[-1] = other_logit
+        self.other_logit = other_logit
+
+    def forward(self, embeddings):
+        return self.linear(embeddings)
+
+
+class PetClassifier(nn.Module):
+    """Backbone without its ImageNet classifier + PetHead; forward returns (logits, embeddings)."""
+
+    def __init__(self, backbone_name="resnet50", other_logit=6.0, pretrained=True):
+        super().__init__()
+        builder, weights, fc_path = BACKBONES[backbone_name]
+        kwargs = {"quantize": True} if backbone_name.endswith("_int8") else {}
+        backbone = builder(weights=weights if pretrained else None, **kwargs)
+        parent_path, _, attr = fc_path.rpartition('.')
+        parent = backbone.get_submodule(parent_path) if parent_path else backbone
+        self.head = PetHead(getattr(parent, attr), other_logit)
+        # The backbone now ends at the pooled features
+        setattr(parent, attr, nn.Identity())
+        self.backbone = backbone.eval()
+        self.eval()
+        self.backbone_name = backbone_name
+        self.version = classifier_version(backbone_name, other_logit)
+
+    @classmethod
+    def from_profile(cls, profile=DEFAULT_PROFILE, pretrained=True):
+        return cls(pretrained=pretrained, **PROFILES[profile])
+
+    def forward(self, x):
+        embeddings = torch.flatten(self.backbone(x), 1)
+        return self.head(embeddings), embeddings
+
+
+def load_classifier(profile=DEFAULT_PROFILE, cache_dir=MODEL_CACHE_DIR):
+    """PetClassifier for `profile`, memory-mapped from cache_dir once it has been saved there."""
+    config = PROFILES[profile]
+    if config["backbone_name"].endswith("_int8"):
+        # Quantized modules can't be built on the meta device
+        return PetClassifier(**config)
+    version = classifier_version(**config)
+    path = os.path.join(cache_dir, version.replace('/', '_') + ".pt")
+    if os.path.exists(path):
+        with torch.device('meta'):
+            model = PetClassifier(pretrained=False, **config)
+        model.load_state_dict(torch.load(path, mmap=True, weights_only=True), assign=True)
+        return model.eval()
+    model = PetClassifier(**config)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        torch.save(model.state_dict(), tmp)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"Could not cache model weights: {e}")
+    return model
+
+
+def warm_up(model, batch_size=1):
+    """One forward pass so kernel selection and allocations happen before the first real image."""
+    with torch.inference_mode():
+        model(torch.zeros(batch_size, 3, 224, 224))
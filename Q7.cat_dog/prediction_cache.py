@@ -0,0 +1,154 @@
+# ========================= Q7: Persistent Prediction Cache =========================
+# SQLite cache of classifier outputs keyed by image content hash + model version.
+#
+#   files        path -> (mtime, size, digest): a file is only re-hashed when its
+#                mtime or size changes
+#   predictions  (digest, model_version) -> top-k class ids/logits, logsumexp of
+#                all logits (so top-k probabilities can be rebuilt exactly) and the
+#                pooled embedding (float16)
+#
+# Entries are evicted least-recently-used once the stored bytes exceed max_bytes.
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+DEFAULT_CACHE_PATH = os.environ.get(
+    "CATDOG_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "cat_dog_classifier", "predictions.sqlite"))
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+TOP_K = 5
+
+
+def file_digest(path, chunk_size=1 << 20):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        while chunk := f.read(chunk_size):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class CachedPrediction:
+    __slots__ = ("class_ids", "logits", "logsumexp", "embedding")
+
+    def __init__(self, class_ids, logits, logsumexp, embedding):
+        self.class_ids = class_ids
+        self.logits = logits
+        self.logsumexp = logsumexp
+        self.embedding = embedding
+
+    def probabilities(self):
+        """Softmax probabilities of the stored top-k classes."""
+        return np.exp(self.logits - self.logsumexp)
+
+
+class PredictionCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, model_version="", max_bytes=DEFAULT_MAX_BYTES):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.model_version = model_version
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, digest TEXT);
+            CREATE TABLE IF NOT EXISTS predictions (
+                digest TEXT, model_version TEXT, class_ids BLOB, logits BLOB,
+                logsumexp REAL, embedding BLOB, nbytes INTEGER, last_access REAL,
+                PRIMARY KEY (digest, model_version));
+            CREATE INDEX IF NOT EXISTS predictions_lru ON predictions (last_access);
+        """)
+
+    # ------------------ Content addressing ------------------
+    def digests(self, paths):
+        """path -> content digest (None if unreadable), re-hashing only changed files."""
+        result, changed = {}, []
+        with self.lock:
+            known = {row[0]: row[1:] for row in self._select_in(
+                "SELECT path, mtime_ns, size, digest FROM files WHERE path IN ({})", paths)}
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                result[path] = None
+                continue
+            row = known.get(path)
+            if row and row[0] == st.st_mtime_ns and row[1] == st.st_size:
+                result[path] = row[2]
+                continue
+            try:
+                result[path] = file_digest(path)
+            except OSError:
+                result[path] = None
+                continue
+            changed.append((path, st.st_mtime_ns, st.st_size, result[path]))
+        if changed:
+            with self.lock, self.db:
+                self.db.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)", changed)
+        return result
+
+    def _select_in(self, sql, values, params=(), chunk=500):
+        # SQLite limits the number of bound parameters per statement
+        values = list(values)
+        for start in range(0, len(values), chunk):
+            part = values[start:start + chunk]
+            yield from self.db.execute(sql.format(','.join('?' * len(part))), (*params, *part))
+
+    # ------------------ Predictions ------------------
+    def get_many(self, digests):
+        """digest -> CachedPrediction for the digests cached under this model version."""
+        digests = [d for d in set(digests) if d]
+        with self.lock:
+            rows = list(self._select_in(
+                "SELECT digest, class_ids, logits, logsumexp, embedding FROM predictions "
+                "WHERE model_version = ? AND digest IN ({})", digests, (self.model_version,)))
+            if rows:
+                with self.db:
+                    now = time.time()
+                    self.db.executemany(
+                        "UPDATE predictions SET last_access = ? WHERE digest = ? AND model_version = ?",
+                        [(now, row[0], self.model_version) for row in rows])
+        return {digest: CachedPrediction(np.frombuffer(ids, dtype=np.int32),
+                                         np.frombuffer(logits, dtype=np.float32), lse,
+                                         np.frombuffer(emb, dtype=np.float16) if emb else None)
+                for digest, ids, logits, lse, emb in rows}
+
+    def put_many(self, entries):
+        """Store (digest, class_ids, logits, logsumexp, embedding) tuples."""
+        now = time.time()
+        rows = []
+        for digest, class_ids, logits, logsumexp, embedding in entries:
+            ids = np.asarray(class_ids, dtype=np.int32).tobytes()
+            lg = np.asarray(logits, dtype=np.float32).tobytes()
+            emb = np.asarray(embedding, dtype=np.float16).tobytes() if embedding is not None else None
+            nbytes = len(ids) + len(lg) + (len(emb) if emb else 0) + len(digest) + len(self.model_version)
+            rows.append((digest, self.model_version, ids, lg, float(logsumexp), emb, nbytes, now))
+        with self.lock, self.db:
+            self.db.executemany("INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def evict(self):
+        """Drop least recently used predictions until the cache fits in max_bytes."""
+        with self.lock, self.db:
+            total = self.db.execute("SELECT COALESCE(SUM(nbytes), 0) FROM predictions").fetchone()[0]
+            if total <= self.max_bytes:
+                return 0
+            excess, removed = total - self.max_bytes, 0
+            victims = []
+            for digest, version, nbytes in self.db.execute(
+                    "SELECT digest, model_version, nbytes FROM predictions ORDER BY last_access"):
+                victims.append((digest, version))
+                removed += nbytes
+                if removed >= excess:
+                    break
+            self.db.executemany("DELETE FROM predictions WHERE digest = ? AND model_version = ?", victims)
+            self.db.execute("DELETE FROM files WHERE digest NOT IN (SELECT digest FROM predictions)")
+            return len(victims)
+
+    def close(self):
+        with self.lock:
+            self.db.close()
@@ -0,0 +1 @@
+# Helpers shared by the Q1-Q7 apps (import with the repository root on sys.path).
@@ -0,0 +1,107 @@
+# ========================= Shared: Camera Probe =========================
+# Finds a working camera without trying indexes one after another (a missing
+# camera can take seconds to fail on some backends):
+#
+#   cap, index = open_first_camera(range(5), backend=cv2.CAP_DSHOW, key="q1")
+#
+# The index that worked last time (kept per key in CAMERA_CACHE) is tried
+# first, alone. Otherwise every index is opened concurrently, and the lowest
+# index that opens within PROBE_TIMEOUT seconds wins. A capture that opens
+# after the probe has given up, or that lost to a lower index, is released.
+import json
+import os
+import threading
+import time
+
+import cv2
+
+PROBE_TIMEOUT = 3.0
+CAMERA_CACHE = os.environ.get(
+    "CAMERA_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "vision_apps", "cameras.json"))
+
+
+def _load_cache():
+    try:
+        with open(CAMERA_CACHE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_cache(key, index):
+    cache = _load_cache()
+    if cache.get(key) == index:
+        return
+    cache[key] = index
+    try:
+        os.makedirs(os.path.dirname(CAMERA_CACHE), exist_ok=True)
+        tmp = f"{CAMERA_CACHE}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(cache, f)
+        os.replace(tmp, CAMERA_CACHE)
+    except OSError:
+        pass
+
+
+class _Probe:
+    """Opens several indexes on daemon threads and hands out the lowest one that works."""
+
+    def __init__(self, indexes, backend):
+        self.indexes = list(indexes)
+        self.results = {}  # index -> VideoCapture, or None if it failed
+        self.claimed = False
+        self.cond = threading.Condition()
+        for index in self.indexes:
+            threading.Thread(target=self._open, args=(index, backend), daemon=True).start()
+
+    def _open(self, index, backend):
+        try:
+            cap = cv2.VideoCapture(index, backend)
+            if not cap.isOpened():
+                cap.release()
+                cap = None
+        except Exception:
+            cap = None
+        with self.cond:
+            if self.claimed and cap is not None:
+                cap.release()  # too late: the probe is over
+                cap = None
+            self.results[index] = cap
+            self.cond.notify_all()
+
+    def _winner(self):
+        for index in self.indexes:
+            if index not in self.results:
+                return None  # a lower index might still open
+            if self.results[index] is not None:
+                return index
+        return -1  # all failed
+
+    def wait(self, timeout):
+        deadline = time.monotonic() + timeout
+        with self.cond:
+            while (winner := self._winner()) is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    # Give up on the slow ones; take the lowest index that did open
+                    winner = next((i for i in self.indexes if self.results.get(i) is not None), -1)
+                    break
+                self.cond.wait(remaining)
+            self.claimed = True
+            for index, cap in self.results.items():
+                if cap is not None and index != winner:
+                    cap.release()
+            return (self.results[winner], winner) if winner >= 0 else (None, None)
+
+
+def open_first_camera(indexes=range(5), backend=cv2.CAP_ANY, key=None, timeout=PROBE_TIMEOUT):
+    """(VideoCapture, index) for the lowest working camera index, or (None, None)."""
+    indexes = list(indexes)
+    cached = _load_cache().get(key) if key else None
+    if cached in indexes:
+        cap, index = _Probe([cached], backend).wait(timeout)
+        if cap is not None:
+            return cap, index
+    cap, index = _Probe(indexes, backend).wait(timeout)
+    if cap is not None and key:
+        _save_cache(key, index)
+    return cap, index
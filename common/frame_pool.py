@@ -0,0 +1,104 @@
+# ========================= Shared: Frame Buffer Pool =========================
+# Named, preallocated arrays for the per-frame work of the camera apps, so a
+# steady stream of frames reuses the same memory instead of allocating several
+# full-resolution arrays per frame:
+#
+#   POOL = FramePool()
+#   ret, frame = POOL.read(cap)                       # decodes into a reused buffer
+#   frame = POOL.flip("mirror", frame, 1)
+#   gray = POOL.cvt_color("gray", frame, cv2.COLOR_BGR2GRAY)
+#   ...
+#   POOL.end_frame()
+#
+# Each helper passes a pooled array as OpenCV's dst= output. A buffer is only
+# reallocated when the frame size changes. A returned buffer is overwritten
+# the next time the same name is used, so copy anything that must outlive the
+# frame.
+#
+# With FRAME_POOL_DEBUG=1, tracemalloc follows every NumPy/OpenCV allocation,
+# and every DEBUG_REPORT_FRAMES frames a line reports the pool's own
+# allocations and the peak transient memory per frame.
+import os
+import tracemalloc
+
+import cv2
+import numpy as np
+
+DEBUG_REPORT_FRAMES = 100
+# Color conversions that change the channel count; the rest keep it
+_CONVERSION_CHANNELS = {
+    cv2.COLOR_BGR2GRAY: 1, cv2.COLOR_RGB2GRAY: 1, cv2.COLOR_BGRA2GRAY: 1,
+    cv2.COLOR_GRAY2BGR: 3, cv2.COLOR_GRAY2RGB: 3, cv2.COLOR_BGRA2BGR: 3, cv2.COLOR_BGRA2RGB: 3,
+    cv2.COLOR_BGR2BGRA: 4, cv2.COLOR_BGR2RGBA: 4,
+}
+
+
+class FramePool:
+    def __init__(self, debug=None):
+        self.buffers = {}
+        self.allocations = 0  # buffers (re)allocated by the pool since the start
+        self.debug = os.environ.get("FRAME_POOL_DEBUG") == "1" if debug is None else debug
+        self.frames = 0
+        self.report_allocations = 0
+        self.report_peak = 0
+        if self.debug and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.frame_start = tracemalloc.get_traced_memory()[0] if self.debug else 0
+
+    def get(self, name, shape, dtype=np.uint8):
+        """The pooled array `name`, reallocated only if shape or dtype differ from last time."""
+        shape = tuple(shape)
+        buf = self.buffers.get(name)
+        if buf is None or buf.shape != shape or buf.dtype != dtype:
+            buf = self.buffers[name] = np.empty(shape, dtype)
+            self.allocations += 1
+        return buf
+
+    # ------------------ OpenCV with pooled outputs ------------------
+    def read(self, cap, name="capture"):
+        """cap.read() into a pooled buffer. Other readers (RingCapture's zero-copy views) are passed through."""
+        buf = self.buffers.get(name)
+        if not isinstance(cap, cv2.VideoCapture):
+            return cap.read()
+        ret, frame = cap.read(buf) if buf is not None else cap.read()
+        if ret and frame is not None and frame is not buf:
+            # First frame or a new size: adopt it as the buffer for the next reads
+            self.buffers[name] = frame
+            self.allocations += 1
+        return ret, frame
+
+    def flip(self, name, src, code):
+        return cv2.flip(src, code, dst=self.get(name, src.shape, src.dtype))
+
+    def cvt_color(self, name, src, code):
+        channels = _CONVERSION_CHANNELS.get(code, src.shape[2] if src.ndim == 3 else 1)
+        shape = src.shape[:2] if channels == 1 else (*src.shape[:2], channels)
+        return cv2.cvtColor(src, code, dst=self.get(name, shape, src.dtype))
+
+    def resize(self, name, src, size, interpolation=cv2.INTER_LINEAR):
+        width, height = size
+        return cv2.resize(src, (width, height), dst=self.get(name, (height, width, *src.shape[2:]), src.dtype),
+                          interpolation=interpolation)
+
+    def copy(self, name, src):
+        buf = self.get(name, src.shape, src.dtype)
+        np.copyto(buf, src)
+        return buf
+
+    # ------------------ Debug accounting ------------------
+    def end_frame(self):
+        """Mark the end of a frame; in debug mode, account and periodically report its allocations."""
+        if not self.debug:
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        self.frames += 1
+        self.report_peak = max(self.report_peak, peak - self.frame_start)
+        if self.frames % DEBUG_REPORT_FRAMES == 0:
+            new = self.allocations - self.report_allocations
+            print(f"frame pool: {new / DEBUG_REPORT_FRAMES:.2f} pool allocations/frame, "
+                  f"peak transient {self.report_peak / 1e6:.1f} MB/frame, "
+                  f"pooled {sum(b.nbytes for b in self.buffers.values()) / 1e6:.1f} MB in {len(self.buffers)} buffers")
+            self.report_allocations = self.allocations
+            self.report_peak = 0
+        tracemalloc.reset_peak()
+        self.frame_start = tracemalloc.get_traced_memory()[0]
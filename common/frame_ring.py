@@ -0,0 +1,266 @@
+# ========================= Shared: Frame Ring =========================
+# One camera, several analyzers: a capture daemon decodes each frame once into
+# a multiprocessing.shared_memory ring buffer, and every analysis process
+# (plate detection, face detection, face blurring) reads it as a zero-copy
+# NumPy view with its own cursor.
+#
+#   python -m common.frame_ring 0 --name gate_cam          # capture daemon (camera 0, file or URL)
+#   FRAME_RING=gate_cam python "Q1.plate _recognition/q1_code.py"
+#   FRAME_RING=gate_cam python "Q4.blurred_face/bllurred face 2.py"
+#
+# Layout: an int64 header, (seq, timestamp_ns) per slot, then the slots'
+# frames. The writer marks a slot as being written (seq = -1), copies the frame
+# in, then stores its sequence number and finally the ring's head; readers
+# check the slot's seq before and after using it. A view stays valid until the
+# writer comes round to its slot again, i.e. for slots - 1 more frames.
+import argparse
+import os
+import signal
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+MAGIC = 0x474E4952  # "RING"
+HEADER = 16  # int64 fields: magic, slots, height, width, channels, head, closed, writer pid, ...
+H_MAGIC, H_SLOTS, H_HEIGHT, H_WIDTH, H_CHANNELS, H_HEAD, H_CLOSED, H_PID = range(8)
+DEFAULT_SLOTS = 8
+POLL_INTERVAL = 0.001
+# RingCapture.read() wait for a new frame: the apps call it from the Tk event loop, which it blocks
+CAPTURE_TIMEOUT = 0.05
+
+
+def _attach(name):
+    """Open an existing block without letting this process's resource tracker unlink it on exit."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        if os.name == "posix":
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+class Frame:
+    __slots__ = ("seq", "timestamp", "image", "_ring")
+
+    def __init__(self, seq, timestamp, image, ring):
+        self.seq = seq
+        self.timestamp = timestamp  # time.time_ns() when the frame was published
+        # Read-only view into shared memory, seen by every reader: copy it to draw on it or
+        # to keep it past the ring's lifetime
+        self.image = image
+        self._ring = ring
+
+    @property
+    def valid(self):
+        """False once the writer has started overwriting this frame's slot."""
+        return self._ring.slot_seq(self.seq) == self.seq
+
+
+class FrameRing:
+    """Views over a ring block; use FrameRing.create() in the writer and FrameReader in consumers."""
+
+    def __init__(self, shm, owner=False):
+        self.shm = shm
+        self.owner = owner
+        header = np.ndarray((HEADER,), dtype=np.int64, buffer=shm.buf)
+        if header[H_MAGIC] != MAGIC:
+            raise ValueError(f"{shm.name} is not a frame ring")
+        self.header = header
+        self.slots = int(header[H_SLOTS])
+        self.shape = tuple(int(v) for v in header[H_HEIGHT:H_CHANNELS + 1])
+        self.meta = np.ndarray((self.slots, 2), dtype=np.int64, buffer=shm.buf, offset=HEADER * 8)
+        self.frames = np.ndarray((self.slots, *self.shape), dtype=np.uint8, buffer=shm.buf,
+                                 offset=(HEADER + 2 * self.slots) * 8)
+
+    @classmethod
+    def create(cls, name, shape, slots=DEFAULT_SLOTS):
+        if len(shape) == 2:
+            shape = (*shape, 1)
+        size = (HEADER + 2 * slots) * 8 + slots * int(np.prod(shape))
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        header = np.ndarray((HEADER,), dtype=np.int64, buffer=shm.buf)
+        header[:] = 0
+        header[H_SLOTS] = slots
+        header[H_HEIGHT:H_CHANNELS + 1] = shape
+        header[H_PID] = os.getpid()
+        header[H_MAGIC] = MAGIC
+        del header
+        ring = cls(shm, owner=True)
+        ring.meta[:] = 0
+        return ring
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def head(self):
+        """Sequence number of the newest complete frame (0: none yet)."""
+        return int(self.header[H_HEAD])
+
+    @property
+    def closed(self):
+        return bool(self.header[H_CLOSED])
+
+    def slot_seq(self, seq):
+        return int(self.meta[seq % self.slots, 0])
+
+    def publish(self, image):
+        """Copy `image` (the ring's shape) into the next slot; returns its sequence number."""
+        seq = self.head + 1
+        slot = seq % self.slots
+        self.meta[slot, 0] = -1
+        np.copyto(self.frames[slot], image.reshape(self.shape))
+        self.meta[slot, 1] = time.time_ns()
+        self.meta[slot, 0] = seq
+        self.header[H_HEAD] = seq
+        return seq
+
+    def close(self):
+        if self.owner:
+            self.header[H_CLOSED] = 1
+        del self.header, self.meta, self.frames
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # a consumer still holds frame views; the mapping goes away with them
+        if self.owner:
+            self.shm.unlink()
+
+
+class FrameReader:
+    """A consumer of a FrameRing with its own cursor.
+
+    policy "latest" jumps to the newest frame and drops any backlog (slow
+    analyzers, displays); "all" returns every frame in order and only drops
+    frames the writer has already overwritten (recorders).
+    """
+
+    def __init__(self, name, policy="latest"):
+        if policy not in ("latest", "all"):
+            raise ValueError(f"unknown drop policy {policy!r}")
+        self.ring = FrameRing(_attach(name))
+        self.policy = policy
+        # Start at the newest frame already published (or the oldest still intact, for "all")
+        self.cursor = max(0, self.ring.head - (1 if policy == "latest" else self.ring.slots - 2))
+        self.dropped = 0
+
+    @property
+    def shape(self):
+        return self.ring.shape
+
+    def read(self, timeout=1.0):
+        """The next Frame by the reader's policy, or None if none arrives within timeout (or the writer closed)."""
+        deadline = time.monotonic() + timeout
+        ring = self.ring
+        while True:
+            head = ring.head
+            if head > self.cursor:
+                # Leave the slot after the head alone: the writer fills it next
+                oldest = max(self.cursor + 1, head - ring.slots + 2)
+                seq = head if self.policy == "latest" else oldest
+                slot = seq % ring.slots
+                timestamp = int(ring.meta[slot, 1])
+                if ring.slot_seq(seq) == seq:
+                    self.dropped += seq - self.cursor - 1
+                    self.cursor = seq
+                    image = ring.frames[slot]
+                    image.flags.writeable = False  # drawing on it would corrupt the frame for the other readers
+                    return Frame(seq, timestamp, image, ring)
+                continue  # overwritten meanwhile; try again from the new head
+            if ring.closed or time.monotonic() >= deadline:
+                return None
+            time.sleep(POLL_INTERVAL)
+
+    def close(self):
+        self.ring.close()
+
+
+class RingCapture:
+    """cv2.VideoCapture look-alike over a FrameReader, so the apps can swap it in for a camera.
+
+    Unlike a camera, read() returns read-only frames (copy or convert them into your own buffer
+    before drawing), and (False, None) when no new frame arrived within timeout while
+    isOpened() stays True: that means "try again", not the end of the stream.
+    """
+
+    def __init__(self, name, policy="latest", timeout=CAPTURE_TIMEOUT):
+        self.timeout = timeout
+        self.skipped = 0  # frames dropped just before the last one read
+        try:
+            self.reader = FrameReader(name, policy)
+        except (FileNotFoundError, ValueError) as e:
+            print(f"Frame ring {name!r} unavailable: {e}")
+            self.reader = None
+
+    def isOpened(self):
+        return self.reader is not None and not self.reader.ring.closed
+
+    def read(self):
+        dropped = self.reader.dropped if self.reader else 0
+        frame = self.reader.read(self.timeout) if self.reader else None
+        if frame is None:
+            return False, None
+        self.skipped = self.reader.dropped - dropped
+        image = frame.image
+        return True, image[:, :, 0] if image.shape[2] == 1 else image
+
+    def get(self, prop):
+        import cv2
+        if self.reader is None:
+            return 0.0
+        height, width = self.reader.shape[:2]
+        return {cv2.CAP_PROP_FRAME_WIDTH: float(width), cv2.CAP_PROP_FRAME_HEIGHT: float(height)}.get(prop, 0.0)
+
+    def set(self, prop, value):
+        return False
+
+    def release(self):
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+
+
+# ------------------ Capture daemon ------------------
+def serve(source, name, slots=DEFAULT_SLOTS, fps=0.0):
+    """Decode `source` (camera index, file or URL) into the ring `name` until interrupted."""
+    import cv2
+    cap = cv2.VideoCapture(int(source) if str(source).isdigit() else source)
+    ok, frame = cap.read()
+    if not ok:
+        raise SystemExit(f"Cannot read from {source}")
+    ring = FrameRing.create(name, frame.shape, slots)
+    print(f"Publishing {source} as {name!r}: {frame.shape[1]}x{frame.shape[0]}, {slots} slots", flush=True)
+    stop = []
+    signal.signal(signal.SIGTERM, lambda *_: stop.append(True))
+    started, interval = time.perf_counter(), 1.0 / fps if fps else 0.0
+    try:
+        while ok and not stop:
+            if frame.shape != ring.shape and frame.shape != ring.shape[:2]:
+                frame = cv2.resize(frame, (ring.shape[1], ring.shape[0]))
+            ring.publish(frame)
+            if interval:
+                time.sleep(max(0.0, started + ring.head * interval - time.perf_counter()))
+            ok, frame = cap.read()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        elapsed = time.perf_counter() - started
+        print(f"Published {ring.head} frames ({ring.head / elapsed:.1f} fps)")
+        cap.release()
+        ring.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Publish camera/video frames to a shared-memory ring.")
+    parser.add_argument("source", nargs="?", default="0", help="camera index, video file or stream URL")
+    parser.add_argument("--name", default="frame_ring", help="shared memory name the apps attach to (FRAME_RING)")
+    parser.add_argument("--slots", type=int, default=DEFAULT_SLOTS)
+    parser.add_argument("--fps", type=float, default=0.0, help="limit the publish rate (0: as fast as decoded)")
+    args = parser.parse_args(argv)
+    serve(args.source, args.name, args.slots, args.fps)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,206 @@
+# ========================= Shared: Metrics =========================
+# Per-stage timers, counters and gauges for the vision apps, exposed as a
+# Prometheus text endpoint and/or a rolling JSON log.
+#
+#   METRICS = Metrics("q4_blur").start_from_env()
+#   with METRICS.time("detect"):
+#       faces = face_cascade.detectMultiScale(...)
+#   METRICS.inc("frames_processed")
+#   METRICS.inc("detections", len(faces))
+#   METRICS.gauge("queue_depth", result_queue.qsize)     # callables are read at scrape time
+#
+#   METRICS_PORT=9108 python "Q4.blurred_face/bllurred face 2.py"   # http://127.0.0.1:9108/metrics
+#   METRICS_LOG=metrics.jsonl METRICS_INTERVAL=10 python ...        # one JSON snapshot every 10 s
+#
+# Timers keep a count, a sum and the last TIMER_WINDOW samples, from which
+# p50/p95/p99 are computed on export (a Prometheus summary).
+import collections
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PREFIX = "vision"
+TIMER_WINDOW = 1024
+QUANTILES = (0.5, 0.95, 0.99)
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUPS = 5
+
+
+def rss_bytes():
+    """Resident set size of this process, or None where it can't be read."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+class Timer:
+    __slots__ = ("count", "total", "recent")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.recent = collections.deque(maxlen=TIMER_WINDOW)
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.recent.append(seconds)
+
+    def quantiles(self):
+        values = sorted(self.recent)
+        if not values:
+            return {}
+        return {q: values[min(len(values) - 1, int(q * len(values)))] for q in QUANTILES}
+
+
+class Metrics:
+    def __init__(self, app):
+        self.app = app
+        self.lock = threading.Lock()
+        self.counters = collections.defaultdict(float)
+        self.gauges = {}  # name -> value or zero-argument callable
+        self.timers = collections.defaultdict(Timer)
+        self.started = time.time()
+        self.server = None
+        self.gauge("rss_bytes", rss_bytes)
+
+    # ------------------ Recording ------------------
+    def inc(self, name, value=1):
+        with self.lock:
+            self.counters[name] += value
+
+    def gauge(self, name, value):
+        """Set a gauge to a number, or to a callable read whenever metrics are exported."""
+        with self.lock:
+            self.gauges[name] = value
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            self.timers[stage].observe(seconds)
+
+    @contextmanager
+    def time(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    # ------------------ Export ------------------
+    def _gauge_values(self):
+        values = {}
+        for name, value in list(self.gauges.items()):
+            try:
+                value = value() if callable(value) else value
+            except Exception:
+                value = None
+            if value is not None:
+                values[name] = float(value)
+        return values
+
+    def snapshot(self):
+        with self.lock:
+            counters = dict(self.counters)
+            timers = {stage: {"count": t.count, "sum": t.total,
+                              **{f"p{int(q * 100)}": v for q, v in t.quantiles().items()}}
+                      for stage, t in self.timers.items()}
+        return {"time": time.time(), "app": self.app, "uptime": time.time() - self.started,
+                "counters": counters, "gauges": self._gauge_values(), "stages": timers}
+
+    @staticmethod
+    def _number(value):
+        # Full precision: {:g} keeps 6 digits, so large counters would stop moving
+        return str(value) if isinstance(value, int) else repr(float(value))
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        snap = self.snapshot()
+        app = f'app="{self.app}"'
+        lines = []
+        for name, value in sorted(snap["counters"].items()):
+            lines += [f"# TYPE {PREFIX}_{name}_total counter", f"{PREFIX}_{name}_total{{{app}}} {self._number(value)}"]
+        for name, value in sorted(snap["gauges"].items()):
+            lines += [f"# TYPE {PREFIX}_{name} gauge", f"{PREFIX}_{name}{{{app}}} {self._number(value)}"]
+        if snap["stages"]:
+            lines.append(f"# TYPE {PREFIX}_stage_seconds summary")
+        for stage, t in sorted(snap["stages"].items()):
+            labels = f'{app},stage="{stage}"'
+            for q in QUANTILES:
+                key = f"p{int(q * 100)}"
+                if key in t:
+                    lines.append(f'{PREFIX}_stage_seconds{{{labels},quantile="{q}"}} {t[key]:.6g}')
+            lines.append(f"{PREFIX}_stage_seconds_sum{{{labels}}} {self._number(t['sum'])}")
+            lines.append(f"{PREFIX}_stage_seconds_count{{{labels}}} {t['count']}")
+        lines += [f"# TYPE {PREFIX}_uptime_seconds gauge", f"{PREFIX}_uptime_seconds{{{app}}} {snap['uptime']:.1f}"]
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serve render() at http://host:port/metrics from a daemon thread."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self.server
+
+    def log_to(self, path, interval=10.0, max_bytes=LOG_MAX_BYTES, backups=LOG_BACKUPS):
+        """Append a JSON snapshot to path every interval seconds, rotating at max_bytes."""
+        logger = logging.getLogger(f"{__name__}.{self.app}")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups)
+        logger.addHandler(handler)
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                logger.info(json.dumps(self.snapshot()))
+        threading.Thread(target=loop, daemon=True).start()
+
+    def start_from_env(self):
+        """Start the endpoint / JSON log requested by METRICS_PORT, METRICS_LOG and METRICS_INTERVAL.
+
+        Bad values only disable that output, with a warning: the app itself keeps running.
+        """
+        port = os.environ.get("METRICS_PORT")
+        if port:
+            try:
+                self.serve(int(port))
+            except (OSError, ValueError, OverflowError) as e:
+                print(f"Metrics endpoint disabled (METRICS_PORT={port!r}): {e}")
+        path = os.environ.get("METRICS_LOG")
+        if path:
+            try:
+                interval = float(os.environ.get("METRICS_INTERVAL", "10"))
+                if not interval > 0:
+                    raise ValueError(f"interval must be positive, got {interval}")
+                self.log_to(path, interval)
+            except (OSError, ValueError) as e:
+                print(f"Metrics log disabled (METRICS_LOG={path!r}): {e}")
+        return self
@@ -0,0 +1,50 @@
+# ========================= Shared: Startup Timing =========================
+# Wall-clock marks from process start to the app's first useful output.
+#
+#   STARTUP = StartupTimer()          # near the top of the script
+#   STARTUP.mark("window_shown")
+#   STARTUP.mark("first_prediction")
+#   if STARTUP.benchmarking:          # STARTUP_BENCH=<json path> is set
+#       STARTUP.write(); root.destroy()
+#
+# Marks are seconds since the process started (read from /proc on Linux, so
+# interpreter startup is included), or since the timer was created elsewhere.
+import json
+import os
+import sys
+import time
+
+
+def process_age():
+    """Seconds since this process started, or 0.0 where that isn't available."""
+    try:
+        with open('/proc/self/stat') as f:
+            # Field 22 (starttime, in clock ticks since boot); the command name may contain spaces
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - start_ticks / os.sysconf('SC_CLK_TCK'))
+    except (OSError, ValueError, IndexError, AttributeError):
+        return 0.0
+
+
+class StartupTimer:
+    def __init__(self):
+        self.origin = time.perf_counter() - process_age()
+        self.marks = {}
+        self.bench_path = os.environ.get("STARTUP_BENCH")
+
+    @property
+    def benchmarking(self):
+        return bool(self.bench_path)
+
+    def mark(self, name):
+        """Record `name` the first time it is reached; returns seconds since start."""
+        return self.marks.setdefault(name, time.perf_counter() - self.origin)
+
+    def report(self):
+        return " | ".join(f"{name} {t:.2f}s" for name, t in self.marks.items())
+
+    def write(self, path=None):
+        with open(path or self.bench_path, "w") as f:
+            json.dump({"argv": sys.argv, "pid": os.getpid(), "marks": self.marks}, f, indent=2)
@@ -0,0 +1,101 @@
+# ========================= Shared: Startup Benchmark =========================
+# Launches an app several times with STARTUP_BENCH set and reports its startup
+# marks (see startup.StartupTimer). Apps exit by themselves once they have
+# written their marks. Run from the repository root:
+#
+#   python -m common.startup_bench "Q7.cat_dog/cat vs dog.py" --runs 5 --image dog.jpg
+#   python -m common.startup_bench "Q1.plate _recognition/q1_code.py" --env FRAME_RING=gate_cam \
+#       --baseline startup_q1.json     # exits with 1 if a median got slower than the baseline's
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# A mark regresses when its median exceeds the baseline's by more than both of these
+DEFAULT_TOLERANCE = 0.2
+MIN_REGRESSION_SECONDS = 0.1
+
+def run_once(script, env, timeout):
+    fd, out = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    try:
+        env = {**os.environ, **env, "STARTUP_BENCH": out}
+        subprocess.run([sys.executable, os.path.basename(script)], cwd=os.path.dirname(os.path.abspath(script)),
+                       env=env, timeout=timeout, check=True)
+        with open(out) as f:
+            return json.load(f)["marks"]
+    finally:
+        os.remove(out)
+
+
+def summarize(runs):
+    names = list(dict.fromkeys(name for marks in runs for name in marks))
+    rows = {}
+    for name in names:
+        values = [marks[name] for marks in runs if name in marks]
+        rows[name] = {"first": runs[0].get(name), "median": statistics.median(values),
+                      "min": min(values), "max": max(values)}
+    return rows
+
+
+def regressions(rows, baseline, tolerance=DEFAULT_TOLERANCE):
+    """[(mark, baseline median, median)] for marks that got slower than the baseline summary allows."""
+    slower = []
+    for name, r in rows.items():
+        before = baseline.get(name, {}).get("median")
+        if before is not None and r["median"] - before > max(before * tolerance, MIN_REGRESSION_SECONDS):
+            slower.append((name, before, r["median"]))
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure app startup (process start to first result).")
+    parser.add_argument("script", help="path to the app script")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=300.0, help="seconds per run")
+    parser.add_argument("--image", help="input for the first prediction (sets STARTUP_BENCH_IMAGE)")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="extra environment for the app, e.g. FRAME_RING=gate_cam (repeatable)")
+    parser.add_argument("--output", help="write the summary as JSON")
+    parser.add_argument("--baseline", help="an earlier --output file; exit with 1 if a median regressed")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed slowdown against --baseline, as a fraction of its median")
+    args = parser.parse_args(argv)
+
+    env = {"STARTUP_BENCH_IMAGE": os.path.abspath(args.image)} if args.image else {}
+    for item in args.env:
+        key, sep, value = item.partition("=")
+        if not sep:
+            parser.error(f"--env expects KEY=VALUE, got {item!r}")
+        env[key] = value
+    runs = []
+    for i in range(args.runs):
+        runs.append(run_once(args.script, env, args.timeout))
+        print(f"run {i + 1}: " + " | ".join(f"{k} {v:.2f}s" for k, v in runs[-1].items()), flush=True)
+
+    rows = summarize(runs)
+    print(f"\n=== STARTUP ({args.runs} runs, first run is usually the cold one) ===")
+    print(f"{'mark':<20} {'first':>8} {'median':>8} {'min':>8} {'max':>8}")
+    for name, r in rows.items():
+        first = f"{r['first']:.2f}" if r['first'] is not None else "-"
+        print(f"{name:<20} {first:>8} {r['median']:>8.2f} {r['min']:>8.2f} {r['max']:>8.2f}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"script": args.script, "runs": runs, "summary": rows}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            slower = regressions(rows, json.load(f)["summary"], args.tolerance)
+        for name, before, after in slower:
+            print(f"REGRESSION {name}: median {after:.2f}s, baseline {before:.2f}s")
+        if slower:
+            return 1
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())